@@ -45,6 +45,56 @@ export const researchApi = {
   deleteResearch: async (researchId: string): Promise<void> => {
     await api.delete(`/research/${researchId}`);
   },
+
+  // Follows pushed status events; fetch instead of EventSource so the auth header is sent.
+  // Returns a function that closes the stream.
+  subscribeResearchEvents: (
+    researchId: string,
+    onEvent: (event: string, data: any) => void,
+    onError: (error: unknown) => void
+  ): (() => void) => {
+    const controller = new AbortController();
+    const token = localStorage.getItem('auth_token') || 'dev-token';
+
+    (async () => {
+      const response = await fetch(`${API_BASE_URL}/research/${researchId}/events`, {
+        headers: { Authorization: `Bearer ${token}` },
+        signal: controller.signal,
+      });
+      if (!response.ok || !response.body) {
+        throw new Error(`Status stream failed with ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let finished = false;
+      while (!finished) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+          const block = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let data = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          if (data) onEvent(event, JSON.parse(data));
+          if (event === 'done') finished = true;
+        }
+      }
+      if (!finished) throw new Error('Status stream ended early');
+    })().catch((error) => {
+      if (!controller.signal.aborted) onError(error);
+    });
+
+    return () => controller.abort();
+  },
 };
 
 export const knowledgeApi = {
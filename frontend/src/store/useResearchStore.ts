@@ -1,5 +1,5 @@
 import { create } from 'zustand';
-import { ResearchResponse, ResearchRequest, ResearchHistoryItem } from '../types';
+import { ResearchResponse, ResearchRequest, ResearchHistoryItem, ResearchStatusChange } from '../types';
 import { researchApi } from '../services/api';
 import { useAnalyticsStore } from './useAnalyticsStore';
 
@@ -11,6 +11,7 @@ interface ResearchStore {
   
   // Actions
   startResearch: (request: ResearchRequest) => Promise<void>;
+  followResearch: (researchId: string) => void;
   pollResearchStatus: (researchId: string) => void;
   stopPolling: () => void;
   loadHistory: () => Promise<void>;
@@ -21,6 +22,46 @@ interface ResearchStore {
 }
 
 let pollingInterval: NodeJS.Timeout | null = null;
+let closeStatusStream: (() => void) | null = null;
+
+// Merge a pushed status change into the research shown
+const applyStatusChange = (research: ResearchResponse, change: ResearchStatusChange): ResearchResponse => {
+  const progress = research.progress ?? { current_phase: 'initializing', completed_tasks: [], tasks: [], progress_percentage: 0 };
+  const tasks = progress.tasks.map((task) =>
+    change.tasks?.[task.task_name] ? { ...task, ...change.tasks[task.task_name] } : task
+  );
+  for (const [task_name, task] of Object.entries(change.tasks ?? {})) {
+    if (!tasks.some((known) => known.task_name === task_name)) {
+      tasks.push({ task_name, ...task });
+    }
+  }
+
+  return {
+    ...research,
+    status: change.status ?? research.status,
+    error: change.error !== undefined ? change.error ?? undefined : research.error,
+    cache_match: change.cache_match !== undefined ? change.cache_match ?? undefined : research.cache_match,
+    progress: {
+      ...progress,
+      tasks,
+      current_phase: change.phase ?? progress.current_phase,
+      active_task: change.active_task !== undefined ? change.active_task ?? undefined : progress.active_task,
+      progress_percentage: change.percentage ?? progress.progress_percentage,
+      completed_tasks: tasks.filter((task) => task.status === 'completed').map((task) => task.task_name),
+    },
+  };
+};
+
+const recordFinishedResearch = (research: ResearchResponse) => {
+  const completionTime = research.completed_at ?
+    new Date(research.completed_at).getTime() - new Date(research.created_at).getTime() : undefined;
+  useAnalyticsStore.getState().updateAnalytics(
+    research.research_id,
+    research.status,
+    research.progress?.current_phase || 'Unknown',
+    completionTime
+  );
+};
 
 export const useResearchStore = create<ResearchStore>((set, get) => ({
   currentResearch: null,
@@ -37,9 +78,9 @@ export const useResearchStore = create<ResearchStore>((set, get) => ({
       console.log('Research response:', response);
       set({ currentResearch: response, isLoading: false });
       
-      // Start polling if research is pending or running
+      // Follow pushed status updates while the research is pending or running
       if (response.status === 'pending' || response.status === 'running') {
-        get().pollResearchStatus(response.research_id);
+        get().followResearch(response.research_id);
       }
     } catch (error: any) {
       console.error('Research error:', error);
@@ -50,6 +91,38 @@ export const useResearchStore = create<ResearchStore>((set, get) => ({
     }
   },
 
+  followResearch: (researchId: string) => {
+    get().stopPolling();
+
+    closeStatusStream = researchApi.subscribeResearchEvents(
+      researchId,
+      (event, data) => {
+        const current = get().currentResearch;
+        if (!current || current.research_id !== researchId) return;
+
+        if (event === 'snapshot' || event === 'delta') {
+          set({ currentResearch: applyStatusChange(current, data) });
+        } else if (event === 'result') {
+          set({ currentResearch: { ...current, result: data.result, completed_at: data.completed_at ?? current.completed_at } });
+        } else if (event === 'done') {
+          closeStatusStream = null;
+          const finished = { ...current, status: data.status };
+          set({ currentResearch: finished });
+          if (finished.status === 'completed') {
+            get().saveReportToStorage(finished);
+          }
+          recordFinishedResearch(finished);
+        }
+      },
+      (error) => {
+        // Proxies without streaming support: fall back to polling
+        console.error('Status stream error, polling instead:', error);
+        closeStatusStream = null;
+        get().pollResearchStatus(researchId);
+      }
+    );
+  },
+
   pollResearchStatus: (researchId: string) => {
     // Clear existing polling
     if (pollingInterval) {
@@ -69,14 +142,7 @@ export const useResearchStore = create<ResearchStore>((set, get) => ({
           }
           
           // Update analytics
-          const completionTime = response.completed_at ? 
-            new Date(response.completed_at).getTime() - new Date(response.created_at).getTime() : undefined;
-          useAnalyticsStore.getState().updateAnalytics(
-            response.research_id,
-            response.status,
-            response.progress?.current_phase || 'Unknown',
-            completionTime
-          );
+          recordFinishedResearch(response);
         }
       } catch (error) {
         console.error('Polling error:', error);
@@ -85,6 +151,10 @@ export const useResearchStore = create<ResearchStore>((set, get) => ({
   },
 
   stopPolling: () => {
+    if (closeStatusStream) {
+      closeStatusStream();
+      closeStatusStream = null;
+    }
     if (pollingInterval) {
       clearInterval(pollingInterval);
       pollingInterval = null;
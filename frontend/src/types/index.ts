@@ -12,6 +12,7 @@ export interface TaskProgress {
   end_time?: string;
   tools_used: string[];
   output?: string;
+  duration_seconds?: number;
 }
 
 export interface ResearchProgress {
@@ -28,16 +29,31 @@ export interface ResearchResponse {
   result?: string;
   progress?: ResearchProgress;
   error?: string;
+  cache_match?: 'exact' | 'near_match';
+  cache_similarity?: number;
   created_at: string;
   completed_at?: string;
 }
 
+// Compact status pushed by GET /research/{id}/events: a full snapshot first, then only changed fields
+export interface ResearchStatusChange {
+  status?: ResearchResponse['status'];
+  phase?: string;
+  active_task?: string | null;
+  percentage?: number;
+  tasks?: Record<string, Pick<TaskProgress, 'status' | 'agent' | 'tools_used' | 'duration_seconds'>>;
+  error?: string | null;
+  cache_match?: ResearchResponse['cache_match'] | null;
+}
+
 export interface KnowledgeStats {
   total_documents: number;
   company_profiles: number;
   industry_reports: number;
   market_data: number;
   user_preferences: number;
+  uploaded_documents?: number;
+  total_files?: number;
   last_updated: string;
 }
 
@@ -45,7 +61,7 @@ export interface UploadResponse {
   message: string;
   file_path: string;
   size: number;
-  processed: boolean;
+  job_id: string;  // indexing job, see GET /knowledge/jobs/{job_id}
 }
 
 export interface UserProfile {
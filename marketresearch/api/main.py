@@ -50,9 +50,11 @@ app.include_router(knowledge_router)
 async def startup_event():
     """Initialize the research system on startup"""
     try:
-        # Initialize services
-        ResearchService.get_crew()
+        # Initialize services; research workers build their crews on their first run
         KnowledgeService.get_rag_factory()
+        orphaned = ResearchService.recover_orphaned_research()
+        if orphaned:
+            print(f"⚠️ Marked {orphaned} researches left unfinished by a stopped server as failed")
         print("✅ API Server initialized successfully")
     except Exception as e:
         print(f"❌ Failed to initialize API server: {e}")
@@ -69,7 +71,7 @@ async def health_check():
         return HealthCheck(
             status="healthy",
             timestamp=datetime.now(),
-            crew_initialized=ResearchService._crew_instance is not None,
+            crew_initialized=ResearchService.crew_count() > 0,
             rag_initialized=KnowledgeService._rag_factory is not None,
             knowledge_stats=knowledge_stats
         )
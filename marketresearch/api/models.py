@@ -28,6 +28,7 @@ class TaskProgress(BaseModel):
     end_time: Optional[datetime] = None
     tools_used: List[str] = []
     output: Optional[str] = None
+    duration_seconds: Optional[float] = None
 
 class ResearchProgress(BaseModel):
     current_phase: str
@@ -42,6 +43,8 @@ class ResearchResponse(BaseModel):
     result: Optional[str] = None
     progress: Optional[ResearchProgress] = None
     error: Optional[str] = None
+    cache_match: Optional[str] = Field(default=None, description="'exact' or 'near_match' when served from the result cache")
+    cache_similarity: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
 
@@ -51,13 +54,48 @@ class KnowledgeStats(BaseModel):
     industry_reports: int
     market_data: int
     user_preferences: int
+    uploaded_documents: int = 0
+    total_files: int = 0
     last_updated: datetime = Field(default_factory=datetime.now)
 
 class UploadResponse(BaseModel):
     message: str
     file_path: str
     size: int
-    processed: bool = False
+    job_id: str  # indexing runs in this ingestion job; poll GET /knowledge/jobs/{job_id}
+
+class BulkUploadResponse(BaseModel):
+    message: str
+    files: List[UploadResponse]
+    job_id: str
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class FileProgress(BaseModel):
+    file_path: str
+    status: str = "pending"
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+class IngestionJob(BaseModel):
+    job_id: str
+    job_type: str
+    status: JobStatus = JobStatus.QUEUED
+    requested_files: List[str] = []
+    files: Dict[str, FileProgress] = {}
+    total_files: int = 0
+    processed_files: int = 0
+    progress_percentage: int = 0
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: datetime = Field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
 
 class UserProfile(BaseModel):
     user_id: str
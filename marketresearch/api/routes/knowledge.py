@@ -5,9 +5,10 @@ from typing import List
 import sys 
 import os
 
-from models import KnowledgeStats, UploadResponse, UserProfile
+from models import KnowledgeStats, UploadResponse, BulkUploadResponse, IngestionJob, UserProfile
 from auth import verify_simple_token
 from services.knowledge_service import KnowledgeService
+from services.ingestion_service import IngestionService
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
@@ -21,6 +22,14 @@ async def get_knowledge_stats(user: UserProfile = Depends(get_user)):
     """Get knowledge base statistics"""
     return KnowledgeService.get_stats()
 
+@router.get("/cache")
+async def get_cache_metrics(user: UserProfile = Depends(get_user)):
+    """Get retrieval cache hit rates and saved latency"""
+    try:
+        return KnowledgeService.get_cache_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get cache metrics: {str(e)}")
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_knowledge_file(
     file: UploadFile = File(...),
@@ -29,6 +38,14 @@ async def upload_knowledge_file(
     """Upload a file to the knowledge base"""
     return await KnowledgeService.upload_file(file, user.user_id)
 
+@router.post("/upload/bulk", response_model=BulkUploadResponse)
+async def upload_knowledge_files(
+    files: List[UploadFile] = File(...),
+    user: UserProfile = Depends(get_user)
+):
+    """Upload many files to the knowledge base and index them together"""
+    return await KnowledgeService.upload_files(files, user.user_id)
+
 @router.get("/files")
 async def list_knowledge_files(user: UserProfile = Depends(get_user)):
     """List all files in the knowledge base"""
@@ -40,17 +57,39 @@ async def delete_knowledge_file(
     user: UserProfile = Depends(get_user)
 ):
     """Delete a file from the knowledge base"""
-    success = KnowledgeService.delete_file(filename)
-    if not success:
+    job = KnowledgeService.delete_file(filename)
+    if job is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return {"message": f"File {filename} deleted successfully"}
+    return {"message": f"File {filename} deleted successfully", "job_id": job.job_id}
 
-@router.post("/reindex")
+@router.post("/reindex", response_model=IngestionJob)
 async def reindex_knowledge_base(user: UserProfile = Depends(get_user)):
-    """Reindex the knowledge base"""
+    """Queue a background reindex of the knowledge base"""
     try:
-        KnowledgeService.reindex()
-        return {"message": "Knowledge base reindexed successfully"}
+        return KnowledgeService.reindex()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Reindexing failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Reindexing failed: {str(e)}")
+
+@router.get("/jobs", response_model=List[IngestionJob])
+async def list_ingestion_jobs(user: UserProfile = Depends(get_user), limit: int = 20):
+    """List recent ingestion jobs"""
+    return IngestionService.list_jobs(limit)
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_ingestion_job(job_id: str, user: UserProfile = Depends(get_user)):
+    """Get the status and per-file progress of an ingestion job"""
+    job = IngestionService.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJob)
+async def cancel_ingestion_job(job_id: str, user: UserProfile = Depends(get_user)):
+    """Cancel a queued or running ingestion job"""
+    job = IngestionService.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
\ No newline at end of file
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
 from typing import List
 import asyncio
 from datetime import datetime
@@ -17,7 +18,9 @@ from models import (
     UserProfile
 )
 from auth import get_current_user, verify_simple_token
-from services.research_service import ResearchService
+from services.research_service import ResearchService, ResearchQueueFull
+from services.stream_service import StreamService
+from services.status_hub import StatusHub
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
@@ -26,10 +29,11 @@ router = APIRouter(prefix="/research", tags=["research"])
 # Use simple auth for development
 get_user = verify_simple_token
 
+# Store calls (SQLite and result files) run on worker threads so they never block the event loop
+
 @router.post("/start", response_model=ResearchResponse)
 async def start_research(
     request: ResearchRequest,
-    background_tasks: BackgroundTasks,
     user: UserProfile = Depends(get_user)
 ):
     """Start a new market research task"""
@@ -63,41 +67,82 @@ async def start_research(
             )
         )
         
-        # Store initial response
-        ResearchService.store_research(research_id, response)
-        
-        # Start research in background
-        background_tasks.add_task(
-            ResearchService.execute_research,
-            research_id,
-            request,
-            user.user_id
-        )
-        
-        return response
+        # Store the initial response and queue the run on a research worker
+        return await asyncio.to_thread(ResearchService.submit_research, response, request, user.user_id)
         
+    except ResearchQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start research: {str(e)}")
 
+@router.get("/queue")
+async def get_research_queue(user: UserProfile = Depends(get_user)):
+    """Running and queued research counts"""
+    return ResearchService.get_queue_stats()
+
 @router.get("/{research_id}/status", response_model=ResearchResponse)
 async def get_research_status(
     research_id: str,
     user: UserProfile = Depends(get_user)
 ):
     """Get the status of a research task"""
-    research = ResearchService.get_research(research_id)
+    research = await asyncio.to_thread(ResearchService.get_research, research_id)
     if not research:
         raise HTTPException(status_code=404, detail="Research not found")
     
     return research
 
+@router.get("/{research_id}/stream")
+async def stream_research(
+    research_id: str,
+    user: UserProfile = Depends(get_user),
+    last_event_id: int = Header(0, alias="Last-Event-ID")
+):
+    """Stream report tokens as server-sent events while the research runs"""
+    if not StreamService.has_stream(research_id):
+        raise HTTPException(status_code=404, detail="Research not found")
+    
+    async def event_stream():
+        async for event_id, event, data in StreamService.subscribe(research_id, last_event_id):
+            yield StreamService.format_sse(event_id, event, data)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{research_id}/events")
+async def research_events(
+    research_id: str,
+    user: UserProfile = Depends(get_user)
+):
+    """Push status changes as compact server-sent events instead of polling /status.
+    
+    Sends a ``snapshot`` of the current status, then a ``delta`` per change (only
+    the fields and tasks that changed), the ``result`` once on completion and ``done``.
+    """
+    if not StatusHub.has_channel(research_id):
+        # Started by another API process or before a restart: follow it through the store
+        research = await asyncio.to_thread(ResearchService.get_remote_research, research_id)
+        if not research:
+            raise HTTPException(status_code=404, detail="Research not found")
+        StatusHub.update(research, remote=True)
+    StatusHub.watch(research_id, lambda: ResearchService.get_remote_research(research_id))
+    
+    return StreamingResponse(
+        StatusHub.subscribe(research_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{research_id}/result")
 async def get_research_result(
     research_id: str,
     user: UserProfile = Depends(get_user)
 ):
     """Get the full result of a completed research task"""
-    research = ResearchService.get_research(research_id)
+    research = await asyncio.to_thread(ResearchService.get_research, research_id)
     if not research:
         raise HTTPException(status_code=404, detail="Research not found")
     
@@ -120,7 +165,7 @@ async def preview_pdf(
     from fastapi.responses import FileResponse
     import os
     
-    research = ResearchService.get_research(research_id)
+    research = await asyncio.to_thread(ResearchService.get_research, research_id)
     if not research:
         raise HTTPException(status_code=404, detail="Research not found")
     
@@ -143,7 +188,7 @@ async def download_pdf(
     from fastapi.responses import FileResponse
     import os
     
-    research = ResearchService.get_research(research_id)
+    research = await asyncio.to_thread(ResearchService.get_research, research_id)
     if not research:
         raise HTTPException(status_code=404, detail="Research not found")
     
@@ -164,7 +209,7 @@ async def get_research_history(
     offset: int = 0
 ):
     """Get user's research history"""
-    return ResearchService.get_user_history(user.user_id, limit, offset)
+    return await asyncio.to_thread(ResearchService.get_user_history, user.user_id, limit, offset)
 
 @router.delete("/{research_id}")
 async def delete_research(
@@ -172,7 +217,7 @@ async def delete_research(
     user: UserProfile = Depends(get_user)
 ):
     """Delete a research task"""
-    success = ResearchService.delete_research(research_id, user.user_id)
+    success = await asyncio.to_thread(ResearchService.delete_research, research_id, user.user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Research not found")
     
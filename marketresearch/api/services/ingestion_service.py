@@ -0,0 +1,142 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from models import IngestionJob, JobStatus, FileProgress
+
+class IngestionService:
+    """Background queue for knowledge base uploads and reindexing"""
+    
+    MAX_FINISHED_JOBS = 200
+    
+    _jobs: Dict[str, IngestionJob] = {}
+    _cancel_events: Dict[str, threading.Event] = {}
+    _queued_job_id: Optional[str] = None
+    _lock = threading.Lock()
+    # Syncs serialize on the vector store anyway, so one worker is enough
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+    
+    @classmethod
+    def submit(cls, job_type: str, requested_files: List[str] = None) -> IngestionJob:
+        """Queue a knowledge base sync, joining the already-queued one if there is one"""
+        with cls._lock:
+            # A queued sync scans everything on disk when it starts, so it covers this request too
+            if cls._queued_job_id is not None:
+                job = cls._jobs[cls._queued_job_id]
+                job.requested_files.extend(requested_files or [])
+                return job.model_copy(deep=True)
+            
+            job = IngestionJob(
+                job_id=str(uuid.uuid4()),
+                job_type=job_type,
+                requested_files=list(requested_files or [])
+            )
+            cls._jobs[job.job_id] = job
+            cls._cancel_events[job.job_id] = threading.Event()
+            cls._queued_job_id = job.job_id
+            cls._prune_finished_jobs()
+            snapshot = job.model_copy(deep=True)
+        
+        cls._executor.submit(cls._run, job.job_id)
+        return snapshot
+    
+    @classmethod
+    def _run(cls, job_id: str):
+        """Run a queued sync on the ingestion worker thread"""
+        # Imported here: KnowledgeService submits jobs to this service
+        from services.knowledge_service import KnowledgeService
+        
+        with cls._lock:
+            if cls._queued_job_id == job_id:
+                cls._queued_job_id = None
+            job = cls._jobs[job_id]
+            cancel_event = cls._cancel_events[job_id]
+            if cancel_event.is_set():
+                job.status = JobStatus.CANCELLED
+                job.completed_at = datetime.now()
+                cls._cancel_events.pop(job_id, None)
+                return
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now()
+        
+        try:
+            vector_store = KnowledgeService.get_rag_factory().rag_pipeline.vector_store
+            summary = vector_store.sync_knowledge_base(
+                progress_callback=lambda rel_path, status: cls._record_progress(job_id, rel_path, status),
+                cancel_event=cancel_event
+            )
+            with cls._lock:
+                job.summary = summary
+                if summary.get("cancelled"):
+                    job.status = JobStatus.CANCELLED
+                else:
+                    job.status = JobStatus.COMPLETED
+                    job.progress_percentage = 100
+        except Exception as e:
+            with cls._lock:
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+        finally:
+            with cls._lock:
+                job.completed_at = datetime.now()
+                cls._cancel_events.pop(job_id, None)
+    
+    @classmethod
+    def _record_progress(cls, job_id: str, rel_path: str, status: str):
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            if job is None:
+                return
+            
+            if status == "pending":
+                job.total_files += 1
+            elif job.files.get(rel_path) and job.files[rel_path].status == "pending":
+                job.processed_files += 1
+            
+            job.files[rel_path] = FileProgress(file_path=rel_path, status=status)
+            if job.total_files:
+                job.progress_percentage = int((job.processed_files / job.total_files) * 100)
+    
+    @classmethod
+    def get_job(cls, job_id: str) -> Optional[IngestionJob]:
+        """Get a snapshot of a job"""
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+    
+    @classmethod
+    def list_jobs(cls, limit: int = 20) -> List[IngestionJob]:
+        """Most recent jobs first"""
+        with cls._lock:
+            jobs = sorted(cls._jobs.values(), key=lambda job: job.created_at, reverse=True)[:limit]
+            return [job.model_copy(deep=True) for job in jobs]
+    
+    @classmethod
+    def cancel(cls, job_id: str) -> Optional[IngestionJob]:
+        """Request cancellation; a running sync stops at its next file group"""
+        with cls._lock:
+            job = cls._jobs.get(job_id)
+            if job is None:
+                return None
+            
+            if job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+                job.cancel_requested = True
+                cancel_event = cls._cancel_events.get(job_id)
+                if cancel_event is not None:
+                    cancel_event.set()
+                if cls._queued_job_id == job_id:
+                    cls._queued_job_id = None
+            return job.model_copy(deep=True)
+    
+    @classmethod
+    def _prune_finished_jobs(cls):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)"""
+        finished = [
+            job for job in cls._jobs.values()
+            if job.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+        ]
+        finished.sort(key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - cls.MAX_FINISHED_JOBS)]:
+            del cls._jobs[job.job_id]
@@ -1,7 +1,7 @@
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import shutil
 from fastapi import UploadFile, HTTPException
 
@@ -11,20 +11,22 @@ src_dir = current_dir.parent.parent / "src"
 sys.path.insert(0, str(src_dir))
 
 from marketresearch.rag_chain_factory import RAGEnhancedChainFactory
+from marketresearch.rag.extractors import SUPPORTED_EXTENSIONS
 
-from models import KnowledgeStats, UploadResponse
+from models import KnowledgeStats, UploadResponse, BulkUploadResponse, IngestionJob
+from services.ingestion_service import IngestionService
 
 class KnowledgeService:
     """Service for managing knowledge base operations"""
     
     _rag_factory: RAGEnhancedChainFactory = None
+    knowledge_dir = current_dir.parent.parent / "knowledge"
     
     @classmethod
     def get_rag_factory(cls) -> RAGEnhancedChainFactory:
         """Get or create RAG factory instance"""
         if cls._rag_factory is None:
-            knowledge_path = str(current_dir.parent.parent / "knowledge")
-            cls._rag_factory = RAGEnhancedChainFactory(knowledge_path)
+            cls._rag_factory = RAGEnhancedChainFactory(str(cls.knowledge_dir))
         return cls._rag_factory
     
     @classmethod
@@ -40,6 +42,8 @@ class KnowledgeService:
                 industry_reports=stats.get("industry_reports", 0),
                 market_data=stats.get("market_data", 0),
                 user_preferences=stats.get("user_preferences", 0),
+                uploaded_documents=stats.get("uploaded_documents", 0),
+                total_files=stats.get("total_files", 0),
                 last_updated=datetime.now()
             )
         except Exception as e:
@@ -53,53 +57,96 @@ class KnowledgeService:
                 last_updated=datetime.now()
             )
     
+    @classmethod
+    def get_cache_metrics(cls) -> Dict:
+        """Retrieval cache hit rates, saved latency and embedding cache stats"""
+        rag_pipeline = cls.get_rag_factory().rag_pipeline
+        metrics = rag_pipeline.get_cache_metrics()
+        metrics["embedding_cache"] = rag_pipeline.vector_store.embeddings.cache_stats()
+        return metrics
+    
+    @classmethod
+    def _save_upload(cls, file: UploadFile) -> Path:
+        """Validate and save an uploaded file into knowledge/uploaded_files"""
+        # Create uploaded_files directory if it doesn't exist
+        upload_dir = cls.knowledge_dir / "uploaded_files"
+        upload_dir.mkdir(exist_ok=True)
+        
+        # Validate file type
+        file_extension = Path(file.filename).suffix.lower()
+        
+        if file_extension not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"File type {file_extension} not supported. Allowed: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"
+            )
+        
+        # Save the uploaded file
+        file_path = upload_dir / file.filename
+        
+        # Check if file already exists
+        if file_path.exists():
+            # Add timestamp to filename to avoid conflicts
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            name_parts = file.filename.rsplit('.', 1)
+            if len(name_parts) == 2:
+                new_filename = f"{name_parts[0]}_{timestamp}.{name_parts[1]}"
+            else:
+                new_filename = f"{file.filename}_{timestamp}"
+            file_path = upload_dir / new_filename
+        
+        # Write file
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        
+        return file_path
+    
     @classmethod
     async def upload_file(cls, file: UploadFile, user_id: str) -> UploadResponse:
         """Upload a file to the knowledge base"""
         try:
-            # Create uploaded_files directory if it doesn't exist
-            upload_dir = current_dir.parent.parent / "knowledge" / "uploaded_files"
-            upload_dir.mkdir(exist_ok=True)
-            
-            # Validate file type
-            allowed_extensions = {'.txt', '.md', '.pdf', '.docx', '.json', '.csv'}
-            file_extension = Path(file.filename).suffix.lower()
-            
-            if file_extension not in allowed_extensions:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"File type {file_extension} not supported. Allowed: {', '.join(allowed_extensions)}"
-                )
-            
-            # Save the uploaded file
-            file_path = upload_dir / file.filename
-            
-            # Check if file already exists
-            if file_path.exists():
-                # Add timestamp to filename to avoid conflicts
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                name_parts = file.filename.rsplit('.', 1)
-                if len(name_parts) == 2:
-                    new_filename = f"{name_parts[0]}_{timestamp}.{name_parts[1]}"
-                else:
-                    new_filename = f"{file.filename}_{timestamp}"
-                file_path = upload_dir / new_filename
-            
-            # Write file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            file_path = cls._save_upload(file)
             
-            # TODO: Process the file and add to ChromaDB
-            # This would involve parsing the file and adding it to the knowledge base
-            processed = False
+            # Extraction and indexing run as a background ingestion job
+            job = IngestionService.submit("upload", [str(file_path)])
             
             return UploadResponse(
                 message=f"File {file_path.name} uploaded successfully",
                 file_path=str(file_path),
                 size=file_path.stat().st_size,
-                processed=processed
+                job_id=job.job_id
             )
             
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    @classmethod
+    async def upload_files(cls, files: List[UploadFile], user_id: str) -> BulkUploadResponse:
+        """Upload many files and index them in a single background job"""
+        try:
+            file_paths = [cls._save_upload(file) for file in files]
+            job = IngestionService.submit("upload", [str(file_path) for file_path in file_paths])
+            
+            uploads = [
+                UploadResponse(
+                    message=f"File {file_path.name} uploaded successfully",
+                    file_path=str(file_path),
+                    size=file_path.stat().st_size,
+                    job_id=job.job_id
+                )
+                for file_path in file_paths
+            ]
+            
+            return BulkUploadResponse(
+                message=f"Uploaded {len(uploads)} files, indexing in job {job.job_id}",
+                files=uploads,
+                job_id=job.job_id
+            )
+            
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
     
@@ -107,7 +154,7 @@ class KnowledgeService:
     def list_files(cls) -> Dict:
         """List all files in the knowledge base"""
         try:
-            knowledge_dir = current_dir.parent.parent / "knowledge"
+            knowledge_dir = cls.knowledge_dir
             files = []
             
             # Scan all subdirectories
@@ -133,29 +180,27 @@ class KnowledgeService:
             return {"files": [], "total": 0, "categories": [], "error": str(e)}
     
     @classmethod
-    def delete_file(cls, filename: str) -> bool:
-        """Delete a file from the knowledge base"""
+    def delete_file(cls, filename: str) -> Optional[IngestionJob]:
+        """Delete a file from the knowledge base; returns the job removing its chunks, or None if not found"""
         try:
-            knowledge_dir = current_dir.parent.parent / "knowledge"
-            
             # Search for the file in all subdirectories
-            for file_path in knowledge_dir.rglob(filename):
+            for file_path in cls.knowledge_dir.rglob(filename):
                 if file_path.is_file():
                     file_path.unlink()
-                    return True
+                    # The sync drops the file's chunks and its type counts
+                    return IngestionService.submit("delete", [str(file_path)])
             
-            return False
+            return None
             
         except Exception:
-            return False
+            return None
     
     @classmethod
-    def reindex(cls):
+    def reindex(cls) -> IngestionJob:
         """Reindex the knowledge base"""
         try:
-            # Reinitialize the RAG factory to pick up new files
-            knowledge_path = str(current_dir.parent.parent / "knowledge")
-            cls._rag_factory = RAGEnhancedChainFactory(knowledge_path)
+            # Incrementally sync the existing store in the background
+            return IngestionService.submit("reindex")
             
         except Exception as e:
             raise Exception(f"Reindexing failed: {str(e)}")
\ No newline at end of file
@@ -1,8 +1,10 @@
+import os
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Optional
-import asyncio
+from typing import Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the src directory to Python path
 current_dir = Path(__file__).parent
@@ -11,6 +13,8 @@ sys.path.insert(0, str(src_dir))
 
 from marketresearch.crew import MarketResearchCrew
 from marketresearch.rag_chain_factory import RAGEnhancedChainFactory
+from marketresearch.streaming import stream_tokens_to, report_progress_to, forward_crewai_task_events
+from marketresearch.utils.cache import build_research_cache_key
 
 from models import (
     ResearchRequest,
@@ -22,36 +26,152 @@ from models import (
     ResearchHistory,
     ResearchHistoryItem
 )
+from services.stream_service import StreamService
+from services.research_store import ResearchStore, process_owner, owner_alive
+from services.status_hub import StatusHub
+
+class ResearchQueueFull(Exception):
+    """Every research worker is busy and the wait queue is full"""
 
 class ResearchService:
     """Service for managing research operations"""
     
-    # In-memory storage (replace with database in production)
-    _research_store: Dict[str, ResearchResponse] = {}
-    _crew_instance: Optional[MarketResearchCrew] = None
+    # Crew runs block for minutes, so they run on worker threads instead of the event loop
+    MAX_CONCURRENT_RESEARCH = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "2"))
+    MAX_QUEUED_RESEARCH = int(os.getenv("RESEARCH_MAX_QUEUED", "20"))
+    ORPHANED_ERROR = "Research interrupted: the server running it stopped. Please start it again."
+    
+    # Durable job store, shared by every API process
+    _store = ResearchStore(os.getenv("RESEARCH_DB_PATH", "./cache/research.sqlite"))
+    # Builds a worker's crew; tests swap in fakes here
+    _crew_factory: Callable[[], MarketResearchCrew] = MarketResearchCrew
+    # CrewAI memoizes a crew's agents and tasks, so each worker thread runs its own crew
+    _worker_crews = threading.local()
+    _crew_build_lock = threading.Lock()
+    _crew_count = 0
+    # Serializes read-modify-write updates from workers
+    _lock = threading.RLock()
+    _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_RESEARCH, thread_name_prefix="research")
+    _pending_count = 0  # submitted runs that have not finished, queued or running
+    # Single-flight: normalized request key -> research_id of the queued or running job for it
+    _inflight: Dict[str, str] = {}
+    _coalesced_count = 0  # duplicate starts served by an in-flight job
     
     @classmethod
     def get_crew(cls) -> MarketResearchCrew:
-        """Get or create crew instance"""
-        if cls._crew_instance is None:
-            cls._crew_instance = MarketResearchCrew()
-        return cls._crew_instance
+        """Get or create the calling worker's crew.
+        
+        A crew's tasks, memory and progress belong to the run using it, so runs
+        on different workers never share one; a worker reuses its crew for the
+        runs it executes one after another.
+        """
+        worker = cls._worker_crews
+        factory = cls._crew_factory
+        if getattr(worker, "factory", None) is not factory:
+            # ChromaDB clients for one path cannot be opened concurrently, so crews are built one at a time
+            with cls._crew_build_lock:
+                worker.crew = factory()
+            worker.factory = factory
+            with cls._lock:
+                cls._crew_count += 1
+        return worker.crew
+    
+    @classmethod
+    def crew_count(cls) -> int:
+        """Number of worker crews built so far"""
+        with cls._lock:
+            return cls._crew_count
     
     @classmethod
-    def store_research(cls, research_id: str, research: ResearchResponse):
-        """Store research in memory"""
-        cls._research_store[research_id] = research
+    def store_research(cls, research_id: str, research: ResearchResponse, user_id: Optional[str] = None,
+                       research_topic: Optional[str] = None):
+        """Store a new research, owned by this process until it finishes"""
+        cls._store.save(research, user_id=user_id, research_topic=research_topic, owner=process_owner())
+        # Open the token stream and status channel now so clients can subscribe before the run starts
+        StreamService.open(research_id)
+        StatusHub.update(research)
     
     @classmethod
     def get_research(cls, research_id: str) -> Optional[ResearchResponse]:
-        """Get research by ID"""
-        return cls._research_store.get(research_id)
+        """Get research by ID, including its result"""
+        return cls._store.get(research_id)
+    
+    @classmethod
+    def get_remote_research(cls, research_id: str) -> Optional[ResearchResponse]:
+        """Get a research run by another process, failing it first if that process is gone"""
+        for research in cls._store.fail_orphaned(owner_alive, cls.ORPHANED_ERROR, research_id=research_id):
+            StatusHub.update(research)
+        return cls.get_research(research_id)
+    
+    @classmethod
+    def recover_orphaned_research(cls) -> int:
+        """Fail researches left pending or running by a process that crashed or restarted"""
+        failed = cls._store.fail_orphaned(owner_alive, cls.ORPHANED_ERROR)
+        for research in failed:
+            StatusHub.update(research)
+        return len(failed)
+    
+    @classmethod
+    def submit_research(cls, research: ResearchResponse, request: ResearchRequest, user_id: str) -> ResearchResponse:
+        """Store a new research and queue it for a worker; raises ResearchQueueFull when at capacity.
+        
+        A request identical (after normalization) to one already queued or running
+        attaches to that job instead: the caller gets its research_id, progress and
+        result, and the crew runs once.
+        """
+        request_key = build_research_cache_key(request.research_topic, request.research_request)
+        with cls._lock:
+            inflight_id = cls._inflight.get(request_key)
+            if inflight_id is not None:
+                cls._coalesced_count += 1
+            else:
+                if cls._pending_count >= cls.MAX_CONCURRENT_RESEARCH + cls.MAX_QUEUED_RESEARCH:
+                    raise ResearchQueueFull(
+                        f"{cls._pending_count} researches are already running or queued, try again later"
+                    )
+                cls._pending_count += 1
+                cls._inflight[request_key] = research.research_id
+                # Stored under the lock so a duplicate never sees the key before the job exists
+                cls.store_research(research.research_id, research, user_id=user_id, research_topic=request.research_topic)
+        
+        if inflight_id is not None:
+            print(f"🔗 Attaching duplicate request for '{request.research_topic}' to research {inflight_id}")
+            cls._store.add_viewer(inflight_id, user_id)
+            return cls.get_research(inflight_id)
+        
+        cls._executor.submit(cls._run_research, research.research_id, request, user_id, request_key)
+        return cls.get_research(research.research_id)
+    
+    @classmethod
+    def _run_research(cls, research_id: str, request: ResearchRequest, user_id: str, request_key: str):
+        """Run a queued research on a worker thread"""
+        try:
+            cls.execute_research(research_id, request, user_id)
+        finally:
+            with cls._lock:
+                cls._pending_count -= 1
+                # Finished results are served by the result cache from here on
+                if cls._inflight.get(request_key) == research_id:
+                    del cls._inflight[request_key]
+    
+    @classmethod
+    def get_queue_stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {
+                "running": min(cls._pending_count, cls.MAX_CONCURRENT_RESEARCH),
+                "queued": max(0, cls._pending_count - cls.MAX_CONCURRENT_RESEARCH),
+                "max_concurrency": cls.MAX_CONCURRENT_RESEARCH,
+                "max_queued": cls.MAX_QUEUED_RESEARCH,
+                "coalesced": cls._coalesced_count,
+            }
     
     @classmethod
     def update_research_status(cls, research_id: str, status: ResearchStatus, **kwargs):
         """Update research status"""
-        if research_id in cls._research_store:
-            research = cls._research_store[research_id]
+        with cls._lock:
+            research = cls._store.get(research_id, include_result=False)
+            if research is None:
+                return
             research.status = status
             
             if status == ResearchStatus.COMPLETED:
@@ -64,43 +184,108 @@ class ResearchService:
                     else:
                         research.result = str(result)
             
+                if 'cache_match' in kwargs:
+                    research.cache_match = kwargs['cache_match']
+                    research.cache_similarity = kwargs.get('cache_similarity')
+            
             if status == ResearchStatus.FAILED and 'error' in kwargs:
                 research.error = str(kwargs['error'])
             
             if 'progress' in kwargs:
                 research.progress = kwargs['progress']
+            
+            cls._store.save(research)
+            StatusHub.update(research)
     
     @classmethod
-    def update_task_progress(cls, research_id: str, task_name: str, status: TaskStatus, **kwargs):
-        """Update individual task progress"""
-        if research_id in cls._research_store:
-            research = cls._research_store[research_id]
-            if research.progress:
-                for task in research.progress.tasks:
-                    if task.task_name == task_name:
+    def update_task_progress(cls, research_id: str, task_name: str, status: Optional[TaskStatus] = None,
+                             **kwargs) -> Optional[TaskProgress]:
+        """Update individual task progress; returns the updated task, or None when it is unknown.
+        
+        ``timestamp`` (datetime) dates a status change, ``tool_used`` adds one tool
+        name to ``tools_used``; a None status leaves the status as it is.
+        """
+        with cls._lock:
+            research = cls._store.get(research_id, include_result=False)
+            if research is None or not research.progress:
+                return None
+            
+            updated = None
+            for task in research.progress.tasks:
+                if task.task_name == task_name:
+                    timestamp = kwargs.get('timestamp') or datetime.now()
+                    if status is not None:
                         task.status = status
-                        if status == TaskStatus.RUNNING:
-                            task.start_time = datetime.now()
-                            research.progress.active_task = task_name
-                        elif status == TaskStatus.COMPLETED:
-                            task.end_time = datetime.now()
-                            if task_name not in research.progress.completed_tasks:
-                                research.progress.completed_tasks.append(task_name)
-                        
-                        if 'tools_used' in kwargs:
-                            task.tools_used = kwargs['tools_used']
-                        if 'output' in kwargs:
-                            task.output = kwargs['output']
-                        break
-                
-                # Update progress percentage
-                completed_count = len(research.progress.completed_tasks)
-                total_tasks = len(research.progress.tasks)
-                research.progress.progress_percentage = int((completed_count / total_tasks) * 100)
-    
-    @classmethod
-    async def execute_research(cls, research_id: str, request: ResearchRequest, user_id: str):
-        """Execute research in background"""
+                    if status == TaskStatus.RUNNING:
+                        task.start_time = timestamp
+                        task.end_time = None
+                        task.duration_seconds = None
+                        research.progress.active_task = task_name
+                        research.progress.current_phase = task_name
+                    elif status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                        task.end_time = timestamp
+                        if task.start_time:
+                            task.duration_seconds = round((task.end_time - task.start_time).total_seconds(), 3)
+                        if status == TaskStatus.COMPLETED and task_name not in research.progress.completed_tasks:
+                            research.progress.completed_tasks.append(task_name)
+                        if research.progress.active_task == task_name:
+                            research.progress.active_task = None
+                    
+                    if 'tools_used' in kwargs:
+                        task.tools_used = kwargs['tools_used']
+                    if kwargs.get('tool_used') and kwargs['tool_used'] not in task.tools_used:
+                        task.tools_used.append(kwargs['tool_used'])
+                    if 'output' in kwargs:
+                        task.output = kwargs['output']
+                    updated = task
+                    break
+            
+            # Update progress percentage
+            completed_count = len(research.progress.completed_tasks)
+            total_tasks = len(research.progress.tasks)
+            research.progress.progress_percentage = int((completed_count / total_tasks) * 100) if total_tasks else 0
+            cls._store.save(research)
+            StatusHub.update(research)
+            if updated is not None:
+                StreamService.publish(research_id, "progress", {
+                    "task": updated.model_dump(mode="json"),
+                    "active_task": research.progress.active_task,
+                    "progress_percentage": research.progress.progress_percentage,
+                })
+            return updated
+    
+    @classmethod
+    def _progress_reporter(cls, research_id: str):
+        """Progress sink for a crew run: maps CrewAI task/tool events onto the research's tasks"""
+        current_task: Optional[str] = None
+        
+        def on_progress(event: str, data: Dict):
+            nonlocal current_task
+            timestamp = data.get('timestamp')
+            if timestamp is not None and timestamp.tzinfo is not None:
+                # CrewAI stamps events in UTC; research times are naive local time
+                timestamp = timestamp.astimezone().replace(tzinfo=None)
+            task_name = data.get('task_name') or current_task
+            if not task_name:
+                return
+            
+            if event == "task_started":
+                current_task = task_name
+                cls.update_task_progress(research_id, task_name, TaskStatus.RUNNING, timestamp=timestamp)
+            elif event == "task_completed":
+                output = data.get('output')
+                kwargs = {'output': output[:1000]} if output else {}
+                cls.update_task_progress(research_id, task_name, TaskStatus.COMPLETED, timestamp=timestamp, **kwargs)
+            elif event == "task_failed":
+                cls.update_task_progress(research_id, task_name, TaskStatus.FAILED, timestamp=timestamp)
+            elif event == "tool_used":
+                cls.update_task_progress(research_id, task_name, tool_used=data.get('tool_name'))
+        
+        return on_progress
+    
+    @classmethod
+    def execute_research(cls, research_id: str, request: ResearchRequest, user_id: str):
+        """Execute research (blocking; runs on a research worker thread)"""
         try:
             # Update status to running
             cls.update_research_status(research_id, ResearchStatus.RUNNING)
@@ -124,18 +309,31 @@ class ResearchService:
                 "final_comprehensive_report_task"
             ]
             
-            # Update first task to running
-            cls.update_task_progress(research_id, tasks[0], TaskStatus.RUNNING)
+            # Execute research, streaming tokens and task/tool progress as they happen
+            streamed = False
+            def publish_token(text: str):
+                nonlocal streamed
+                streamed = True
+                StreamService.publish(research_id, "token", {"text": text})
+            
+            def publish_reset(discarded: int):
+                StreamService.publish(research_id, "reset", {"discard": discarded})
             
-            # Execute research with progress tracking
-            result = crew.kickoff_with_rag(inputs=inputs)
+            forward_crewai_task_events()
+            progress_reporter = cls._progress_reporter(research_id)
+            with stream_tokens_to(publish_token, on_reset=publish_reset), report_progress_to(progress_reporter):
+                result = crew.kickoff_with_rag(inputs=inputs)
             
-            # Simulate task completion progression
-            for i, task_name in enumerate(tasks):
-                cls.update_task_progress(research_id, task_name, TaskStatus.COMPLETED)
-                if i < len(tasks) - 1:
-                    cls.update_task_progress(research_id, tasks[i + 1], TaskStatus.RUNNING)
-                    await asyncio.sleep(0.5)  # Brief delay for UI updates
+            # Cached results skip the crew, so no task ever reported; close them out
+            research = cls._store.get(research_id, include_result=False)
+            completed = research.progress.completed_tasks if research and research.progress else []
+            for task_name in tasks:
+                if task_name not in completed:
+                    cls.update_task_progress(research_id, task_name, TaskStatus.COMPLETED)
+            
+            # Keep the cache marker before the result is flattened to a plain string
+            cache_match = getattr(result, 'match_type', None)
+            cache_similarity = getattr(result, 'similarity', None)
             
             # Convert result to plain string immediately
             result_text = "Research completed successfully."
@@ -153,40 +351,31 @@ class ResearchService:
             cls.update_research_status(
                 research_id, 
                 ResearchStatus.COMPLETED,
-                result=result_text
+                result=result_text,
+                cache_match=cache_match,
+                cache_similarity=cache_similarity
             )
             
+            # Cached results never hit the LLM, so send them as a single chunk
+            if not streamed:
+                StreamService.publish(research_id, "token", {"text": result_text})
+            StreamService.close(research_id, ResearchStatus.COMPLETED.value)
+            
         except Exception as e:
             cls.update_research_status(
                 research_id,
                 ResearchStatus.FAILED,
                 error=str(e)
             )
+            StreamService.publish(research_id, "error", {"error": str(e)})
+            StreamService.close(research_id, ResearchStatus.FAILED.value)
     
     @classmethod
     def get_user_history(cls, user_id: str, limit: int = 10, offset: int = 0) -> ResearchHistory:
-        """Get user's research history"""
-        # Filter by user_id (simplified - in production, store user_id with research)
-        all_research = list(cls._research_store.values())
-        
-        # Convert to history items
-        history_items = [
-            ResearchHistoryItem(
-                research_id=research.research_id,
-                research_topic=research.progress.current_phase if research.progress else "Unknown",
-                status=research.status,
-                created_at=research.created_at,
-                completed_at=research.completed_at
-            )
-            for research in all_research
-        ]
-        
-        # Apply pagination
-        total = len(history_items)
-        paginated_items = history_items[offset:offset + limit]
-        
+        """Get a page of the user's research history, newest first"""
+        history_items, total = cls._store.list_for_user(user_id, limit, offset)
         return ResearchHistory(
-            history=paginated_items,
+            history=history_items,
             total=total,
             limit=limit,
             offset=offset
@@ -195,10 +384,7 @@ class ResearchService:
     @classmethod
     def delete_research(cls, research_id: str, user_id: str) -> bool:
         """Delete research (with user verification)"""
-        if research_id in cls._research_store:
-            del cls._research_store[research_id]
-            return True
-        return False
+        return cls._store.delete(research_id, user_id)
     
     @classmethod
     def check_pdf_exists(cls, research_id: str) -> bool:
@@ -0,0 +1,248 @@
+import os
+import uuid
+import socket
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from models import ResearchResponse, ResearchHistoryItem, ResearchStatus
+
+_process_token = uuid.uuid4().hex
+_process_token_pid = os.getpid()
+
+def process_owner() -> str:
+    """``host:pid:token`` of this process; the token tells a restart apart from a reused pid"""
+    global _process_token, _process_token_pid
+    if _process_token_pid != os.getpid():  # forked worker
+        _process_token, _process_token_pid = uuid.uuid4().hex, os.getpid()
+    return f"{socket.gethostname()}:{_process_token_pid}:{_process_token}"
+
+def owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process that claimed a research may still be running it.
+
+    Owners on other hosts cannot be checked and are assumed alive; rows from
+    before owners were recorded count as dead.
+    """
+    if not owner:
+        return False
+    host, pid, token = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return True
+    if owner == process_owner():
+        return True
+    if int(pid) == os.getpid():
+        return False  # our pid, earlier run (e.g. pid 1 in a restarted container)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class ResearchStore:
+    """SQLite-backed research jobs, shared by every API process on the host.
+
+    Status and progress live in an indexed table. Result bodies can run to
+    hundreds of kilobytes, so they are written to files next to the database
+    and only read when a single research is fetched, never for listings or
+    progress updates.
+    """
+
+    def __init__(self, db_path: str = "./cache/research.sqlite"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.results_dir = self.db_path.parent / "research_results"
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS research (
+                research_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                research_topic TEXT,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                completed_at REAL,
+                has_result INTEGER NOT NULL DEFAULT 0,
+                data TEXT NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(research)")}
+        if "owner" not in columns:
+            # Process running the research, so jobs of a dead process can be failed
+            self._conn.execute("ALTER TABLE research ADD COLUMN owner TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_research_user_created ON research (user_id, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_research_created ON research (created_at)")
+        # Users attached to someone else's research (identical concurrent requests share one run)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS research_viewers (
+                research_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                PRIMARY KEY (research_id, user_id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_research_viewers_user ON research_viewers (user_id)")
+        self._conn.commit()
+
+    def _result_path(self, research_id: str) -> Path:
+        return self.results_dir / f"{research_id}.md"
+
+    def save(self, research: ResearchResponse, user_id: Optional[str] = None, research_topic: Optional[str] = None,
+             owner: Optional[str] = None):
+        """Insert or update a research; user, topic and owning process are kept from the first save when omitted"""
+        if research.result is not None:
+            path = self._result_path(research.research_id)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(research.result, encoding="utf-8")
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            self._conn.execute(
+                """INSERT INTO research (research_id, user_id, research_topic, status, created_at, completed_at, has_result, data, owner)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(research_id) DO UPDATE SET
+                       user_id = COALESCE(excluded.user_id, research.user_id),
+                       research_topic = COALESCE(excluded.research_topic, research.research_topic),
+                       status = excluded.status,
+                       completed_at = excluded.completed_at,
+                       has_result = MAX(research.has_result, excluded.has_result),
+                       data = excluded.data,
+                       owner = COALESCE(excluded.owner, research.owner)""",
+                (
+                    research.research_id,
+                    user_id,
+                    research_topic,
+                    research.status.value,
+                    research.created_at.timestamp(),
+                    research.completed_at.timestamp() if research.completed_at else None,
+                    int(research.result is not None),
+                    research.model_dump_json(exclude={"result"}),
+                    owner,
+                )
+            )
+            self._conn.commit()
+
+    def get(self, research_id: str, include_result: bool = True) -> Optional[ResearchResponse]:
+        """Load a research; the result body is only read from disk when ``include_result`` is set"""
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT data, has_result FROM research WHERE research_id = ?", (research_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        research = ResearchResponse.model_validate_json(row[0])
+        if include_result and row[1]:
+            try:
+                research.result = self._result_path(research_id).read_text(encoding="utf-8")
+            except OSError:
+                research.result = None
+        return research
+
+    def fail_orphaned(self, is_alive: Callable[[Optional[str]], bool], error: str,
+                      research_id: Optional[str] = None) -> List[ResearchResponse]:
+        """Fail pending or running researches whose owning process is gone; returns them.
+
+        Checks every unfinished research, or only ``research_id`` when given.
+        """
+        unfinished = (ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
+        query = "SELECT research_id, owner, data FROM research WHERE status IN (?, ?)"
+        params: tuple = unfinished
+        if research_id is not None:
+            query += " AND research_id = ?"
+            params += (research_id,)
+
+        failed = []
+        with self.lock:
+            for row_id, owner, data in self._conn.execute(query, params).fetchall():
+                if is_alive(owner):
+                    continue
+                research = ResearchResponse.model_validate_json(data)
+                research.status = ResearchStatus.FAILED
+                research.error = error
+                research.completed_at = datetime.now()
+                cursor = self._conn.execute(
+                    "UPDATE research SET status = ?, completed_at = ?, data = ? WHERE research_id = ? AND status IN (?, ?)",
+                    (research.status.value, research.completed_at.timestamp(), research.model_dump_json(exclude={"result"}),
+                     row_id) + unfinished
+                )
+                if cursor.rowcount:
+                    failed.append(research)
+            self._conn.commit()
+        return failed
+
+    def add_viewer(self, research_id: str, user_id: str):
+        """Attach a user to a research they did not start, so it shows in their history"""
+        with self.lock:
+            self._conn.execute(
+                """INSERT OR IGNORE INTO research_viewers (research_id, user_id)
+                   SELECT research_id, ? FROM research WHERE research_id = ? AND (user_id IS NULL OR user_id != ?)""",
+                (user_id, research_id, user_id)
+            )
+            self._conn.commit()
+
+    def list_for_user(self, user_id: str, limit: int = 10, offset: int = 0) -> Tuple[List[ResearchHistoryItem], int]:
+        """A page of the user's research (started or attached to), newest first, and the user's total count"""
+        user_research = """research_id IN (
+            SELECT research_id FROM research WHERE user_id = ?
+            UNION SELECT research_id FROM research_viewers WHERE user_id = ?
+        )"""
+        with self.lock:
+            rows = self._conn.execute(
+                f"""SELECT research_id, research_topic, status, created_at, completed_at FROM research
+                   WHERE {user_research} ORDER BY created_at DESC LIMIT ? OFFSET ?""",
+                (user_id, user_id, limit, offset)
+            ).fetchall()
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM research WHERE {user_research}", (user_id, user_id)
+            ).fetchone()[0]
+
+        items = [
+            ResearchHistoryItem(
+                research_id=research_id,
+                research_topic=research_topic or "Unknown",
+                status=ResearchStatus(status),
+                created_at=datetime.fromtimestamp(created_at),
+                completed_at=datetime.fromtimestamp(completed_at) if completed_at else None
+            )
+            for research_id, research_topic, status, created_at, completed_at in rows
+        ]
+        return items, total
+
+    def delete(self, research_id: str, user_id: Optional[str] = None) -> bool:
+        """Delete a research (only the owner's, when ``user_id`` is given) and its result body.
+
+        A user attached to the research only detaches; the owner's copy stays.
+        """
+        with self.lock:
+            if user_id is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM research_viewers WHERE research_id = ? AND user_id = ?", (research_id, user_id)
+                )
+                if cursor.rowcount > 0:
+                    self._conn.commit()
+                    return True
+            if user_id is None:
+                cursor = self._conn.execute("DELETE FROM research WHERE research_id = ?", (research_id,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM research WHERE research_id = ? AND (user_id = ? OR user_id IS NULL)",
+                    (research_id, user_id)
+                )
+            deleted = cursor.rowcount > 0
+            if deleted:
+                self._conn.execute("DELETE FROM research_viewers WHERE research_id = ?", (research_id,))
+            self._conn.commit()
+
+        if deleted:
+            try:
+                self._result_path(research_id).unlink()
+            except FileNotFoundError:
+                pass
+        return deleted
@@ -0,0 +1,220 @@
+import json
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from models import ResearchResponse, ResearchStatus
+
+# (event id, event name, pre-rendered SSE frame)
+Frame = Tuple[int, str, str]
+
+class StatusChannel:
+    """Latest compact status of one research plus its live subscribers, grouped by event loop"""
+
+    def __init__(self):
+        self.version = 0
+        self.state: Dict[str, Any] = {}
+        self.result: Optional[str] = None
+        self.subscribers: Dict[asyncio.AbstractEventLoop, Set[asyncio.Queue]] = {}
+        self.finished = False
+        self.finished_at: Optional[datetime] = None
+        self.remote = False  # run by another API process; followed through the store
+        self.watched = False
+
+class StatusHub:
+    """Push research status to subscribers as compact deltas instead of full-response polling.
+
+    Each update is diffed against the last state sent, rendered to an SSE frame
+    once and handed to every subscriber of the research; events cross into each
+    event loop with a single callback, however many subscribers it serves. Task
+    outputs never go out, and the result is sent once when the research completes.
+    """
+
+    MAX_FINISHED_CHANNELS = 500
+    HEARTBEAT_SECONDS = 15.0
+
+    _channels: Dict[str, StatusChannel] = {}
+    _lock = threading.Lock()
+    _watchers: Set[asyncio.Task] = set()  # strong refs, so running polls are not garbage collected
+
+    @staticmethod
+    def compact(research: ResearchResponse) -> Dict[str, Any]:
+        """The fields a status view needs, without outputs or the result"""
+        progress = research.progress
+        return {
+            "status": research.status.value,
+            "phase": progress.current_phase if progress else None,
+            "active_task": progress.active_task if progress else None,
+            "percentage": progress.progress_percentage if progress else 0,
+            "tasks": {
+                task.task_name: {
+                    "status": task.status.value,
+                    "agent": task.agent,
+                    "tools_used": list(task.tools_used),
+                    "duration_seconds": task.duration_seconds,
+                }
+                for task in (progress.tasks if progress else [])
+            },
+            "error": research.error,
+            "cache_match": research.cache_match,
+        }
+
+    @staticmethod
+    def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Changed top-level fields; for ``tasks`` only the tasks that changed"""
+        delta = {}
+        for key, value in new.items():
+            if key == "tasks":
+                old_tasks = old.get("tasks", {})
+                changed = {name: task for name, task in value.items() if old_tasks.get(name) != task}
+                if changed:
+                    delta["tasks"] = changed
+            elif key not in old or old[key] != value:
+                delta[key] = value
+        return delta
+
+    @staticmethod
+    def format_sse(event_id: int, event: str, data: Any) -> str:
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+    @classmethod
+    def has_channel(cls, research_id: str) -> bool:
+        with cls._lock:
+            return research_id in cls._channels
+
+    @classmethod
+    def update(cls, research: ResearchResponse, remote: bool = False):
+        """Publish what changed since the last update (thread-safe); a finished research is sealed.
+        
+        ``remote`` marks a channel created for a research this process does not run.
+        """
+        state = cls.compact(research)
+        with cls._lock:
+            channel = cls._channels.get(research.research_id)
+            if channel is None:
+                channel = cls._channels[research.research_id] = StatusChannel()
+                channel.remote = remote
+                cls._prune_finished_channels()
+            if channel.finished:
+                return
+
+            frames: List[Frame] = []
+            delta = cls.diff(channel.state, state)
+            if delta:
+                channel.version += 1
+                frames.append((channel.version, "delta", cls.format_sse(channel.version, "delta", delta)))
+            channel.state = state
+
+            if research.status in (ResearchStatus.COMPLETED, ResearchStatus.FAILED):
+                channel.finished = True
+                channel.finished_at = datetime.now()
+                if research.status == ResearchStatus.COMPLETED and research.result is not None:
+                    channel.result = research.result
+                    channel.version += 1
+                    frames.append((channel.version, "result", cls.format_sse(
+                        channel.version, "result", {"result": research.result, "completed_at": research.completed_at}
+                    )))
+                channel.version += 1
+                frames.append((channel.version, "done", cls.format_sse(
+                    channel.version, "done", {"status": research.status.value}
+                )))
+
+            if frames:
+                # Scheduled under the lock so every loop sees updates in publish order
+                for loop, queues in channel.subscribers.items():
+                    loop.call_soon_threadsafe(cls._deliver, tuple(queues), frames)
+
+    @staticmethod
+    def _deliver(queues: Tuple[asyncio.Queue, ...], frames: List[Frame]):
+        for queue in queues:
+            for frame in frames:
+                queue.put_nowait(frame)
+
+    @classmethod
+    async def subscribe(cls, research_id: str) -> AsyncIterator[str]:
+        """Yield SSE text: a snapshot of the current state, then deltas until the research is done"""
+        queue: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        with cls._lock:
+            channel = cls._channels.get(research_id)
+            if channel is None:
+                return
+            backlog = [cls.format_sse(channel.version, "snapshot", channel.state)]
+            finished = channel.finished
+            if finished:
+                if channel.result is not None:
+                    backlog.append(cls.format_sse(channel.version, "result", {"result": channel.result}))
+                backlog.append(cls.format_sse(channel.version, "done", {"status": channel.state.get("status")}))
+            else:
+                channel.subscribers.setdefault(loop, set()).add(queue)
+
+        try:
+            for text in backlog:
+                yield text
+            if finished:
+                return
+
+            while True:
+                try:
+                    _, event, text = await asyncio.wait_for(queue.get(), cls.HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"  # keeps idle proxies from closing the connection
+                    continue
+                yield text
+                if event == "done":
+                    return
+        finally:
+            with cls._lock:
+                queues = channel.subscribers.get(loop)
+                if queues is not None:
+                    queues.discard(queue)
+                    if not queues:
+                        del channel.subscribers[loop]
+
+    @classmethod
+    def watch(cls, research_id: str, load: Callable[[], Optional[ResearchResponse]], interval: float = 2.0):
+        """Follow a remote research: one store poll per interval feeds every local subscriber.
+        
+        No-op for researches run by this process, which push their own updates.
+        Polling stops once the research finishes or its last subscriber leaves.
+        """
+        with cls._lock:
+            channel = cls._channels.get(research_id)
+            if channel is None or not channel.remote or channel.finished or channel.watched:
+                return
+            channel.watched = True
+
+        async def poll():
+            try:
+                while True:
+                    await asyncio.sleep(interval)
+                    with cls._lock:
+                        if channel.finished or not channel.subscribers:
+                            return
+                    research = await asyncio.to_thread(load)
+                    if research is None:
+                        return
+                    cls.update(research)
+            finally:
+                with cls._lock:
+                    channel.watched = False
+
+        task = asyncio.get_running_loop().create_task(poll())
+        cls._watchers.add(task)
+        task.add_done_callback(cls._watchers.discard)
+
+    @classmethod
+    def subscriber_count(cls, research_id: str) -> int:
+        with cls._lock:
+            channel = cls._channels.get(research_id)
+            return sum(len(queues) for queues in channel.subscribers.values()) if channel else 0
+
+    @classmethod
+    def _prune_finished_channels(cls):
+        """Forget the oldest finished channels beyond MAX_FINISHED_CHANNELS (caller holds the lock)"""
+        finished = [(channel.finished_at, research_id) for research_id, channel in cls._channels.items() if channel.finished]
+        finished.sort()
+        for _, research_id in finished[:max(0, len(finished) - cls.MAX_FINISHED_CHANNELS)]:
+            del cls._channels[research_id]
@@ -0,0 +1,152 @@
+import json
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# (event id, event name, data); an id is the stream's cursor after the event
+Entry = Tuple[int, str, Dict[str, Any]]
+
+class ResearchStream:
+    """Replayable event log of one research run plus its live subscribers.
+    
+    Consecutive tokens are coalesced into one text entry, so the log grows with
+    the number of non-token events rather than with every token. Event ids are a
+    cursor: a token advances it by its length and any other event by one, which
+    lets a reconnect resume in the middle of coalesced text.
+    """
+
+    def __init__(self):
+        self.cursor = 0
+        # (cursor before the entry, event, data); token entries hold the coalesced text
+        self.entries: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self.closed = False
+        self.closed_at: Optional[datetime] = None
+
+    def append(self, event: str, data: Dict[str, Any]) -> Entry:
+        start = self.cursor
+        if event == "token":
+            text = data.get("text", "")
+            self.cursor += len(text)
+            if self.entries and self.entries[-1][1] == "token":
+                previous_start, _, previous = self.entries[-1]
+                self.entries[-1] = (previous_start, "token", {"text": previous["text"] + text})
+            else:
+                self.entries.append((start, "token", {"text": text}))
+        else:
+            self.cursor += 1
+            self.entries.append((start, event, data))
+        return (self.cursor, event, data)
+
+    def replay(self, last_event_id: int = 0) -> List[Entry]:
+        """Events after ``last_event_id``, tokens merged into as few events as possible"""
+        backlog = []
+        for start, event, data in self.entries:
+            end = start + (len(data["text"]) if event == "token" else 1)
+            if end <= last_event_id:
+                continue
+            if event == "token" and start < last_event_id:
+                data = {"text": data["text"][last_event_id - start:]}
+            backlog.append((end, event, data))
+        return backlog
+
+class StreamService:
+    """Server-sent event streams for research runs.
+
+    Producers publish from any thread (the crew runs off the event loop);
+    subscribers replay what they missed and then follow live events. A
+    ``reset`` event (``{"discard": n}``) retracts the last n characters of
+    streamed text when a failed LLM attempt is retried or falls back.
+    """
+
+    MAX_CLOSED_STREAMS = 100
+    CLOSED_STREAM_TTL = timedelta(minutes=30)
+
+    _streams: Dict[str, ResearchStream] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def open(cls, research_id: str):
+        """Create the stream for a research run"""
+        with cls._lock:
+            if research_id not in cls._streams:
+                cls._streams[research_id] = ResearchStream()
+            cls._prune_closed_streams()
+
+    @classmethod
+    def publish(cls, research_id: str, event: str, data: Dict[str, Any]):
+        """Append an event and wake subscribers (thread-safe)"""
+        with cls._lock:
+            stream = cls._streams.get(research_id)
+            if stream is None or stream.closed:
+                return
+            entry = stream.append(event, data)
+            subscribers = list(stream.subscribers)
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, entry)
+
+    @classmethod
+    def close(cls, research_id: str, status: str):
+        """Publish the final ``done`` event; subscribers disconnect after it"""
+        cls.publish(research_id, "done", {"status": status})
+        with cls._lock:
+            stream = cls._streams.get(research_id)
+            if stream is not None:
+                stream.closed = True
+                stream.closed_at = datetime.now()
+
+    @classmethod
+    def has_stream(cls, research_id: str) -> bool:
+        with cls._lock:
+            return research_id in cls._streams
+
+    @classmethod
+    async def subscribe(cls, research_id: str, last_event_id: int = 0) -> AsyncIterator[Entry]:
+        """Yield events after ``last_event_id``, then live ones until the run is done"""
+        queue: asyncio.Queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+
+        with cls._lock:
+            stream = cls._streams.get(research_id)
+            if stream is None:
+                return
+            backlog = stream.replay(last_event_id)
+            closed = stream.closed
+            if not closed:
+                stream.subscribers.append(subscriber)
+
+        try:
+            for entry in backlog:
+                yield entry
+            if closed:
+                return
+
+            last_seen = backlog[-1][0] if backlog else last_event_id
+            while True:
+                entry = await queue.get()
+                if entry[0] <= last_seen:
+                    continue  # already replayed from the backlog
+                yield entry
+                if entry[1] == "done":
+                    return
+        finally:
+            with cls._lock:
+                if subscriber in stream.subscribers:
+                    stream.subscribers.remove(subscriber)
+
+    @staticmethod
+    def format_sse(event_id: int, event: str, data: Dict[str, Any]) -> str:
+        return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    @classmethod
+    def _prune_closed_streams(cls):
+        """Forget finished streams older than CLOSED_STREAM_TTL, and the oldest beyond MAX_CLOSED_STREAMS
+        (caller holds the lock)"""
+        closed = [(stream.closed_at, research_id) for research_id, stream in cls._streams.items() if stream.closed]
+        closed.sort()
+        expired = datetime.now() - cls.CLOSED_STREAM_TTL
+        for i, (closed_at, research_id) in enumerate(closed):
+            if i < len(closed) - cls.MAX_CLOSED_STREAMS or closed_at < expired:
+                del cls._streams[research_id]
@@ -30,6 +30,8 @@ class BenchmarkingInput(ChainInput):
 class CompetitiveBenchmarkingChain(BaseChain[CompetitiveBenchmarking]):
     """LCEL chain for competitive benchmarking"""
     
+    context_inputs = ("context_data",)
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("analysis", "competitive_benchmarking")
         super().__init__(llm, CompetitiveBenchmarking, system_prompt)
@@ -30,6 +30,8 @@ class SWOTInput(ChainInput):
 class SWOTAnalysisChain(BaseChain[SWOTAnalysis]):
     """LCEL chain for SWOT analysis"""
     
+    context_inputs = ("context_data", "competitor_data", "market_data", "company_data")
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("analysis", "swot_analysis")
         super().__init__(llm, SWOTAnalysis, system_prompt)
@@ -28,6 +28,8 @@ class TrendsInput(ChainInput):
 class MarketTrendsChain(BaseChain[MarketTrends]):
     """LCEL chain for market trends analysis"""
     
+    context_inputs = ("market_data",)
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("analysis", "market_trends")
         super().__init__(llm, MarketTrends, system_prompt)
@@ -5,34 +5,158 @@ from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from typing import TypeVar, Generic, Optional, Any, Dict
+from typing import TypeVar, Generic, Optional, Any, Dict, List, Tuple
+import os
 import logging
+import threading
+
+from ..utils.tokens import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
+TRIM_MARKER = "\n[... trimmed to fit the prompt budget]"
+
 class BaseChain(Generic[T]):
     """Base LCEL chain with error handling and validation"""
     
-    def __init__(self, llm, output_model: type[T], system_prompt: str):
+    # Optional context inputs (RAG/tool data), least important first: when a prompt
+    # is over its model's input budget these are trimmed in this order. Everything
+    # else (system prompt, format instructions, required inputs) is always sent whole.
+    context_inputs: Tuple[str, ...] = ()
+    
+    # Per-chain token totals across all instances: chain name -> counters
+    _token_stats: Dict[str, Dict[str, int]] = {}
+    _token_stats_lock = threading.Lock()
+    
+    def __init__(self, llm, output_model: type[T], system_prompt: str, few_shot_examples: Optional[List[str]] = None):
         self.llm = llm
         self.output_parser = PydanticOutputParser(pydantic_object=output_model)
         self.system_prompt = system_prompt
+        # Rendered examples, most useful first; dropped from the end before any context is trimmed
+        self.few_shot_examples = list(few_shot_examples or [])
     
-    def create_chain(self) -> Runnable:
-        """Create LCEL chain: Prompt -> LLM -> Parser"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt + "\n\n{format_instructions}"),
+    def create_prompt(self) -> ChatPromptTemplate:
+        # Examples go in as a variable, so the braces in their JSON are never parsed as template fields
+        examples = "{few_shot_examples}" if self.few_shot_examples else ""
+        # Registry prompts already place {format_instructions}; appending it again would send it twice
+        system_prompt = self.system_prompt
+        if "{format_instructions}" not in system_prompt:
+            system_prompt += "\n\n{format_instructions}"
+        return ChatPromptTemplate.from_messages([
+            ("system", examples + system_prompt),
             ("human", "{input}")
         ])
+    
+    def create_chain(self) -> Runnable:
+        """Create LCEL chain: Prompt -> LLM -> Parser"""
+        return self.create_prompt() | self.llm | self.output_parser
+    
+    def get_input_budget(self) -> int:
+        """Input token budget of the chain's model (0 = unlimited)"""
+        model_manager = getattr(self.llm, "model_manager", None)
+        primary_model = getattr(self.llm, "primary_model", None)
+        if model_manager is not None and primary_model in getattr(model_manager, "model_input_budgets", {}):
+            return model_manager.model_input_budgets[primary_model]
+        return int(os.getenv("CHAIN_INPUT_TOKEN_BUDGET", "0"))
+    
+    @staticmethod
+    def _trim_value(value: Any, excess_tokens: int) -> Any:
+        """Shrink a context value by roughly ``excess_tokens``: drop trailing items or lines"""
+        if isinstance(value, dict):
+            items = list(value.items())
+            while items and excess_tokens > 0:
+                excess_tokens -= estimate_tokens(str(items.pop()))
+            return dict(items)
+        if isinstance(value, (list, tuple)):
+            items = list(value)
+            while items and excess_tokens > 0:
+                excess_tokens -= estimate_tokens(str(items.pop()))
+            return items
         
-        return prompt | self.llm | self.output_parser
+        text = str(value)
+        if text.endswith(TRIM_MARKER):
+            text = text[:-len(TRIM_MARKER)]  # trimmed before; cut further rather than mark twice
+        # Dense text (JSON, tables) has fewer characters per token than prose
+        chars_per_token = len(text) / max(1, estimate_tokens(text))
+        keep_chars = int(len(text) - excess_tokens * chars_per_token) - len(TRIM_MARKER)
+        if keep_chars <= 0:
+            return ""
+        # Cut at a line (or at least a word) boundary so the model never sees half a sentence
+        cut = text.rfind("\n", 0, keep_chars)
+        if cut <= 0:
+            cut = text.rfind(" ", 0, keep_chars)
+        return text[:cut if cut > 0 else keep_chars] + TRIM_MARKER
+    
+    def fit_to_budget(self, prompt: ChatPromptTemplate, inputs: Dict[str, Any],
+                      budget: int) -> Tuple[Dict[str, Any], int, List[str]]:
+        """Trim few-shot examples, then context inputs, until the rendered prompt fits ``budget``.
+        
+        Returns the inputs to send, their estimated token count and the names of
+        the trimmed sections. Required sections are never touched, so a prompt
+        can stay over budget if they alone exceed it.
+        """
+        inputs = dict(inputs)
+        if self.few_shot_examples:
+            inputs["few_shot_examples"] = list(self.few_shot_examples)
+        
+        def render(values: Dict[str, Any]) -> Dict[str, Any]:
+            if "few_shot_examples" in values:
+                values = {**values, "few_shot_examples": "".join(values["few_shot_examples"])}
+            return values
+        
+        def measure() -> int:
+            messages = prompt.format_messages(**render(inputs))
+            return sum(estimate_tokens(str(message.content)) for message in messages)
+        
+        tokens = measure()
+        trimmed = []
+        if budget > 0:
+            while inputs.get("few_shot_examples") and tokens > budget:
+                inputs["few_shot_examples"].pop()
+                tokens = measure()
+                if "few_shot_examples" not in trimmed:
+                    trimmed.append("few_shot_examples")
+            
+            for name in self.context_inputs:
+                # Token estimates of a value and of its rendering differ, so trim until it fits or is gone
+                while tokens > budget and inputs.get(name):
+                    value = self._trim_value(inputs[name], tokens - budget)
+                    if value == inputs[name]:
+                        value = type(value)()
+                    inputs[name] = value
+                    tokens = measure()
+                    if name not in trimmed:
+                        trimmed.append(name)
+                if tokens <= budget:
+                    break
+        
+        return render(inputs), tokens, trimmed
+    
+    def _record_tokens(self, tokens_in: int, tokens_out: int, trimmed: bool):
+        with self._token_stats_lock:
+            stats = self._token_stats.setdefault(
+                self.__class__.__name__, {"calls": 0, "tokens_in": 0, "tokens_out": 0, "trimmed_calls": 0}
+            )
+            stats["calls"] += 1
+            stats["tokens_in"] += tokens_in
+            stats["tokens_out"] += tokens_out
+            stats["trimmed_calls"] += int(trimmed)
+    
+    @classmethod
+    def get_token_stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Token totals and average prompt size per chain"""
+        with cls._token_stats_lock:
+            return {
+                name: {**stats, "avg_tokens_in": round(stats["tokens_in"] / stats["calls"]) if stats["calls"] else 0}
+                for name, stats in cls._token_stats.items()
+            }
     
     def invoke(self, input_data: Dict[str, Any]) -> T:
         """Invoke chain with proper error handling"""
         try:
-            chain = self.create_chain()
+            prompt = self.create_prompt()
             
             # Prepare final input with format instructions
             final_input = {
@@ -40,10 +164,23 @@ class BaseChain(Generic[T]):
                 "format_instructions": self.output_parser.get_format_instructions()
             }
             
-            result = chain.invoke(final_input)
+            # Fit the prompt to the model's input budget before anything is sent
+            budget = self.get_input_budget()
+            final_input, tokens_in, trimmed = self.fit_to_budget(prompt, final_input, budget)
+            if trimmed:
+                logger.info(f"✂️ Chain {self.__class__.__name__} trimmed {', '.join(trimmed)} to fit {budget} tokens")
+            if budget and tokens_in > budget:
+                logger.warning(f"⚠️ Chain {self.__class__.__name__} required sections alone need {tokens_in} tokens (budget {budget})")
+            
+            raw_output = (prompt | self.llm).invoke(final_input)
+            tokens_out = estimate_tokens(str(raw_output))
+            self._record_tokens(tokens_in, tokens_out, bool(trimmed))
+            logger.info(f"📏 Chain {self.__class__.__name__}: ~{tokens_in} tokens in, ~{tokens_out} tokens out")
+            
+            result = self.output_parser.invoke(raw_output)
             logger.info(f"✅ Chain {self.__class__.__name__} executed successfully")
             return result
-            
+        
         except Exception as e:
             logger.error(f"❌ Chain {self.__class__.__name__} failed: {str(e)}")
             raise
@@ -30,6 +30,8 @@ class CompanyResearchInput(ChainInput):
 class CompanyResearchChain(BaseChain[CompanyResearch]):
     """LCEL chain for company research"""
     
+    context_inputs = ("industry_context", "data_sources")
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("research", "company_research")
         super().__init__(llm, CompanyResearch, system_prompt)
@@ -22,6 +22,8 @@ class DataCollectionInput(ChainInput):
 class DataCollectionChain(BaseChain[CollectedData]):
     """LCEL chain for data collection"""
     
+    context_inputs = ("tertiary_sources", "secondary_sources", "primary_sources")
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("research", "data_collection")
         super().__init__(llm, CollectedData, system_prompt)
@@ -28,6 +28,8 @@ class IndustryAnalysisInput(ChainInput):
 class IndustryAnalysisChain(BaseChain[IndustryAnalysis]):
     """LCEL chain for industry analysis"""
     
+    context_inputs = ("industry_data",)
+    
     def __init__(self, llm):
         system_prompt = prompt_registry.get_prompt("research", "industry_analysis")
         super().__init__(llm, IndustryAnalysis, system_prompt)
@@ -1,18 +1,45 @@
 # src/marketresearch/config/gemini_config.py
 import os
+import json
 import time
+import queue
+import sqlite3
+import asyncio
 import threading
+import contextvars
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Dict, Any, Deque, Iterator, List, Optional, Tuple
 import google.generativeai as genai
 from langchain_core.language_models import BaseLLM
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
-from langchain_core.outputs import LLMResult
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
+from langchain_core.outputs import LLMResult, GenerationChunk
 from pydantic import Field
 from crewai import LLM
 
+try:
+    from ..streaming import (
+        emit_reset, emit_token, forward_crewai_stream_chunks, get_reset_sink, get_token_sink, stream_tokens_to,
+        streaming_enabled
+    )
+    from ..utils.tokens import estimate_tokens
+except ImportError:
+    # Also imported as the top-level ``config`` package (see chains/__init__.py)
+    from marketresearch.streaming import (
+        emit_reset, emit_token, forward_crewai_stream_chunks, get_reset_sink, get_token_sink, stream_tokens_to,
+        streaming_enabled
+    )
+    from marketresearch.utils.tokens import estimate_tokens
+
 class RateLimiter:
-    """Proper rate limiter with token bucket algorithm"""
+    """Sliding-window rate limiter with first-come-first-served waiting.
+    
+    Request timestamps live in deques, so expiring old ones is amortized O(1),
+    and waiters sleep on their own condition until exactly when a slot frees
+    instead of polling.
+    """
     
     def __init__(self, requests_per_minute: int = 15, requests_per_day: int = 1500):
         self.requests_per_minute = requests_per_minute
@@ -22,72 +49,418 @@ class RateLimiter:
         
         # Thread-safe data structures
         self.lock = threading.Lock()
-        self.minute_calls = []
-        self.day_calls = []
-        self.model_usage = {}  # Track usage per model
+        self.minute_calls: Deque[float] = deque()
+        self.day_calls: Deque[float] = deque()
+        self.model_usage: Dict[str, Deque[float]] = {}  # Track usage per model
+        # One condition per waiter, in arrival order; only the head may take a slot
+        self._waiters: Deque[threading.Condition] = deque()
+    
+    def _evict(self, now: float):
+        """Drop timestamps that left their window (caller holds the lock)"""
+        while self.minute_calls and now - self.minute_calls[0] >= self.minute_window:
+            self.minute_calls.popleft()
+        while self.day_calls and now - self.day_calls[0] >= self.day_window:
+            self.day_calls.popleft()
+    
+    def _time_until_available(self, now: float) -> Tuple[float, str]:
+        """Seconds until one more request fits, and the window that is full (caller holds the lock)"""
+        self._evict(now)
+        wait_time, window = 0.0, ""
+        for calls, limit, length, name in (
+            (self.minute_calls, self.requests_per_minute, self.minute_window, "Minute"),
+            (self.day_calls, self.requests_per_day, self.day_window, "Daily"),
+        ):
+            if len(calls) >= limit:
+                # The slot frees once enough calls expire to drop below the limit
+                frees_at = calls[len(calls) - limit] + length if limit > 0 else float("inf")
+                if frees_at - now > wait_time:
+                    wait_time, window = frees_at - now, name
+        return wait_time, window
+    
+    def _record(self, now: float, model_name: str):
+        self.minute_calls.append(now)
+        self.day_calls.append(now)
         
+        # Track model usage
+        usage = self.model_usage.setdefault(model_name, deque())
+        usage.append(now)
+        while now - usage[0] >= self.day_window:
+            usage.popleft()
+    
+    def _reserve(self, now: float, model_name: str, record: bool) -> Tuple[float, str]:
+        """Check for a free slot and, if there is one and ``record`` is set, take it (caller holds the lock)"""
+        wait_time, window = self._time_until_available(now)
+        if wait_time <= 0 and record:
+            self._record(now, model_name)
+        return wait_time, window
+    
+    def sub_limiter(self, scope: str, requests_per_minute: int, minute_window: float = 60) -> "RateLimiter":
+        """A limiter for a narrower scope (e.g. one model) with the same daily budget"""
+        limiter = RateLimiter(requests_per_minute=requests_per_minute, requests_per_day=self.requests_per_day)
+        limiter.minute_window = minute_window
+        limiter.lock = self.lock  # so reserve_with can take both slots under one lock
+        return limiter
+    
+    def reserve_with(self, sub: Optional["RateLimiter"], model_name: str) -> float:
+        """Take a slot here and in ``sub`` (a sub-limiter of this one) together, or in neither.
+        
+        Returns 0 once both are taken, otherwise the seconds until both have room.
+        """
+        with self.lock:
+            return self._reserve_with(time.time(), sub, model_name)
+    
+    def _reserve_with(self, now: float, sub: Optional["RateLimiter"], model_name: str) -> float:
+        """reserve_with with the lock held"""
+        wait_time = self._time_until_available(now)[0]
+        if sub is not None:
+            wait_time = max(wait_time, sub._time_until_available(now)[0])
+        if wait_time <= 0:
+            self._record(now, model_name)
+            if sub is not None:
+                sub._record(now, model_name)
+        return wait_time
+    
     def can_make_request(self, model_name: str) -> bool:
         """Check if request can be made without exceeding limits"""
         with self.lock:
-            now = time.time()
-            
-            # Clean old entries
-            self.minute_calls = [t for t in self.minute_calls if now - t < self.minute_window]
-            self.day_calls = [t for t in self.day_calls if now - t < self.day_window]
-            
-            # Check limits
-            if (len(self.minute_calls) >= self.requests_per_minute or 
-                len(self.day_calls) >= self.requests_per_day):
-                return False
-                
-            return True
+            return not self._waiters and self._time_until_available(time.time())[0] <= 0
     
     def record_request(self, model_name: str):
         """Record that a request was made"""
         with self.lock:
-            now = time.time()
-            self.minute_calls.append(now)
-            self.day_calls.append(now)
-            
-            # Track model usage
-            if model_name not in self.model_usage:
-                self.model_usage[model_name] = []
-            self.model_usage[model_name].append(now)
+            self._record(time.time(), model_name)
     
-    def wait_if_needed(self, model_name: str):
+    def time_until_available(self) -> float:
+        """Seconds until the next request fits in both windows"""
+        with self.lock:
+            return max(0.0, self._time_until_available(time.time())[0])
+    
+    def _wait(self, model_name: str, record: bool) -> float:
+        """Queue behind earlier callers until a slot is free; returns seconds waited"""
+        start = time.time()
+        with self.lock:
+            turn = threading.Condition(self.lock)
+            self._waiters.append(turn)
+            announced = False
+            try:
+                while True:
+                    if self._waiters[0] is not turn:
+                        turn.wait()  # woken when we reach the head of the queue
+                        continue
+                    wait_time, window = self._reserve(time.time(), model_name, record)
+                    if wait_time <= 0:
+                        break
+                    if not announced:
+                        print(f"🚫 {window} rate limit approaching. Waiting {wait_time:.1f}s...")
+                        announced = True
+                    turn.wait(min(wait_time, threading.TIMEOUT_MAX))
+            finally:
+                self._waiters.remove(turn)  # the head on success, so this is O(1)
+                if self._waiters:
+                    self._waiters[0].notify()
+        return time.time() - start
+    
+    def wait_if_needed(self, model_name: str) -> float:
         """Wait if rate limit would be exceeded"""
-        while not self.can_make_request(model_name):
-            # Calculate wait time
-            now = time.time()
-            if self.minute_calls:
-                oldest_in_minute = min(self.minute_calls)
-                time_since_oldest = now - oldest_in_minute
-                if time_since_oldest < self.minute_window and len(self.minute_calls) >= self.requests_per_minute:
-                    wait_time = self.minute_window - time_since_oldest + 1
-                    print(f"🚫 Minute rate limit approaching. Waiting {wait_time:.1f}s...")
-                    time.sleep(wait_time)
-                    continue
-            
-            if self.day_calls:
-                oldest_in_day = min(self.day_calls)
-                time_since_oldest = now - oldest_in_day
-                if time_since_oldest < self.day_window and len(self.day_calls) >= self.requests_per_day:
-                    wait_time = self.day_window - time_since_oldest + 1
-                    print(f"🚫 Daily rate limit approaching. Waiting {wait_time:.1f}s...")
-                    time.sleep(wait_time)
-                    continue
-            
-            # Small delay if we're close to limits
-            time.sleep(2)
+        return self._wait(model_name, record=False)
+    
+    def acquire(self, model_name: str) -> float:
+        """Wait for a slot and record the request atomically, so concurrent callers cannot overshoot"""
+        return self._wait(model_name, record=True)
+
+class SharedRateLimiter(RateLimiter):
+    """RateLimiter whose request log lives in SQLite, so all processes on a host share one budget.
+    
+    Each reservation runs in an IMMEDIATE transaction, which makes check-and-record
+    atomic across processes (several uvicorn workers, or the API next to a CLI
+    run). The log survives restarts, so the daily budget is not reset by one.
+    Limiters sharing a database are told apart by ``scope``.
+    """
+    
+    def __init__(self, db_path: str, requests_per_minute: int = 15, requests_per_day: int = 1500,
+                 scope: str = "global"):
+        super().__init__(requests_per_minute, requests_per_day)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.scope = scope
+        
+        # Autocommit mode, so reservations can open their own IMMEDIATE transactions
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_calls (
+                scope TEXT NOT NULL,
+                ts REAL NOT NULL,
+                model TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_calls_scope_ts ON rate_limit_calls (scope, ts)")
+    
+    def _time_until_available(self, now: float) -> Tuple[float, str]:
+        wait_time, window = 0.0, ""
+        for limit, length, name in (
+            (self.requests_per_minute, self.minute_window, "Minute"),
+            (self.requests_per_day, self.day_window, "Daily"),
+        ):
+            if limit <= 0:
+                return float("inf"), name
+            # The limit-th most recent call in the window is the one whose expiry frees a slot
+            row = self._conn.execute(
+                "SELECT ts FROM rate_limit_calls WHERE scope = ? AND ts > ? ORDER BY ts DESC LIMIT 1 OFFSET ?",
+                (self.scope, now - length, limit - 1)
+            ).fetchone()
+            if row is not None and row[0] + length - now > wait_time:
+                wait_time, window = row[0] + length - now, name
+        return wait_time, window
+    
+    def _record(self, now: float, model_name: str):
+        self._conn.execute("INSERT INTO rate_limit_calls (scope, ts, model) VALUES (?, ?, ?)",
+                           (self.scope, now, model_name))
+        self._conn.execute("DELETE FROM rate_limit_calls WHERE scope = ? AND ts <= ?",
+                           (self.scope, now - self.day_window))
+    
+    def _reserve(self, now: float, model_name: str, record: bool) -> Tuple[float, str]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read the clock: taking the write lock may have waited on another process
+            result = super()._reserve(time.time(), model_name, record)
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return result
+    
+    def reserve_with(self, sub: Optional["RateLimiter"], model_name: str) -> float:
+        # One IMMEDIATE transaction covers both scopes, so other processes see both slots or neither
+        with self.lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                wait_time = self._reserve_with(time.time(), sub, model_name)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return wait_time
+    
+    def record_request(self, model_name: str):
+        with self.lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._record(time.time(), model_name)
+            self._conn.execute("COMMIT")
+    
+    def sub_limiter(self, scope: str, requests_per_minute: int, minute_window: float = 60) -> "SharedRateLimiter":
+        limiter = SharedRateLimiter(str(self.db_path), requests_per_minute, self.requests_per_day,
+                                    scope=f"{self.scope}/{scope}")
+        limiter.minute_window = minute_window
+        # Share this limiter's connection and lock, so reserve_with takes both slots in one transaction
+        limiter._conn.close()
+        limiter._conn = self._conn
+        limiter.lock = self.lock
+        return limiter
+
+class TokenBucket:
+    """Bucket holding up to ``capacity`` tokens, refilled evenly over ``per_seconds``.
+    
+    Not thread-safe on its own; ModelRateLimiter serializes access.
+    """
+    
+    def __init__(self, capacity: float, per_seconds: float = 60):
+        self.capacity = capacity
+        self.refill_rate = capacity / per_seconds
+        self.tokens = capacity
+        self.updated_at = time.time()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+    
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens are available (requests larger than the bucket wait for a full one)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.refill_rate)
+    
+    def consume(self, amount: float, now: float):
+        """Take tokens; the balance may go negative when usage is settled after the fact"""
+        self._refill(now)
+        self.tokens -= amount
+
+class ModelRateLimiter:
+    """Per-model request windows (and optional token buckets) in front of a global RateLimiter.
+    
+    Each model gets its own requests-per-minute budget from ``model_limits``,
+    so falling back to another model draws on fresh capacity, while the global
+    limiter still caps the total across models. Budgets, token buckets and
+    backoff are kept per real model (``model_names`` maps model keys to them):
+    keys backed by the same model share its quota, at the smallest of their
+    limits. Request counts use exact
+    sliding windows, since a bucket refilled over a minute can let through up to
+    twice the limit within one minute; tokens per minute, which are only
+    estimated up front, use token buckets.
+    """
+    
+    def __init__(self, global_limiter: RateLimiter, model_limits: Dict[str, int],
+                 token_limits: Optional[Dict[str, int]] = None, window_seconds: float = 60,
+                 backoff_seconds: float = 5, max_backoff_seconds: float = 60,
+                 model_names: Optional[Dict[str, str]] = None):
+        self.global_limiter = global_limiter
+        self.model_names = dict(model_names or {})
+        
+        def per_real_model(limits: Dict[str, int]) -> Dict[str, int]:
+            merged: Dict[str, int] = {}
+            for model_key, limit in limits.items():
+                real_model = self._real_model(model_key)
+                merged[real_model] = min(merged.get(real_model, limit), limit)
+            return merged
+        
+        self.model_limiters = {}
+        for real_model, limit in per_real_model(model_limits).items():
+            # Same backend as the global limiter, so shared budgets are shared per model too
+            self.model_limiters[real_model] = global_limiter.sub_limiter(real_model, limit, window_seconds)
+        # Tokens-per-minute limits are optional; 0 or missing means unlimited
+        self.condition = threading.Condition()
+        self.token_buckets = {
+            real_model: TokenBucket(limit, window_seconds)
+            for real_model, limit in per_real_model(
+                {model_key: limit for model_key, limit in (token_limits or {}).items() if limit}
+            ).items()
+        }
+        # Adaptive backoff: only models that recently answered 429 are slowed down
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._backoff_until: Dict[str, float] = {}
+        self._backoff_strikes: Dict[str, int] = {}
+    
+    def _real_model(self, model_name: str) -> str:
+        """The model whose quota a model key draws on"""
+        return self.model_names.get(model_name, model_name)
+    
+    def _token_wait(self, model_name: str, tokens: int, now: float) -> float:
+        """Seconds until the model is out of backoff and its token bucket holds ``tokens`` (caller holds the condition)"""
+        wait_time = max(0.0, self._backoff_until.get(model_name, 0.0) - now)
+        if tokens and model_name in self.token_buckets:
+            wait_time = max(wait_time, self.token_buckets[model_name].time_until(tokens, now))
+        return wait_time
+    
+    def _model_wait(self, model_name: str, tokens: int) -> float:
+        model_name = self._real_model(model_name)
+        limiter = self.model_limiters.get(model_name)
+        request_wait = limiter.time_until_available() if limiter else 0.0
+        with self.condition:
+            return max(request_wait, self._token_wait(model_name, tokens, time.time()))
+    
+    def time_until_available(self, model_name: str, tokens: int = 0) -> float:
+        """Seconds until a request to this model would be let through"""
+        return max(self._model_wait(model_name, tokens), self.global_limiter.time_until_available())
+    
+    def soonest_available(self, model_names: List[str], tokens: int = 0) -> str:
+        """The model with capacity soonest; ties keep the given (preference) order"""
+        waits = {model_name: self._model_wait(model_name, tokens) for model_name in model_names}
+        return min(model_names, key=waits.get)
+    
+    def acquire(self, model_name: str, tokens: int = 0) -> float:
+        """Wait for the model's budgets and the global limiter, consuming from each; returns seconds waited.
+        
+        Request slots are only taken at dispatch, once backoff and the token bucket
+        allow the call: the model's and the global slot together, under one lock.
+        Callers held back by a backoff therefore hold no slots and cannot all fire
+        the moment it ends.
+        """
+        start = time.time()
+        model_key, model_name = model_name, self._real_model(model_name)
+        model_limiter = self.model_limiters.get(model_name)
+        
+        with self.condition:
+            announced = False
+            while True:
+                now = time.time()
+                wait_time = self._token_wait(model_name, tokens, now)
+                if wait_time <= 0:
+                    wait_time = self.global_limiter.reserve_with(model_limiter, model_key)
+                    if wait_time <= 0:
+                        break
+                if not announced:
+                    print(f"🚫 {model_name} backing off or at its limits. Waiting {wait_time:.1f}s...")
+                    announced = True
+                self.condition.wait(min(wait_time, threading.TIMEOUT_MAX))
+            if tokens and model_name in self.token_buckets:
+                self.token_buckets[model_name].consume(tokens, time.time())
+        
+        return time.time() - start
+    
+    def report_rate_limited(self, model_name: str) -> float:
+        """Back a model off after a 429, doubling the delay for each consecutive one; returns the delay"""
+        model_name = self._real_model(model_name)
+        with self.condition:
+            strikes = self._backoff_strikes.get(model_name, 0) + 1
+            self._backoff_strikes[model_name] = strikes
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (strikes - 1)))
+            self._backoff_until[model_name] = time.time() + delay
+            return delay
+    
+    def report_success(self, model_name: str):
+        """A successful call ends the model's run of 429s"""
+        model_name = self._real_model(model_name)
+        with self.condition:
+            self._backoff_strikes.pop(model_name, None)
+    
+    def settle_tokens(self, model_name: str, estimated: int, actual: int):
+        """Correct a token reservation once the real usage is known"""
+        model_name = self._real_model(model_name)
+        if model_name not in self.token_buckets or actual == estimated:
+            return
+        with self.condition:
+            self.token_buckets[model_name].consume(actual - estimated, time.time())
+            if actual < estimated:
+                self.condition.notify_all()
+
+def create_request_limiter(requests_per_minute: int, requests_per_day: int) -> RateLimiter:
+    """The process-local limiter, or a SQLite-backed one shared by every process when GEMINI_RATE_LIMIT_DB is set"""
+    db_path = os.getenv("GEMINI_RATE_LIMIT_DB")
+    if db_path:
+        return SharedRateLimiter(db_path, requests_per_minute, requests_per_day)
+    return RateLimiter(requests_per_minute=requests_per_minute, requests_per_day=requests_per_day)
+
+class ModelHealthTracker:
+    """Rolling latency percentiles and error rate per model over the last ``window`` calls"""
+    
+    MIN_SAMPLES = 5  # below this a model's numbers are not trusted for ordering or hedging
+    
+    def __init__(self, window: int = 50):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+    
+    def record(self, model_name: str, latency: float, success: bool):
+        with self.lock:
+            self.samples.setdefault(model_name, deque(maxlen=self.window)).append((latency, success))
+    
+    def stats(self, model_name: str) -> Dict[str, Any]:
+        """Sample count, error rate and p50/p95 latency of successful calls (None until measured)"""
+        with self.lock:
+            samples = list(self.samples.get(model_name, ()))
+        
+        latencies = sorted(latency for latency, success in samples if success)
+        percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+        return {
+            "samples": len(samples),
+            "error_rate": (sum(1 for _, success in samples if not success) / len(samples)) if samples else 0.0,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+        }
+    
+    def is_measured(self, model_name: str) -> bool:
+        with self.lock:
+            return len(self.samples.get(model_name, ())) >= self.MIN_SAMPLES
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            model_names = list(self.samples)
+        return {model_name: self.stats(model_name) for model_name in model_names}
 
 class GeminiModelManager:
     def __init__(self):
-        # More reasonable limits
-        self.rate_limiter = RateLimiter(
-            requests_per_minute=10,   # 10 per minute
-            requests_per_day=100      # 100 per day
-        )
-        
         # Use models with better rate limits
         self.models = {
             "gemini_fast": "gemini-2.0-flash-001",
@@ -109,6 +482,71 @@ class GeminiModelManager:
             "gemini_precise": 10,
             "gemini_fallback": 10,
         }
+        # Optional tokens-per-minute limits, e.g. GEMINI_FAST_TOKENS_PER_MINUTE=1000000 (0 = unlimited)
+        self.model_token_limits = {
+            model_key: int(os.getenv(f"{model_key.upper()}_TOKENS_PER_MINUTE", "0"))
+            for model_key in self.models
+        }
+        # Prompt size budgets; chains trim optional context to fit (0 = no budget)
+        self.model_input_budgets = {
+            model_key: int(os.getenv(f"{model_key.upper()}_INPUT_TOKEN_BUDGET", "8000"))
+            for model_key in self.models
+        }
+        
+        # Per-model buckets, with a global budget across all models on top
+        self.rate_limiter = ModelRateLimiter(
+            create_request_limiter(
+                requests_per_minute=int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "10")),
+                requests_per_day=int(os.getenv("GEMINI_REQUESTS_PER_DAY", "100"))
+            ),
+            self.model_limits,
+            self.model_token_limits,
+            backoff_seconds=float(os.getenv("GEMINI_BACKOFF_SECONDS", "5")),
+            max_backoff_seconds=float(os.getenv("GEMINI_MAX_BACKOFF_SECONDS", "60")),
+            model_names=self.models
+        )
+        
+        # GenerativeModel pool keyed by (model, generation config); the genai
+        # transport underneath is shared, so pooled models reuse its connections
+        self._clients: Dict[Tuple, Any] = {}
+        self._clients_lock = threading.Lock()
+        
+        # Rolling latency/error stats drive fallback order and hedging
+        self.model_health = ModelHealthTracker()
+        # Tasks whose slow calls get a hedged duplicate on a second model
+        self.hedged_tasks = {
+            task_type.strip() for task_type in os.getenv("GEMINI_HEDGED_TASKS", "executive_summary").split(",")
+            if task_type.strip()
+        }
+        self.hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini-hedge")
+        # hedged: duplicates sent; *_wins: which call answered; losers_completed: losing calls
+        # that still ran to the end on quota; losers_cancelled: losing calls stopped before another attempt
+        self.hedge_stats = {"hedged": 0, "primary_wins": 0, "hedge_wins": 0, "losers_completed": 0, "losers_cancelled": 0}
+        self._hedge_stats_lock = threading.Lock()
+        
+        # Identical (model, prompt, generation config) calls are answered from disk at no quota cost
+        self.response_cache = None
+        if os.getenv("GEMINI_RESPONSE_CACHE", "true").lower() == "true":
+            self.response_cache = get_shared_response_cache()
+    
+    def get_client(self, model_key: str, temperature: float = 0.7, top_p: float = 0.8,
+                   max_output_tokens: int = 8192):
+        """Get the pooled GenerativeModel for a model key and generation config"""
+        model_name = self.models[model_key]
+        key = (model_name, temperature, top_p, max_output_tokens)
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = genai.GenerativeModel(
+                    model_name,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                        top_p=top_p,
+                        max_output_tokens=max_output_tokens,
+                    )
+                )
+                self._clients[key] = client
+            return client
     
     def get_model_for_task(self, task_type: str) -> str:
         """Determine which Gemini model to use based on task type"""
@@ -126,80 +564,158 @@ class GeminiModelManager:
         return model_mapping.get(task_type, "gemini_fast")
     
     def get_fallback_chain(self, current_model: str) -> List[str]:
-        """Get ordered fallback chain"""
+        """Get the fallback chain, healthiest models first"""
         fallback_chains = {
             "gemini_creative": ["gemini_fast", "gemini_precise", "gemini_fallback"],
             "gemini_fast": ["gemini_precise", "gemini_fallback"],
             "gemini_precise": ["gemini_fast", "gemini_fallback"],
             "gemini_fallback": ["gemini_fast"]  # No further fallbacks
         }
-        return fallback_chains.get(current_model, ["gemini_fallback"])
+        chain = fallback_chains.get(current_model, ["gemini_fallback"])
+        
+        def health_key(model_name: str):
+            # Error rate in 10% bands, then median latency; unmeasured models keep
+            # their configured position ahead of measured ones so they get tried
+            if not self.model_health.is_measured(model_name):
+                return (0.0, 0.0)
+            stats = self.model_health.stats(model_name)
+            return (round(stats["error_rate"], 1), stats["p50"] if stats["p50"] is not None else float("inf"))
+        
+        return sorted(chain, key=health_key)  # stable: ties keep the configured order
+    
+    def get_hedge_delay(self, model_name: str) -> Optional[float]:
+        """How long to wait before hedging a call: the model's p95, once it has been measured"""
+        if not self.model_health.is_measured(model_name):
+            return None
+        return self.model_health.stats(model_name)["p95"]
+    
+    def record_hedge(self, outcome: str):
+        with self._hedge_stats_lock:
+            self.hedge_stats[outcome] += 1
+    
+    def get_hedge_stats(self) -> Dict[str, int]:
+        with self._hedge_stats_lock:
+            return dict(self.hedge_stats)
 
 class GeminiLLM(BaseLLM):
     """Gemini LLM wrapper with proper rate limiting"""
     
     task_type: str
     primary_model: str
+    # Prompts of one batch generated at once; the shared rate limiter still paces every call
+    max_concurrency: int = Field(default_factory=lambda: int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")))
     
     def __init__(self, model_manager, task_type: str):
-        # Store model manager without Pydantic validation using object.__setattr__
-        object.__setattr__(self, 'model_manager', model_manager)
         super().__init__(
             task_type=task_type,
             primary_model=model_manager.get_model_for_task(task_type)
         )
+        # Store model manager without Pydantic validation using object.__setattr__
+        # (after super().__init__, which would otherwise reset the instance __dict__)
+        object.__setattr__(self, 'model_manager', model_manager)
         
-    def _call_with_retry(self, prompt: str, model_name: str, **kwargs) -> str:
-        """Make API call with proper rate limiting and retry logic"""
+    def _response_cache_key(self, prompt: str, model_name: str, **kwargs) -> str:
+        """Everything that determines the response; ShardedCache hashes it into the key"""
+        return json.dumps([
+            self.model_manager.models.get(model_name, model_name),
+            prompt,
+            kwargs.get('temperature', 0.7),
+            kwargs.get('top_p', 0.8),
+            kwargs.get('max_tokens', 8192),
+        ])
+    
+    def _call_with_retry(self, prompt: str, model_name: str, cancelled: Optional[threading.Event] = None,
+                         **kwargs) -> str:
+        """Make API call with proper rate limiting and retry logic; stops before the next attempt once ``cancelled`` is set"""
         max_retries = 2  # Reduced retries
         base_delay = 10  # Start with 10 seconds
+        rate_limiter = self.model_manager.rate_limiter
+        rate_limited = False
         
+        # Pass bypass_cache=True (e.g. llm.invoke(prompt, bypass_cache=True)) to force a fresh call
+        response_cache = None if kwargs.get('bypass_cache') else self.model_manager.response_cache
+        if response_cache is not None:
+            cache_key = self._response_cache_key(prompt, model_name, **kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                print(f"📋 Using cached {model_name} response")
+                emit_token(cached)
+                return cached
+        
+        cancelled = cancelled or threading.Event()
         for attempt in range(max_retries):
+            call_started = None
+            streamed = 0  # characters of this attempt already sent to the token sink
             try:
-                # Wait for rate limit clearance
-                self.model_manager.rate_limiter.wait_if_needed(model_name)
-                
-                # Add increasing delay between retries
-                if attempt > 0:
+                # Add increasing delay between retries of failed calls; after a 429
+                # the limiter's adaptive backoff decides how long to wait instead
+                if attempt > 0 and not rate_limited:
                     wait_time = base_delay * (2 ** attempt)  # Exponential backoff
                     print(f"⏳ Retry {attempt + 1}/{max_retries}. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
+                    cancelled.wait(wait_time)
+                if cancelled.is_set():
+                    return f"ERROR:Cancelled call to {model_name}"
                 
-                # Record the request
-                self.model_manager.rate_limiter.record_request(model_name)
+                # Pacing comes entirely from the limiter: wait for clearance and record the request
+                estimated_tokens = estimate_tokens(prompt)
+                rate_limiter.acquire(model_name, estimated_tokens)
+                call_started = time.time()
                 
-                model = genai.GenerativeModel(self.model_manager.models[model_name])
-                response = model.generate_content(
-                    prompt,
-                    generation_config=genai.types.GenerationConfig(
-                        temperature=kwargs.get('temperature', 0.7),
-                        top_p=kwargs.get('top_p', 0.8),
-                        max_output_tokens=kwargs.get('max_tokens', 8192),  # Increased for comprehensive reports
-                    )
+                model = self.model_manager.get_client(
+                    model_name,
+                    temperature=kwargs.get('temperature', 0.7),
+                    top_p=kwargs.get('top_p', 0.8),
+                    max_output_tokens=kwargs.get('max_tokens', 8192),  # Increased for comprehensive reports
                 )
+                if streaming_enabled():
+                    # Forward tokens to the active stream as they arrive
+                    response = model.generate_content(prompt, stream=True)
+                    for chunk in response:
+                        emit_token(chunk.text)
+                        streamed += len(chunk.text or "")
+                else:
+                    response = model.generate_content(prompt)
+                usage = getattr(response, "usage_metadata", None)
+                if usage is not None:
+                    rate_limiter.settle_tokens(
+                        model_name, estimated_tokens, getattr(usage, "total_token_count", 0) or estimated_tokens
+                    )
                 
-                # Shorter delay after successful call
-                time.sleep(2)  # Reduced to 2 seconds
-                return response.text
+                text = response.text
+                rate_limiter.report_success(model_name)
+                self.model_manager.model_health.record(model_name, time.time() - call_started, True)
+                # Error sentinels are produced below, never here, but they must never be replayed
+                if response_cache is not None and text and not text.startswith(("ERROR:", "RATE_LIMIT_ERROR:")):
+                    response_cache.set(cache_key, text)
+                return text
                 
             except Exception as e:
                 error_str = str(e)
                 print(f"Attempt {attempt + 1} failed for {model_name}: {error_str}")
+                # A retry or the next model starts over, so retract what this attempt streamed
+                emit_reset(streamed)
+                if call_started is not None:
+                    self.model_manager.model_health.record(model_name, time.time() - call_started, False)
                 
                 # Check for rate limit errors
-                if any(keyword in error_str.lower() for keyword in ["429", "quota", "rate", "resource exhausted"]):
+                rate_limited = any(
+                    keyword in error_str.lower()
+                    for keyword in ["429", "quota", "rate limit", "resource exhausted", "resource_exhausted"]
+                )
+                if rate_limited:
+                    wait_time = rate_limiter.report_rate_limited(model_name)
                     if attempt < max_retries - 1:
-                        # Longer wait for rate limits
-                        wait_time = 30 * (attempt + 1)
-                        print(f"🚫 Rate limit hit. Waiting {wait_time}s...")
-                        time.sleep(wait_time)
+                        print(f"🚫 Rate limit hit. Backing off {model_name} for {wait_time:.1f}s...")
                         continue
                     else:
                         # Final attempt failed due to rate limit
                         return f"RATE_LIMIT_ERROR:{model_name}"
                 
-                # For other errors, continue to next retry
-                if attempt < max_retries - 1:
+                # For other errors, continue to next retry, unless the model is failing
+                # most calls lately, in which case the next model is a better bet
+                failing = (self.model_manager.model_health.is_measured(model_name) and
+                           self.model_manager.model_health.stats(model_name)["error_rate"] >= 0.5)
+                if attempt < max_retries - 1 and not failing:
                     continue
                 else:
                     return f"ERROR:{str(e)}"
@@ -208,12 +724,21 @@ class GeminiLLM(BaseLLM):
     
     def _call(self, prompt: str, stop: List[str] = None, run_manager: CallbackManagerForLLMRun = None, **kwargs: Any) -> str:
         """Main call method with proper fallback chain"""
-        current_models = [self.primary_model] + self.model_manager.get_fallback_chain(self.primary_model)
+        remaining_models = [self.primary_model] + self.model_manager.get_fallback_chain(self.primary_model)
+        estimated_tokens = estimate_tokens(prompt)
+        # Hedging would interleave two token streams, so streamed calls are never hedged
+        hedge = self.task_type in self.model_manager.hedged_tasks and not streaming_enabled()
         
-        for model_name in current_models:
+        while remaining_models:
+            # Prefer the primary model, but fall back to whichever model has capacity soonest
+            model_name = self.model_manager.rate_limiter.soonest_available(remaining_models, estimated_tokens)
+            remaining_models.remove(model_name)
             print(f"🔄 Trying model: {model_name}")
             
-            result = self._call_with_retry(prompt, model_name, **kwargs)
+            if hedge and remaining_models:
+                result = self._call_hedged(prompt, model_name, remaining_models, estimated_tokens, **kwargs)
+            else:
+                result = self._call_with_retry(prompt, model_name, **kwargs)
             
             if result.startswith("RATE_LIMIT_ERROR:"):
                 print(f"🚫 Rate limit exceeded for {model_name}, trying next model...")
@@ -229,33 +754,199 @@ class GeminiLLM(BaseLLM):
         print(f"❌ {error_msg}")
         return f"Error: {error_msg}"
     
+    def _call_hedged(self, prompt: str, model_name: str, alternatives: List[str], estimated_tokens: int,
+                     **kwargs) -> str:
+        """Call model_name, racing a duplicate on the best alternative once the call passes its p95.
+        
+        The duplicate is only sent if the shared limiter has capacity for it right
+        now, so hedging never queues behind (or eats into) other agents' quota.
+        A hedge model that also fails is removed from ``alternatives``. Both calls
+        run in a copy of the caller's context, so its token and progress sinks apply.
+        
+        The losing call is cancelled before any further attempt, but a request
+        already sent cannot be recalled: it keeps its request slot, its token
+        reservation is settled against real usage and its answer still fills the
+        response cache. ``hedge_stats`` counts such losers under ``losers_completed``.
+        """
+        manager = self.model_manager
+        hedge_delay = manager.get_hedge_delay(model_name)
+        
+        def submit(target_model: str, cancelled: threading.Event):
+            return manager.hedge_executor.submit(
+                contextvars.copy_context().run, self._call_with_retry, prompt, target_model, cancelled=cancelled, **kwargs
+            )
+        
+        primary_cancelled = threading.Event()
+        primary = submit(model_name, primary_cancelled)
+        if hedge_delay is None:
+            return primary.result()
+        
+        try:
+            return primary.result(timeout=hedge_delay)
+        except FutureTimeoutError:
+            pass
+        
+        rate_limiter = manager.rate_limiter
+        hedge_model = rate_limiter.soonest_available(alternatives, estimated_tokens)
+        if rate_limiter.time_until_available(hedge_model, estimated_tokens) > 0:
+            return primary.result()
+        
+        print(f"🪁 {model_name} is past its p95 ({hedge_delay:.1f}s), hedging on {hedge_model}")
+        manager.record_hedge("hedged")
+        hedge_cancelled = threading.Event()
+        hedged = submit(hedge_model, hedge_cancelled)
+        calls = {primary: ("primary_wins", primary_cancelled), hedged: ("hedge_wins", hedge_cancelled)}
+        
+        def count_loser(future):
+            cancelled = future.result().startswith("ERROR:Cancelled")
+            manager.record_hedge("losers_cancelled" if cancelled else "losers_completed")
+        
+        for future in as_completed(calls):
+            result = future.result()
+            if not result.startswith(("ERROR:", "RATE_LIMIT_ERROR:")):
+                manager.record_hedge(calls[future][0])
+                for loser, (_, cancelled) in calls.items():
+                    if loser is not future and not loser.done():
+                        cancelled.set()
+                        loser.add_done_callback(count_loser)
+                return result
+        
+        alternatives.remove(hedge_model)
+        return primary.result()
+    
+    def _stream(self, prompt: str, stop: List[str] = None, run_manager: CallbackManagerForLLMRun = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        """Yield tokens as they arrive, with the same rate limiting and fallbacks as _call"""
+        tokens: "queue.Queue[Optional[str]]" = queue.Queue()
+        outer_sink, outer_reset = get_token_sink(), get_reset_sink()
+        result = {}
+        retried = threading.Event()
+        
+        def sink(text: str):
+            if not retried.is_set():
+                tokens.put(text)
+            if outer_sink is not None:
+                outer_sink(text)  # an enclosing research stream still sees the tokens
+        
+        def reset(discarded: int):
+            # Yielded chunks cannot be taken back; the rest comes from the final text
+            retried.set()
+            if outer_reset is not None:
+                outer_reset(discarded)
+        
+        def run():
+            try:
+                with stream_tokens_to(sink, on_reset=reset):
+                    result["text"] = self._call(prompt, stop=stop, **kwargs)
+            finally:
+                tokens.put(None)
+        
+        # _call runs on a worker thread in a copy of this context
+        worker = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+        worker.start()
+        
+        streamed = ""
+        while (text := tokens.get()) is not None:
+            streamed += text
+            if run_manager:
+                run_manager.on_llm_new_token(text)
+            yield GenerationChunk(text=text)
+        worker.join()
+        
+        # Errors come back as text without any tokens having streamed; after a retry the
+        # final text replaces the failed attempt's, continuing from what was already yielded
+        final = result.get("text") or ""
+        if final.startswith(streamed) and len(final) > len(streamed):
+            if run_manager:
+                run_manager.on_llm_new_token(final[len(streamed):])
+            yield GenerationChunk(text=final[len(streamed):])
+    
     @property
     def _llm_type(self) -> str:
         return f"gemini_multi_{self.task_type}"
     
     def _generate(self, prompts: List[str], stop: List[str] = None, run_manager: CallbackManagerForLLMRun = None, **kwargs: Any) -> LLMResult:
         """Generate for multiple prompts with proper rate limiting"""
-        generations = []
-        for i, prompt in enumerate(prompts):
-            # Add longer delay between multiple prompts
-            if i > 0:
-                time.sleep(10)  # Even longer delay between batch prompts
-            text = self._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
-            generations.append([{"generation_info": {}, "text": text}])
-        return LLMResult(generations=generations)
+        def call(prompt: str) -> str:
+            return self._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+        
+        if len(prompts) <= 1 or self.max_concurrency <= 1:
+            # No fixed delay between prompts: the shared rate limiter paces every call
+            texts = [call(prompt) for prompt in prompts]
+        else:
+            # Fan out within the limiter's budget, each call in its own copy of the caller's
+            # context so token and progress sinks still apply; results keep prompt order
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(prompts))) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, call, prompt) for prompt in prompts]
+                texts = [future.result() for future in futures]
+        
+        return LLMResult(generations=[[{"generation_info": {}, "text": text}] for text in texts])
+    
+    async def _agenerate(self, prompts: List[str], stop: List[str] = None,
+                         run_manager: AsyncCallbackManagerForLLMRun = None, **kwargs: Any) -> LLMResult:
+        """Generate for multiple prompts concurrently without blocking the event loop"""
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        sync_run_manager = run_manager.get_sync() if run_manager else None
+        
+        async def generate_one(prompt: str) -> str:
+            async with semaphore:
+                # The limiter and the Gemini client block, so each call runs in a worker thread
+                return await asyncio.to_thread(self._call, prompt, stop=stop, run_manager=sync_run_manager, **kwargs)
+        
+        texts = await asyncio.gather(*(generate_one(prompt) for prompt in prompts))
+        return LLMResult(generations=[[{"generation_info": {}, "text": text}] for text in texts])
 
 
 # Global shared model manager to coordinate rate limiting across all agents
 _shared_model_manager = None
+_shared_lock = threading.Lock()
 
 def get_shared_model_manager():
     global _shared_model_manager
-    if _shared_model_manager is None:
-        _shared_model_manager = GeminiModelManager()
+    with _shared_lock:
+        if _shared_model_manager is None:
+            _shared_model_manager = GeminiModelManager()
     return _shared_model_manager
 
+# One on-disk response cache per process, shared by every GeminiModelManager
+_shared_response_cache = None
+_response_cache_lock = threading.Lock()  # not _shared_lock: the shared manager is built while holding it
+
+def get_shared_response_cache():
+    global _shared_response_cache
+    with _response_cache_lock:
+        if _shared_response_cache is None:
+            try:
+                from ..utils.cache import ShardedCache
+            except ImportError:
+                from marketresearch.utils.cache import ShardedCache
+            _shared_response_cache = ShardedCache(
+                cache_dir=os.getenv("GEMINI_RESPONSE_CACHE_DIR", "./cache/llm_responses"),
+                ttl_hours=int(os.getenv("GEMINI_RESPONSE_CACHE_TTL_HOURS", "24")),
+                max_bytes=int(os.getenv("GEMINI_RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024,
+            )
+    return _shared_response_cache
+
+# Embedding requests have their own quota, but all embedders in the process share one limiter
+_shared_embedding_rate_limiter = None
+
+def get_shared_embedding_rate_limiter():
+    global _shared_embedding_rate_limiter
+    if _shared_embedding_rate_limiter is None:
+        _shared_embedding_rate_limiter = RateLimiter(
+            requests_per_minute=int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "150")),
+            requests_per_day=int(os.getenv("EMBEDDING_REQUESTS_PER_DAY", "10000"))
+        )
+    return _shared_embedding_rate_limiter
+
+# CrewAI LLMs per task type, reused across agent and crew constructions
+_crewai_llms: Dict[str, LLM] = {}
+
 def get_crewai_gemini_llm(task_type: str = "general"):
     """Get a CrewAI LLM that uses your existing multi-model Gemini system"""
+    with _shared_lock:
+        if task_type in _crewai_llms:
+            return _crewai_llms[task_type]
     
     # Use SHARED model manager for all agents
     model_manager = get_shared_model_manager()
@@ -273,10 +964,13 @@ def get_crewai_gemini_llm(task_type: str = "general"):
         api_key=os.getenv("GEMINI_API_KEY"),
         max_retries=1,     # Reduce retries to avoid rate limits
         request_timeout=120,  # Longer timeout for large outputs
+        stream=os.getenv("GEMINI_STREAMING", "true").lower() == "true",  # Tokens reach the research stream as they arrive
     )
+    forward_crewai_stream_chunks()
     
     # Store your GeminiLLM instance for reference
     crewai_llm._gemini_llm = gemini_llm
     
     print(f"🔧 CrewAI using {actual_model} for {task_type}")
-    return crewai_llm
\ No newline at end of file
+    with _shared_lock:
+        return _crewai_llms.setdefault(task_type, crewai_llm)
\ No newline at end of file
@@ -181,14 +181,36 @@ class MarketResearchCrew():
     
     def kickoff_with_rag(self, inputs: dict):
         """Enhanced kickoff with memory and context tracking"""
-        from .utils.cache import research_cache
+        from .utils.cache import (
+            research_cache,
+            build_research_cache_key,
+            normalize_text,
+            CachedResult,
+            semantic_cache_index,
+            semantic_cache_threshold,
+        )
         
-        # Check cache first
-        cache_key = f"{inputs['research_topic']}_{inputs['research_request']}"
+        # Check cache first - keys are normalized so case/punctuation variants hit
+        cache_key = build_research_cache_key(inputs['research_topic'], inputs['research_request'])
         cached_result = research_cache.get(cache_key)
         if cached_result:
             print(f"📋 Using cached result for: {inputs['research_topic']}")
-            return cached_result
+            return CachedResult(cached_result, match_type="exact", matched_key=cache_key)
+        
+        # Optionally fall back to a near-duplicate request within the similarity threshold
+        request_embedding = None
+        if semantic_cache_index is not None:
+            request_text = f"{normalize_text(inputs['research_topic'])}. {normalize_text(inputs['research_request'])}"
+            request_embedding = self.chain_factory.rag_pipeline.vector_store.embeddings.embed_query(request_text)
+            match = semantic_cache_index.best_match(request_embedding, semantic_cache_threshold)
+            if match:
+                matched_key, similarity = match
+                cached_result = research_cache.get(matched_key)
+                if cached_result:
+                    print(f"📋 Using near-match cached result for: {inputs['research_topic']} (similarity {similarity:.3f})")
+                    return CachedResult(cached_result, match_type="near_match", similarity=similarity, matched_key=matched_key)
+                # Payload was evicted; stop matching against it
+                semantic_cache_index.remove(matched_key)
         
         print("🚀 Starting RAG-Enhanced Market Research...")
         stats = self.chain_factory.rag_pipeline.get_knowledge_stats()
@@ -236,10 +258,11 @@ class MarketResearchCrew():
             
             # Convert result to PDF if it's markdown
             if result_text and result_text.strip():
-                from .utils.pdf_converter import convert_md_to_pdf
                 research_id = inputs.get('research_id', inputs['research_topic'].replace(' ', '_'))
                 pdf_path = f"research_report_{research_id}.pdf"
                 try:
+                    # Imported here: weasyprint fails to load on hosts without its system libraries
+                    from .utils.pdf_converter import convert_md_to_pdf
                     convert_md_to_pdf(result_text, pdf_path)
                     print(f"📄 PDF report generated: {pdf_path}")
                 except Exception as pdf_error:
@@ -257,6 +280,8 @@ class MarketResearchCrew():
             
             # Cache the string result, not the CrewOutput
             research_cache.set(cache_key, result_text)
+            if request_embedding is not None:
+                semantic_cache_index.add(cache_key, request_embedding)
             print(f"📋 Research result cached for future use")
             
             print("✅ Research session saved to memory")
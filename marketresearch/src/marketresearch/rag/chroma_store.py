@@ -1,130 +1,343 @@
 # src/marketresearch/rag/chroma_store.py
 import os
+import glob
+import json
+import time
+import hashlib
+import threading
 import chromadb
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 from .google_embeddings import GoogleEmbeddings
+from .chunking import DocumentChunker
+from .extractors import SUPPORTED_EXTENSIONS, ExtractionPool, extract_texts
 
 class ChromaVectorStore:
     """ChromaDB vector store with metadata support"""
     
-    def __init__(self, knowledge_base_path: str = "./knowledge", collection_name: str = "market_research"):
+    def __init__(self, knowledge_base_path: str = "./knowledge", collection_name: str = "market_research",
+                 embeddings: Optional[GoogleEmbeddings] = None, chunker: Optional[DocumentChunker] = None):
         self.knowledge_base_path = knowledge_base_path
-        self.embeddings = GoogleEmbeddings()
+        self.embeddings = embeddings or GoogleEmbeddings()
+        self.chunker = chunker or DocumentChunker(
+            chunk_size=int(os.getenv("RAG_CHUNK_SIZE", "800")),
+            chunk_overlap=int(os.getenv("RAG_CHUNK_OVERLAP", "120"))
+        )
         # Use environment variable or default to marketresearch/chroma_db
         chroma_path = os.getenv('CHROMA_DB_PATH', './chroma_db')
         if not os.path.isabs(chroma_path):
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
             chroma_path = os.path.join(project_root, chroma_path.lstrip('./'))
         os.makedirs(chroma_path, exist_ok=True)
+        self.chroma_path = chroma_path
         self.client = chromadb.PersistentClient(path=chroma_path)
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"description": "Market Research Knowledge Base"}
-        )
+        self.collection = self._get_collection(collection_name)
+        self._sync_lock = threading.Lock()
+        # Per-type chunk/file counts mirroring the manifest, so stats never query ChromaDB
+        self._counts_lock = threading.Lock()
+        self._type_counts: Dict[str, Dict[str, int]] = {}
+        # Bumped on every write so callers can key caches on the index contents
+        self.index_version = 0
         self._load_knowledge_base()
     
+    def _get_collection(self, collection_name: str):
+        """Get the collection, rebuilding it if it was embedded with a different model"""
+        collection_metadata = {
+            "description": "Market Research Knowledge Base",
+            "embedding_model": self.embeddings.model,
+            "hnsw:space": "cosine"
+        }
+        try:
+            collection = self.client.get_collection(name=collection_name)
+        except Exception:
+            return self.client.create_collection(name=collection_name, metadata=collection_metadata)
+        
+        if (collection.metadata or {}).get("embedding_model") != self.embeddings.model:
+            print(f"♻️ Collection {collection_name} was embedded with a different model, rebuilding...")
+            self.client.delete_collection(name=collection_name)
+            collection = self.client.create_collection(name=collection_name, metadata=collection_metadata)
+        
+        return collection
+    
+    # (glob relative to knowledge base, source, type, metadata field for the file stem)
+    KNOWLEDGE_SOURCES = [
+        ("company_profiles/*.txt", "company_profiles", "company_profile", "company"),
+        ("industry_reports/*.txt", "industry_reports", "industry_report", "industry"),
+        ("market_data/*.txt", "market_data", "market_data", "topic"),
+        ("user_preference.txt", "user_preferences", "user_preference", None),
+        ("uploaded_files/*", "uploaded_files", "uploaded_document", "document"),
+    ]
+    UPSERT_BATCH_SIZE = 500
+    SYNC_GROUP_SIZE = 50
+    
     def _load_knowledge_base(self):
         """Load and index knowledge base documents"""
-        import glob
-        
-        # Check if collection is already populated
-        if self.collection.count() > 0:
-            print(f"✅ ChromaDB already has {self.collection.count()} documents")
-            return
+        self.sync_knowledge_base()
+    
+    def _manifest_path(self) -> str:
+        return os.path.join(self.chroma_path, f"{self.collection.name}_manifest.json")
+    
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Load the file path -> content hash -> chunk ids manifest"""
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
         
-        documents = []
-        metadatas = []
-        ids = []
+        if manifest is None or (manifest and self.collection.count() == 0):
+            # No manifest (first run / legacy index) or the collection was wiped:
+            # drop untracked chunks and rebuild from the files on disk
+            existing_ids = self.collection.get(include=[])['ids']
+            if existing_ids:
+                print(f"♻️ Clearing {len(existing_ids)} untracked documents from ChromaDB")
+                self._delete_ids(existing_ids)
+            return {}
         
-        # Load company profiles
-        company_files = glob.glob(f"{self.knowledge_base_path}/company_profiles/*.txt", recursive=True)
-        for file_path in company_files:
-            content = self._load_file(file_path)
-            if content:
-                company_name = os.path.splitext(os.path.basename(file_path))[0]
-                documents.append(content)
-                metadatas.append({
-                    "source": "company_profiles",
-                    "company": company_name,
+        return manifest
+    
+    def _reset_counts(self, manifest: Dict[str, Dict[str, Any]]):
+        """Rebuild the per-type counter index from a manifest"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for entry in manifest.values():
+            type_counts = counts.setdefault(entry.get("type", "unknown"), {"files": 0, "chunks": 0})
+            type_counts["files"] += 1
+            type_counts["chunks"] += len(entry["chunk_ids"])
+        with self._counts_lock:
+            self._type_counts = counts
+    
+    def _update_counts(self, entry: Optional[Dict[str, Any]], sign: int):
+        """Add (sign=1) or remove (sign=-1) a manifest entry from the counter index"""
+        if not entry:
+            return
+        with self._counts_lock:
+            type_counts = self._type_counts.setdefault(entry.get("type", "unknown"), {"files": 0, "chunks": 0})
+            type_counts["files"] += sign
+            type_counts["chunks"] += sign * len(entry["chunk_ids"])
+    
+    def _save_manifest(self, manifest: Dict[str, Dict[str, Any]]):
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+    
+    def _discover_files(self) -> Dict[str, Dict[str, Any]]:
+        """Map each knowledge file (relative path) to its base metadata"""
+        files = {}
+        for pattern, source, doc_type, name_field in self.KNOWLEDGE_SOURCES:
+            for file_path in sorted(glob.glob(os.path.join(self.knowledge_base_path, pattern))):
+                if os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                rel_path = os.path.relpath(file_path, self.knowledge_base_path)
+                metadata = {
+                    "source": source,
                     "file_path": file_path,
-                    "type": "company_profile"
-                })
-                ids.append(f"company_{company_name}_{len(ids)}")
+                    "type": doc_type
+                }
+                if name_field:
+                    metadata[name_field] = os.path.splitext(os.path.basename(file_path))[0]
+                files[rel_path] = metadata
+        return files
+    
+    @staticmethod
+    def _hash_file(file_path: str) -> str:
+        """Hash raw file bytes so binary formats are only parsed when they change"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def _build_chunks(self, rel_path: str, content: str, metadata: Dict[str, Any]):
+        """Split a file into (ids, documents, metadatas) for indexing"""
+        chunks = self.chunker.split(content)
+        ids = [f"{rel_path}::{chunk.index}" for chunk in chunks]
+        documents = [chunk.text for chunk in chunks]
+        metadatas = [
+            {
+                **metadata,
+                "parent_id": rel_path,
+                "chunk_index": chunk.index,
+                "chunk_count": len(chunks),
+                "start_offset": chunk.start,
+                "end_offset": chunk.end
+            }
+            for chunk in chunks
+        ]
+        return ids, documents, metadatas
+    
+    def sync_knowledge_base(self, progress_callback: Optional[Callable[[str, str], None]] = None,
+                            cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """Incrementally sync ChromaDB with the knowledge files on disk.
         
-        # Load industry reports
-        industry_files = glob.glob(f"{self.knowledge_base_path}/industry_reports/*.txt", recursive=True)
-        for file_path in industry_files:
-            content = self._load_file(file_path)
-            if content:
-                industry_name = os.path.splitext(os.path.basename(file_path))[0]
-                documents.append(content)
-                metadatas.append({
-                    "source": "industry_reports", 
-                    "industry": industry_name,
-                    "file_path": file_path,
-                    "type": "industry_report"
-                })
-                ids.append(f"industry_{industry_name}_{len(ids)}")
+        Unchanged files (same mtime/size, or same content hash) are skipped,
+        changed and new files are extracted in parallel, re-chunked and
+        upserted, and chunks of deleted files are removed.
         
-        # Load market data
-        market_files = glob.glob(f"{self.knowledge_base_path}/market_data/*.txt", recursive=True)
-        for file_path in market_files:
-            content = self._load_file(file_path)
-            if content:
-                market_topic = os.path.splitext(os.path.basename(file_path))[0]
-                documents.append(content)
-                metadatas.append({
-                    "source": "market_data",
-                    "topic": market_topic,
-                    "file_path": file_path,
-                    "type": "market_data"
-                })
-                ids.append(f"market_{market_topic}_{len(ids)}")
+        Changed files are committed in groups of SYNC_GROUP_SIZE, each with its
+        manifest update, so ``cancel_event`` can stop a sync between groups
+        without leaving the index and manifest out of step.
+        ``progress_callback(rel_path, status)`` reports every file as
+        ``pending`` first, then ``indexed``, ``removed`` or ``failed``.
+        """
+        report = progress_callback or (lambda rel_path, status: None)
         
-        # Load user preferences
-        user_pref_path = f"{self.knowledge_base_path}/user_preference.txt"
-        if os.path.exists(user_pref_path):
-            content = self._load_file(user_pref_path)
-            if content:
-                documents.append(content)
-                metadatas.append({
-                    "source": "user_preferences",
-                    "file_path": user_pref_path,
-                    "type": "user_preference"
-                })
-                ids.append(f"user_pref_{len(ids)}")
+        with self._sync_lock:
+            start_time = time.time()
+            manifest = self._load_manifest()
+            self._reset_counts(manifest)
+            files = self._discover_files()
+            summary = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "cancelled": False}
+            
+            removed = [rel_path for rel_path in manifest if rel_path not in files]
+            
+            # Find changed files from stat fingerprints, falling back to the content hash
+            changed = {}
+            for rel_path, base_metadata in files.items():
+                file_path = base_metadata["file_path"]
+                stat = os.stat(file_path)
+                entry = manifest.get(rel_path)
+                # Files chunked with different settings must be re-chunked even if unchanged
+                fresh = entry is not None and entry.get("chunking") == self.chunker.signature
+                if fresh and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    summary["unchanged"] += 1
+                    continue
+                
+                content_hash = self._hash_file(file_path)
+                if fresh and entry["content_hash"] == content_hash:
+                    # Touched but not modified - just refresh the stat fingerprint
+                    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    summary["unchanged"] += 1
+                    continue
+                
+                changed[rel_path] = (content_hash, stat)
+            
+            for rel_path in removed + list(changed):
+                report(rel_path, "pending")
+            
+            # Drop chunks of files that no longer exist
+            stale_ids = []
+            for rel_path in removed:
+                entry = manifest.pop(rel_path)
+                self._update_counts(entry, -1)
+                stale_ids.extend(entry["chunk_ids"])
+            self._delete_ids(stale_ids)
+            summary["removed"] = len(removed)
+            for rel_path in removed:
+                report(rel_path, "removed")
+            self._save_manifest(manifest)
+            
+            pending = list(changed)
+            # One extraction pool for the whole sync; it only starts if a group has PDF/DOCX files
+            with ExtractionPool() as extraction_pool:
+                for i in range(0, len(pending), self.SYNC_GROUP_SIZE):
+                    if cancel_event is not None and cancel_event.is_set():
+                        summary["cancelled"] = True
+                        print(f"🛑 Knowledge base sync cancelled with {len(pending) - i} files left")
+                        break
+                    
+                    group = pending[i:i + self.SYNC_GROUP_SIZE]
+                    self._sync_group(group, changed, files, manifest, summary, report, extraction_pool)
+                    self._save_manifest(manifest)
+            
+            if not files:
+                print("⚠️  No documents found in knowledge base")
+            elapsed = time.time() - start_time
+            synced = summary["added"] + summary["updated"]
+            summary["elapsed_seconds"] = round(elapsed, 3)
+            summary["files_per_second"] = round(synced / elapsed, 1) if synced and elapsed > 0 else 0.0
+            print(f"✅ Knowledge base synced in {elapsed:.1f}s: {summary}")
+            return summary
+    
+    def _sync_group(self, group: List[str], changed: Dict[str, Any], files: Dict[str, Dict[str, Any]],
+                    manifest: Dict[str, Dict[str, Any]], summary: Dict[str, Any],
+                    report: Callable[[str, str], None], extraction_pool: Optional[ExtractionPool] = None):
+        """Extract, chunk and upsert one group of changed files (caller holds the sync lock)"""
+        contents = extract_texts([files[rel_path]["file_path"] for rel_path in group], pool=extraction_pool)
         
-        # Add to ChromaDB
-        if documents:
-            print(f"📚 Adding {len(documents)} documents to ChromaDB...")
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
+        ids, documents, metadatas, stale_ids = [], [], [], []
+        chunk_ids_by_file = {}
+        for rel_path in group:
+            content_hash, stat = changed[rel_path]
+            base_metadata = files[rel_path]
+            content = contents.get(base_metadata["file_path"])
+            chunk_ids, chunk_documents, chunk_metadatas = (
+                self._build_chunks(rel_path, content, base_metadata) if content else ([], [], [])
             )
-            print(f"✅ Successfully indexed {len(documents)} documents")
-        else:
-            print("⚠️  No documents found in knowledge base")
-    
-    def _load_file(self, file_path: str) -> Optional[str]:
-        """Load and clean file content"""
+            chunk_ids_by_file[rel_path] = chunk_ids
+            ids.extend(chunk_ids)
+            documents.extend(chunk_documents)
+            metadatas.extend(chunk_metadatas)
+            
+            entry = manifest.get(rel_path)
+            if entry:
+                stale_ids.extend(entry["chunk_ids"])
+            summary["updated" if entry else "added"] += 1
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                return content if content else None
+            # Remove replaced chunks first so re-chunked files leave no orphans behind
+            new_ids = set(ids)
+            self._delete_ids([chunk_id for chunk_id in stale_ids if chunk_id not in new_ids])
+            
+            if documents:
+                print(f"📚 Upserting {len(documents)} documents to ChromaDB...")
+                for i in range(0, len(documents), self.UPSERT_BATCH_SIZE):
+                    batch = slice(i, i + self.UPSERT_BATCH_SIZE)
+                    self.collection.upsert(
+                        ids=ids[batch],
+                        documents=documents[batch],
+                        embeddings=self.embeddings.embed_documents(documents[batch]),
+                        metadatas=metadatas[batch]
+                    )
+                    self.index_version += 1
+                print(f"🗄️ Embedding cache: {self.embeddings.cache_stats()}")
         except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-            return None
+            print(f"❌ Failed to index {len(group)} files: {e}")
+            for rel_path in group:
+                # Forget the files so the next sync retries them
+                self._update_counts(manifest.pop(rel_path, None), -1)
+                report(rel_path, "failed")
+            self._save_manifest(manifest)
+            raise
+        
+        for rel_path in group:
+            content_hash, stat = changed[rel_path]
+            self._update_counts(manifest.get(rel_path), -1)
+            manifest[rel_path] = {
+                "content_hash": content_hash,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "chunk_ids": chunk_ids_by_file[rel_path],
+                "chunking": self.chunker.signature,
+                "type": files[rel_path]["type"]
+            }
+            self._update_counts(manifest[rel_path], 1)
+            report(rel_path, "indexed")
+    
+    def _delete_ids(self, ids: List[str]):
+        for i in range(0, len(ids), self.UPSERT_BATCH_SIZE):
+            self.collection.delete(ids=ids[i:i + self.UPSERT_BATCH_SIZE])
+            self.index_version += 1
     
-    def similarity_search(self, query: str, k: int = 5, filter_metadata: Dict = None) -> List[Dict[str, Any]]:
+    def is_indexed(self, file_path: str) -> bool:
+        """Whether a knowledge file has chunks in the collection as of the last sync"""
+        rel_path = os.path.relpath(file_path, self.knowledge_base_path)
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                entry = json.load(f).get(rel_path)
+        except (OSError, ValueError):
+            return False
+        return bool(entry and entry["chunk_ids"])
+    
+    def similarity_search(self, query: str, k: int = 5, filter_metadata: Dict = None,
+                          query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """Search for similar documents with metadata filtering"""
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[query_embedding or self.embeddings.embed_query(query)],
                 n_results=k,
                 where=filter_metadata  # Filter by metadata
             )
@@ -148,10 +361,37 @@ class ChromaVectorStore:
             print(f"ChromaDB search error: {e}")
             return []
     
+    def get_chunks(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch chunks by id (missing ids are skipped)"""
+        try:
+            results = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        except Exception as e:
+            print(f"ChromaDB get error: {e}")
+            return []
+        
+        return [
+            {"content": doc, "metadata": metadata}
+            for doc, metadata in zip(results['documents'], results['metadatas'])
+        ]
+    
     def get_document_count(self) -> int:
         """Get total number of documents"""
         return self.collection.count()
     
+    def get_type_counts(self) -> Dict[str, Dict[str, int]]:
+        """Indexed files and chunks per document type, from the in-memory counter index"""
+        with self._counts_lock:
+            return {doc_type: dict(counts) for doc_type, counts in self._type_counts.items()}
+    
     def get_documents_by_type(self, doc_type: str) -> List[Dict]:
         """Get documents by type (company_profile, industry_report, market_data, user_preference)"""
-        return self.similarity_search("", k=100, filter_metadata={"type": doc_type})
\ No newline at end of file
+        try:
+            results = self.collection.get(where={"type": doc_type}, include=["documents", "metadatas"])
+        except Exception as e:
+            print(f"ChromaDB get error: {e}")
+            return []
+        
+        return [
+            {"content": doc, "metadata": metadata}
+            for doc, metadata in zip(results['documents'], results['metadatas'])
+        ]
\ No newline at end of file
@@ -0,0 +1,124 @@
+# src/marketresearch/rag/chunking.py
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+# Markdown headings, numbered section titles ("2.1 Market Size") and ALL CAPS title lines
+HEADING_PATTERN = re.compile(r"\n(?=#{1,6}\s|\d+(?:\.\d+)*\.?\s+[A-Z]|[A-Z][A-Z0-9 &/,\-]{3,}:?\n)")
+
+@dataclass
+class Chunk:
+    """A slice of a parent document with its character offsets"""
+    text: str
+    index: int
+    start: int
+    end: int
+
+class DocumentChunker:
+    """Split documents into overlapping chunks on heading/paragraph/sentence boundaries"""
+
+    def __init__(self, chunk_size: int = 800, chunk_overlap: int = 120):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    @property
+    def signature(self) -> str:
+        """Identifies the chunking settings so changed settings force a re-chunk"""
+        return f"{self.chunk_size}/{self.chunk_overlap}"
+
+    def _find_boundary(self, text: str, start: int, limit: int) -> int:
+        """Best split position in (start + chunk_size / 2, limit], preferring structural breaks"""
+        floor = start + self.chunk_size // 2
+
+        structural = max(
+            [m.start() + 1 for m in HEADING_PATTERN.finditer(text, floor, limit)] or [-1]
+        )
+        paragraph = text.rfind("\n\n", floor, limit)
+        if paragraph != -1:
+            paragraph += 2
+        best = max(structural, paragraph)
+        if best > floor:
+            return best
+
+        sentence = max(text.rfind(". ", floor, limit), text.rfind(".\n", floor, limit))
+        if sentence != -1:
+            return sentence + 1
+
+        space = text.rfind(" ", floor, limit)
+        if space != -1:
+            return space + 1
+
+        return limit
+
+    def split(self, text: str) -> List[Chunk]:
+        chunks = []
+        start, length = 0, len(text)
+
+        while start < length:
+            limit = start + self.chunk_size
+            end = length if limit >= length else self._find_boundary(text, start, limit)
+
+            # Record offsets of the stripped chunk so text == source[start:end]
+            chunk_start = start + (len(text[start:end]) - len(text[start:end].lstrip()))
+            chunk_end = end - (len(text[start:end]) - len(text[start:end].rstrip()))
+            if chunk_end > chunk_start:
+                chunks.append(Chunk(text[chunk_start:chunk_end], len(chunks), chunk_start, chunk_end))
+
+            if end >= length:
+                break
+
+            # Step back by the overlap, snapped forward to a word boundary
+            next_start = end - self.chunk_overlap
+            space = text.find(" ", next_start, end)
+            next_start = space + 1 if space != -1 else next_start
+            start = max(next_start, start + 1)
+
+        return chunks
+
+def merge_adjacent_chunks(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge retrieved chunks of the same parent that overlap or are neighbours.
+
+    Results keep the order of their best-ranked chunk; a merged result keeps the
+    highest similarity of its parts.
+    """
+    by_parent: Dict[str, List[Dict[str, Any]]] = {}
+    merged: List[Dict[str, Any]] = []
+
+    for result in results:
+        metadata = result.get("metadata") or {}
+        if "parent_id" not in metadata or "start_offset" not in metadata:
+            merged.append(result)
+            continue
+        by_parent.setdefault(metadata["parent_id"], []).append(result)
+
+    for parent_results in by_parent.values():
+        parent_results.sort(key=lambda r: r["metadata"]["start_offset"])
+        current = dict(parent_results[0], metadata=dict(parent_results[0]["metadata"]))
+
+        for result in parent_results[1:]:
+            metadata = result["metadata"]
+            current_meta = current["metadata"]
+            overlaps = metadata["start_offset"] <= current_meta["end_offset"]
+            neighbours = metadata.get("chunk_index", -2) == current_meta.get("chunk_index", -1) + 1
+
+            if overlaps or neighbours:
+                if metadata["end_offset"] > current_meta["end_offset"]:
+                    if overlaps:
+                        skip = current_meta["end_offset"] - metadata["start_offset"]
+                        current["content"] += result["content"][skip:]
+                    else:
+                        current["content"] += "\n" + result["content"]
+                    current_meta["end_offset"] = metadata["end_offset"]
+                    current_meta["chunk_index"] = metadata.get("chunk_index", current_meta.get("chunk_index"))
+                current["similarity"] = max(current["similarity"], result["similarity"])
+                current["rank"] = min(current.get("rank", 0), result.get("rank", 0))
+            else:
+                merged.append(current)
+                current = dict(result, metadata=dict(metadata))
+
+        merged.append(current)
+
+    merged.sort(key=lambda r: r.get("rank", 0))
+    return merged
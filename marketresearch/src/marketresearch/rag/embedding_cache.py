@@ -0,0 +1,102 @@
+# src/marketresearch/rag/embedding_cache.py
+import os
+import array
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+class EmbeddingCache:
+    """On-disk, content-addressed embedding cache.
+
+    Vectors are keyed by (model, task_type, sha256(text)) and stored as raw
+    float32 blobs, so identical text is only ever embedded once per model.
+    """
+
+    LOOKUP_CHUNK = 500  # stay well under SQLite's bound-parameter limit
+
+    def __init__(self, db_path: str = "./cache/embeddings.sqlite"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, task_type, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, task_type: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Return cached vectors in input order, None where the text has not been embedded"""
+        hashes = [self.text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self.lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), self.LOOKUP_CHUNK):
+                chunk = unique_hashes[i:i + self.LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND task_type = ? AND text_hash IN ({placeholders})",
+                    (model, task_type, *chunk)
+                ).fetchall()
+                for text_hash, blob in rows:
+                    vector = array.array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+
+            results = [found.get(text_hash) for text_hash in hashes]
+            hit_count = sum(1 for vector in results if vector is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put_many(self, model: str, task_type: str, texts: List[str], vectors: List[List[float]]):
+        rows = [
+            (model, task_type, self.text_hash(text), array.array("f", vector).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self.lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, task_type, text_hash, vector) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+# Shared cache so every GoogleEmbeddings instance reuses the same store
+_shared_embedding_cache = None
+
+def get_shared_embedding_cache() -> EmbeddingCache:
+    global _shared_embedding_cache
+    if _shared_embedding_cache is None:
+        _shared_embedding_cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite"))
+    return _shared_embedding_cache
@@ -0,0 +1,126 @@
+# src/marketresearch/rag/extractors.py
+"""
+Text extraction for knowledge base files.
+
+Kept free of heavy imports so worker processes can import it cheaply; the
+PDF/DOCX parsers are only imported inside the worker that needs them.
+"""
+import os
+import csv
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+def _extract_plain(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+def _extract_pdf(file_path: str) -> str:
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+def _extract_docx(file_path: str) -> str:
+    from docx import Document
+
+    document = Document(file_path)
+    parts = [paragraph.text for paragraph in document.paragraphs if paragraph.text.strip()]
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(" | ".join(cell.text.strip() for cell in row.cells))
+    return "\n\n".join(parts)
+
+def _extract_json(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.dumps(json.load(f), indent=2, ensure_ascii=False)
+
+def _extract_csv(file_path: str) -> str:
+    with open(file_path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        return "\n".join(" | ".join(row) for row in csv.reader(f))
+
+EXTRACTORS = {
+    ".txt": _extract_plain,
+    ".md": _extract_plain,
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+    ".json": _extract_json,
+    ".csv": _extract_csv,
+}
+SUPPORTED_EXTENSIONS = set(EXTRACTORS)
+# Formats worth shipping to another process; plain text is cheaper to read inline
+CPU_HEAVY_EXTENSIONS = {".pdf", ".docx"}
+
+def extract_text(file_path: str) -> Optional[str]:
+    """Extract and clean the text of a supported file, None if empty or unreadable"""
+    extension = os.path.splitext(file_path)[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        print(f"Unsupported file type {extension}: {file_path}")
+        return None
+
+    try:
+        content = extractor(file_path).strip()
+        return content if content else None
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return None
+
+class ExtractionPool:
+    """Process pool for PDF/DOCX parsing, started on first use and reused until closed.
+
+    Spawned workers pay interpreter start-up and imports once, so one pool
+    should serve a whole sync rather than one group of files.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the API process has live threads (uvicorn, ChromaDB) that fork would copy mid-state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def extract_texts(file_paths: List[str], max_workers: Optional[int] = None,
+                  pool: Optional[ExtractionPool] = None) -> Dict[str, Optional[str]]:
+    """Extract many files, parsing PDF/DOCX in a process pool so parsing runs on all cores.
+
+    Pass a ``pool`` to reuse its workers across calls; without one a pool is
+    started and shut down for this call.
+    """
+    heavy = [path for path in file_paths if os.path.splitext(path)[1].lower() in CPU_HEAVY_EXTENSIONS]
+    heavy_set = set(heavy)
+    light = [path for path in file_paths if path not in heavy_set]
+
+    results = {path: extract_text(path) for path in light}
+
+    if len(heavy) > 1:
+        own_pool = pool is None
+        if own_pool:
+            pool = ExtractionPool(min(max_workers or os.cpu_count() or 1, len(heavy)))
+        try:
+            chunksize = max(1, len(heavy) // (pool.max_workers * 4))
+            results.update(zip(heavy, pool.executor().map(extract_text, heavy, chunksize=chunksize)))
+        finally:
+            if own_pool:
+                pool.close()
+    else:
+        results.update((path, extract_text(path)) for path in heavy)
+
+    return results
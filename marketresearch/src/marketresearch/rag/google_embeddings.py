@@ -1,40 +1,104 @@
 # src/marketresearch/rag/google_embeddings.py
 import os
 import google.generativeai as genai
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from .embedding_cache import EmbeddingCache, get_shared_embedding_cache
+
+# (model, texts, task_type) -> one embedding per text
+EmbeddingBackend = Callable[[str, List[str], str], List[List[float]]]
+
+def genai_embedding_backend(model: str, texts: List[str], task_type: str) -> List[List[float]]:
+    """Embed a batch of texts in a single Google API request"""
+    result = genai.embed_content(
+        model=model,
+        content=texts,
+        task_type=task_type
+    )
+    return result['embedding']
 
 class GoogleEmbeddings:
     """Google Gemini Embeddings - zero CPU usage, cloud-based"""
-    
-    def __init__(self):
+
+    EMBEDDING_DIM = 768
+    MAX_BATCH_SIZE = 100  # batchEmbedContents accepts at most 100 texts per request
+    MAX_TEXT_CHARS = 2000  # Limit for API
+
+    def __init__(self, batch_size: int = 100, max_workers: int = 4, rate_limiter=None,
+                 backend: Optional[EmbeddingBackend] = None, cache: Optional[EmbeddingCache] = None,
+                 use_cache: bool = True):
         genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
         self.model = "models/text-embedding-004"
-    
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Embed multiple documents via Google API"""
-        embeddings = []
-        for text in texts:
-            try:
-                result = genai.embed_content(
-                    model=self.model,
-                    content=text[:2000],  # Limit for API
-                    task_type="retrieval_document"
-                )
-                embeddings.append(result['embedding'])
-            except Exception as e:
-                print(f"Embedding error: {e}")
-                embeddings.append([0.0] * 768)  # Fallback
-        return embeddings
-    
-    def embed_query(self, text: str) -> List[float]:
-        """Embed query via Google API"""
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.max_workers = max(1, max_workers)
+        self.backend = backend or genai_embedding_backend
+        self.cache = (cache or get_shared_embedding_cache()) if use_cache else None
+
+        if rate_limiter is None:
+            from ..config.gemini_config import get_shared_embedding_rate_limiter
+            rate_limiter = get_shared_embedding_rate_limiter()
+        self.rate_limiter = rate_limiter
+
+    def _embed_batch(self, texts: List[str], task_type: str, strict: bool = False) -> List[List[float]]:
+        """Embed one batch, waiting for rate limiter clearance first.
+
+        A failed batch raises when ``strict``; otherwise it falls back to zero
+        vectors, which are never cached.
+        """
+        self.rate_limiter.acquire(self.model)
+
         try:
-            result = genai.embed_content(
-                model=self.model,
-                content=text[:2000],
-                task_type="retrieval_query"
-            )
-            return result['embedding']
+            embeddings = self.backend(self.model, texts, task_type)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+            if any(not any(vector) for vector in embeddings):
+                raise ValueError("backend returned an all-zero embedding")
         except Exception as e:
-            print(f"Query embedding error: {e}")
-            return [0.0] * 768
\ No newline at end of file
+            print(f"Embedding error: {e}")
+            if strict:
+                raise
+            return [[0.0] * self.EMBEDDING_DIM for _ in texts]
+
+        if self.cache is not None:
+            self.cache.put_many(self.model, task_type, texts, embeddings)
+        return embeddings
+
+    def _embed(self, texts: List[str], task_type: str, strict: bool = False) -> List[List[float]]:
+        """Serve what we can from the cache and embed the rest in concurrent batches"""
+        texts = [text[:self.MAX_TEXT_CHARS] for text in texts]
+        results = self.cache.get_many(self.model, task_type, texts) if self.cache is not None else [None] * len(texts)
+
+        # Only embed each distinct missing text once
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, results) if vector is None))
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            if len(batches) == 1 or self.max_workers == 1:
+                batch_results = [self._embed_batch(batch, task_type, strict) for batch in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                    batch_results = list(executor.map(lambda batch: self._embed_batch(batch, task_type, strict), batches))
+
+            embedded = {}
+            for batch, vectors in zip(batches, batch_results):
+                embedded.update(zip(batch, vectors))
+            results = [vector if vector is not None else embedded[text] for text, vector in zip(texts, results)]
+
+        return results
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed multiple documents via Google API in concurrent batches.
+
+        Raises if any batch fails: stored documents must never get placeholder
+        vectors, or they would be recorded as indexed and never retried.
+        """
+        if not texts:
+            return []
+        return self._embed(texts, "retrieval_document", strict=True)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed query via Google API (zero vector if the request fails)"""
+        return self._embed([text], "retrieval_query")[0]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Embedding cache hit/miss statistics"""
+        return self.cache.stats() if self.cache is not None else {"enabled": False}
@@ -1,16 +1,47 @@
 # src/marketresearch/rag/pipeline.py
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional
 from .chroma_store import ChromaVectorStore
+from .chunking import merge_adjacent_chunks
+from .retrieval_cache import LRUCache
 
 class RAGPipeline:
     """Enhanced RAG pipeline with ChromaDB and metadata support"""
     
-    def __init__(self, knowledge_base_path: str = "./knowledge"):
-        self.vector_store = ChromaVectorStore(knowledge_base_path)
+    def __init__(self, knowledge_base_path: str = "./knowledge", vector_store: Optional[ChromaVectorStore] = None):
+        self.vector_store = vector_store or ChromaVectorStore(knowledge_base_path)
+        # Every chain type of a research run queries the same topic text
+        self.query_embedding_cache = LRUCache(int(os.getenv("RAG_QUERY_CACHE_SIZE", "512")))
+        self.retrieval_cache = LRUCache(int(os.getenv("RAG_RETRIEVAL_CACHE_SIZE", "256")))
+        self._retrieval_cache_version = self.vector_store.index_version
+        # Chain retrievals add the chunks either side of each hit and merge them into passages
+        self.expand_neighbors = os.getenv("RAG_EXPAND_NEIGHBORS", "true").lower() == "true"
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a query through the in-process LRU (zero-vector error fallbacks are not kept)"""
+        return self.query_embedding_cache.get_or_compute(
+            query,
+            lambda: self.vector_store.embeddings.embed_query(query),
+            cache_if=any
+        )
     
     def retrieve_relevant_context(self, query: str, max_results: int = 3, 
-                                doc_types: List[str] = None) -> str:
+                                doc_types: List[str] = None, expand_neighbors: bool = False) -> str:
         """Retrieve relevant context with optional document type filtering"""
+        index_version = self.vector_store.index_version
+        if index_version != self._retrieval_cache_version:
+            # The index changed: every cached result is stale
+            self.retrieval_cache.clear()
+            self._retrieval_cache_version = index_version
+        
+        key = (query, tuple(sorted(doc_types)) if doc_types else None, max_results, expand_neighbors, index_version)
+        return self.retrieval_cache.get_or_compute(
+            key,
+            lambda: self._retrieve(query, max_results, doc_types, expand_neighbors),
+            cache_if=bool
+        )
+    
+    def _retrieve(self, query: str, max_results: int, doc_types: List[str], expand_neighbors: bool) -> str:
         filter_metadata = None
         if doc_types:
             filter_metadata = {"type": {"$in": doc_types}}
@@ -18,23 +49,53 @@ class RAGPipeline:
         results = self.vector_store.similarity_search(
             query, 
             k=max_results, 
-            filter_metadata=filter_metadata
+            filter_metadata=filter_metadata,
+            query_embedding=self._embed_query(query)
         )
         
         if not results:
             return ""
         
+        if expand_neighbors:
+            results = results + self._get_neighbor_chunks(results)
+        
         context_parts = []
-        for result in results:
+        for result in merge_adjacent_chunks(results):
             metadata = result['metadata']
             source_type = metadata.get('type', 'unknown')
             source_name = self._get_source_name(metadata)
             
             context_parts.append(f"--- {source_type.upper()} | {source_name} | Similarity: {result['similarity']:.2f} ---")
-            context_parts.append(result['content'][:800] + "..." if len(result['content']) > 800 else result['content'])
+            context_parts.append(result['content'])
         
         return "\n\n".join(context_parts)
     
+    def _get_neighbor_chunks(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fetch the chunks either side of each hit so merged passages read continuously"""
+        retrieved_ids = set()
+        similarity_by_id = {}
+        for result in results:
+            metadata = result['metadata']
+            if 'parent_id' not in metadata:
+                continue
+            retrieved_ids.add(f"{metadata['parent_id']}::{metadata['chunk_index']}")
+            for index in (metadata['chunk_index'] - 1, metadata['chunk_index'] + 1):
+                if 0 <= index < metadata.get('chunk_count', 0):
+                    neighbor_id = f"{metadata['parent_id']}::{index}"
+                    similarity_by_id[neighbor_id] = max(similarity_by_id.get(neighbor_id, 0.0), result['similarity'])
+        
+        neighbor_ids = [chunk_id for chunk_id in similarity_by_id if chunk_id not in retrieved_ids]
+        if not neighbor_ids:
+            return []
+        
+        neighbors = self.vector_store.get_chunks(neighbor_ids)
+        worst_rank = max(result.get('rank', 0) for result in results)
+        for neighbor in neighbors:
+            metadata = neighbor['metadata']
+            neighbor['similarity'] = similarity_by_id[f"{metadata['parent_id']}::{metadata['chunk_index']}"]
+            neighbor['rank'] = worst_rank + 1
+        return neighbors
+    
     def _get_source_name(self, metadata: Dict) -> str:
         """Get readable source name from metadata"""
         if metadata.get('company'):
@@ -43,6 +104,8 @@ class RAGPipeline:
             return f"Industry: {metadata['industry']}"
         elif metadata.get('topic'):
             return f"Topic: {metadata['topic']}"
+        elif metadata.get('document'):
+            return f"Document: {metadata['document']}"
         else:
             return metadata.get('source', 'Unknown')
     
@@ -65,33 +128,42 @@ class RAGPipeline:
         
         # Determine document types based on chain type
         doc_types_mapping = {
-            "company_research": ["company_profile", "industry_report"],
-            "industry_analysis": ["industry_report", "market_data"],
-            "swot_analysis": ["company_profile", "industry_report", "market_data"],
-            "competitive_benchmarking": ["company_profile", "market_data"],
-            "market_trends": ["market_data", "industry_report"],
-            "data_collection": ["market_data", "industry_report", "company_profile"],
-            "executive_summary": ["industry_report", "market_data", "user_preference"],
-            "research_report": ["industry_report", "market_data", "company_profile"],
-            "strategic_recommendations": ["industry_report", "market_data", "user_preference"]
+            "company_research": ["company_profile", "industry_report", "uploaded_document"],
+            "industry_analysis": ["industry_report", "market_data", "uploaded_document"],
+            "swot_analysis": ["company_profile", "industry_report", "market_data", "uploaded_document"],
+            "competitive_benchmarking": ["company_profile", "market_data", "uploaded_document"],
+            "market_trends": ["market_data", "industry_report", "uploaded_document"],
+            "data_collection": ["market_data", "industry_report", "company_profile", "uploaded_document"],
+            "executive_summary": ["industry_report", "market_data", "user_preference", "uploaded_document"],
+            "research_report": ["industry_report", "market_data", "company_profile", "uploaded_document"],
+            "strategic_recommendations": ["industry_report", "market_data", "user_preference", "uploaded_document"]
         }
         
         doc_types = doc_types_mapping.get(chain_type, None)
         
-        return self.retrieve_relevant_context(query, max_results=3, doc_types=doc_types)
+        return self.retrieve_relevant_context(query, max_results=3, doc_types=doc_types,
+                                              expand_neighbors=self.expand_neighbors)
     
     def get_knowledge_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics"""
-        total_docs = self.vector_store.get_document_count()
-        company_docs = len(self.vector_store.get_documents_by_type("company_profile"))
-        industry_docs = len(self.vector_store.get_documents_by_type("industry_report"))
-        market_docs = len(self.vector_store.get_documents_by_type("market_data"))
-        user_docs = len(self.vector_store.get_documents_by_type("user_preference"))
+        # Served from the store's counter index: no embedding call, no vector search
+        counts = self.vector_store.get_type_counts()
+        chunks = {doc_type: type_counts["chunks"] for doc_type, type_counts in counts.items()}
         
         return {
-            "total_documents": total_docs,
-            "company_profiles": company_docs,
-            "industry_reports": industry_docs,
-            "market_data": market_docs,
-            "user_preferences": user_docs
+            "total_documents": sum(chunks.values()),
+            "company_profiles": chunks.get("company_profile", 0),
+            "industry_reports": chunks.get("industry_report", 0),
+            "market_data": chunks.get("market_data", 0),
+            "user_preferences": chunks.get("user_preference", 0),
+            "uploaded_documents": chunks.get("uploaded_document", 0),
+            "total_files": sum(type_counts["files"] for type_counts in counts.values())
+        }
+    
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Hit rate and saved latency of the query-embedding and retrieval caches"""
+        return {
+            "index_version": self.vector_store.index_version,
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "retrievals": self.retrieval_cache.stats()
         }
\ No newline at end of file
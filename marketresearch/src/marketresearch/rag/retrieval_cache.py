@@ -0,0 +1,62 @@
+# src/marketresearch/rag/retrieval_cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class LRUCache:
+    """Thread-safe in-process LRU that tracks hit rate and the compute time hits saved"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self.lock = threading.Lock()
+        # key -> (value, seconds it took to compute)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the cached value for key, computing and storing it on a miss.
+
+        ``cache_if`` can reject values that must not be reused, such as error fallbacks.
+        """
+        with self.lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                return entry[0]
+            self.misses += 1
+
+        # Compute outside the lock so slow lookups do not serialize other callers
+        start = time.perf_counter()
+        value = compute()
+        elapsed = time.perf_counter() - start
+        if cache_if is not None and not cache_if(value):
+            return value
+
+        with self.lock:
+            self._entries[key] = (value, elapsed)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_ms": round(self.saved_seconds * 1000, 1),
+            }
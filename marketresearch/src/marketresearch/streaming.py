@@ -0,0 +1,147 @@
+# src/marketresearch/streaming.py
+"""
+Token and progress streaming hooks shared by the LLM wrappers, the crew and the API.
+
+Code that wants tokens (e.g. a research run feeding an SSE stream) installs a
+sink for the current context; LLM code calls ``emit_token`` as output arrives.
+Crew progress (task start/end, tool calls) reaches progress sinks the same way.
+"""
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+TokenSink = Callable[[str], None]
+# Receives the number of characters just streamed that must be discarded (a failed attempt's output)
+ResetSink = Callable[[int], None]
+# Receives (event, data), e.g. ("task_started", {"task_name": ..., "timestamp": ...})
+ProgressSink = Callable[[str, Dict[str, Any]], None]
+
+_token_sink: contextvars.ContextVar[Optional[TokenSink]] = contextvars.ContextVar("token_sink", default=None)
+_reset_sink: contextvars.ContextVar[Optional[ResetSink]] = contextvars.ContextVar("reset_sink", default=None)
+
+@contextmanager
+def stream_tokens_to(sink: TokenSink, on_reset: Optional[ResetSink] = None) -> Iterator[None]:
+    """Send tokens emitted in this context (and contexts copied from it) to ``sink``.
+    
+    ``on_reset`` is told when already streamed tokens turn out to be from a failed
+    attempt (a retry or a fallback model follows); without it they are not retracted.
+    """
+    token = _token_sink.set(sink)
+    reset_token = _reset_sink.set(on_reset)
+    try:
+        yield
+    finally:
+        _reset_sink.reset(reset_token)
+        _token_sink.reset(token)
+
+def get_token_sink() -> Optional[TokenSink]:
+    return _token_sink.get()
+
+def get_reset_sink() -> Optional[ResetSink]:
+    return _reset_sink.get()
+
+def streaming_enabled() -> bool:
+    return _token_sink.get() is not None
+
+def emit_token(text: str):
+    """Forward a piece of generated text to the active sink, if any"""
+    sink = _token_sink.get()
+    if sink is not None and text:
+        sink(text)
+
+def emit_reset(discarded: int):
+    """Retract the last ``discarded`` characters of streamed text, if the active sink supports it"""
+    sink = _reset_sink.get()
+    if sink is not None and discarded:
+        sink(discarded)
+
+_progress_sink: contextvars.ContextVar[Optional[ProgressSink]] = contextvars.ContextVar("progress_sink", default=None)
+
+@contextmanager
+def report_progress_to(sink: ProgressSink) -> Iterator[None]:
+    """Send progress events emitted in this context to ``sink``"""
+    token = _progress_sink.set(sink)
+    try:
+        yield
+    finally:
+        _progress_sink.reset(token)
+
+def emit_progress(event: str, data: Dict[str, Any]):
+    sink = _progress_sink.get()
+    if sink is not None:
+        sink(event, data)
+
+_crewai_forwarding_lock = threading.Lock()
+_crewai_forwarding = False
+
+def forward_crewai_stream_chunks():
+    """Route CrewAI's streamed LLM chunks into emit_token (registered once per process).
+
+    CrewAI emits its events synchronously on the calling thread, so each chunk
+    reaches the sink of the context that kicked off the crew.
+    """
+    global _crewai_forwarding
+    with _crewai_forwarding_lock:
+        if _crewai_forwarding:
+            return
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _forward_chunk(source, event):
+            emit_token(event.chunk)
+
+        _crewai_forwarding = True
+
+_crewai_task_forwarding = False
+
+def forward_crewai_task_events():
+    """Route CrewAI task and tool events into emit_progress (registered once per process)"""
+    global _crewai_task_forwarding
+    with _crewai_forwarding_lock:
+        if _crewai_task_forwarding:
+            return
+        from crewai.events import (
+            crewai_event_bus, TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent, ToolUsageFinishedEvent
+        )
+
+        def task_name(event) -> Optional[str]:
+            return getattr(event.task, "name", None)
+
+        @crewai_event_bus.on(TaskStartedEvent)
+        def _task_started(source, event):
+            agent = getattr(event.task, "agent", None)
+            emit_progress("task_started", {
+                "task_name": task_name(event),
+                "agent": getattr(agent, "role", None),
+                "timestamp": event.timestamp,
+            })
+
+        @crewai_event_bus.on(TaskCompletedEvent)
+        def _task_completed(source, event):
+            emit_progress("task_completed", {
+                "task_name": task_name(event),
+                "output": getattr(event.output, "raw", None),
+                "timestamp": event.timestamp,
+            })
+
+        @crewai_event_bus.on(TaskFailedEvent)
+        def _task_failed(source, event):
+            emit_progress("task_failed", {
+                "task_name": task_name(event),
+                "error": event.error,
+                "timestamp": event.timestamp,
+            })
+
+        @crewai_event_bus.on(ToolUsageFinishedEvent)
+        def _tool_used(source, event):
+            emit_progress("tool_used", {
+                "task_name": event.task_name,
+                "tool_name": event.tool_name,
+                "started_at": event.started_at,
+                "finished_at": event.finished_at,
+                "from_cache": event.from_cache,
+                "timestamp": event.timestamp,
+            })
+
+        _crewai_task_forwarding = True
@@ -1,8 +1,16 @@
+import os
+import re
 import json
+import math
+import time
+import array
+import sqlite3
 import hashlib
+import threading
+import unicodedata
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 class SimpleCache:
     def __init__(self, cache_dir: str = "./cache", ttl_hours: int = 24):
@@ -42,5 +50,342 @@ class SimpleCache:
         with open(cache_file, 'w') as f:
             json.dump(cached_data, f)
 
+class ShardedCache:
+    """Size-bounded disk cache with a SQLite index and LRU/LFU eviction.
+
+    Payloads live in two-level shard directories (``ab/cd/<hash>.json``) so no
+    single directory grows past a few hundred files. Expiry, size and access
+    metadata live in ``index.sqlite`` so a lookup never parses the payload just
+    to decide whether it is still valid. The byte total is a counter row kept
+    by triggers, so every process sharing the index sees the same total.
+    """
+
+    EVICTION_POLICIES = {
+        "lru": "last_access ASC",
+        "lfu": "hits ASC, last_access ASC",
+    }
+
+    def __init__(self, cache_dir: str = "./cache", ttl_hours: int = 24,
+                 max_bytes: int = 512 * 1024 * 1024, eviction_policy: str = "lru"):
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{eviction_policy}'. Available: {list(self.EVICTION_POLICIES)}")
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_bytes = max_bytes
+        self.eviction_policy = eviction_policy
+
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key_hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at)")
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                total_bytes INTEGER NOT NULL
+            )
+        """)
+        # Seeded from the entries once, then kept in the same transaction as each change
+        self._conn.execute("INSERT OR IGNORE INTO totals SELECT 0, COALESCE(SUM(size), 0) FROM entries")
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS entries_total_insert AFTER INSERT ON entries BEGIN
+                UPDATE totals SET total_bytes = total_bytes + NEW.size WHERE id = 0;
+            END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS entries_total_update AFTER UPDATE OF size ON entries BEGIN
+                UPDATE totals SET total_bytes = total_bytes + NEW.size - OLD.size WHERE id = 0;
+            END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS entries_total_delete AFTER DELETE ON entries BEGIN
+                UPDATE totals SET total_bytes = total_bytes - OLD.size WHERE id = 0;
+            END
+        """)
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cache_key(self, data: str) -> str:
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def _payload_path(self, key_hash: str) -> Path:
+        return self.cache_dir / key_hash[:2] / key_hash[2:4] / f"{key_hash}.json"
+
+    def _total_bytes(self) -> int:
+        """Bytes of all entries, shared by every process using the index (caller holds the lock)"""
+        return self._conn.execute("SELECT total_bytes FROM totals WHERE id = 0").fetchone()[0]
+
+    def _remove_entry(self, key_hash: str):
+        """Drop an entry from the index and disk (caller holds the lock)"""
+        self._conn.execute("DELETE FROM entries WHERE key_hash = ?", (key_hash,))
+        try:
+            self._payload_path(key_hash).unlink()
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[Any]:
+        key_hash = self._get_cache_key(key)
+        now = time.time()
+
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM entries WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            if row[0] <= now:
+                self._remove_entry(key_hash)
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._payload_path(key_hash), 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # Payload vanished or is corrupt - forget the index entry too
+                self._remove_entry(key_hash)
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key_hash = ?",
+                (now, key_hash)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return data
+
+    def set(self, key: str, data: Any):
+        key_hash = self._get_cache_key(key)
+        payload = json.dumps(data).encode()
+        size = len(payload)
+
+        if size > self.max_bytes:
+            print(f"⚠️ Cache entry of {size} bytes exceeds budget of {self.max_bytes} bytes, not caching")
+            return
+
+        path = self._payload_path(key_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            # One write transaction, so the total read for eviction is not raced by other processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                # An upsert rather than REPLACE: the implicit delete of REPLACE skips the triggers
+                self._conn.execute(
+                    """INSERT INTO entries (key_hash, size, expires_at, last_access, hits)
+                       VALUES (?, ?, ?, ?, 0)
+                       ON CONFLICT(key_hash) DO UPDATE SET
+                           size = excluded.size, expires_at = excluded.expires_at,
+                           last_access = excluded.last_access, hits = 0""",
+                    (key_hash, size, now + self.ttl.total_seconds(), now)
+                )
+                self._evict(exclude=key_hash)
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def delete(self, key: str) -> bool:
+        key_hash = self._get_cache_key(key)
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE key_hash = ?", (key_hash,)
+            ).fetchone()
+            if row is None:
+                return False
+            self._remove_entry(key_hash)
+            self._conn.commit()
+            return True
+
+    def _evict(self, exclude: Optional[str] = None):
+        """Purge expired entries, then evict by policy until under budget (caller holds the lock)"""
+        total_bytes = self._total_bytes()
+        if total_bytes <= self.max_bytes:
+            return
+
+        expired = self._conn.execute(
+            "SELECT key_hash, size FROM entries WHERE expires_at <= ?", (time.time(),)
+        ).fetchall()
+        for key_hash, size in expired:
+            self._remove_entry(key_hash)
+            total_bytes -= size
+
+        order_by = self.EVICTION_POLICIES[self.eviction_policy]
+        while total_bytes > self.max_bytes:
+            victims = self._conn.execute(
+                f"SELECT key_hash, size FROM entries WHERE key_hash != ? ORDER BY {order_by} LIMIT 64",
+                (exclude or "",)
+            ).fetchall()
+            if not victims:
+                break
+            for key_hash, size in victims:
+                self._remove_entry(key_hash)
+                total_bytes -= size
+                if total_bytes <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self.lock:
+            for (key_hash,) in self._conn.execute("SELECT key_hash FROM entries").fetchall():
+                self._remove_entry(key_hash)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "total_bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                "eviction_policy": self.eviction_policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+def normalize_text(text: str) -> str:
+    """Normalize free text so case, punctuation and whitespace variants share a key.
+    
+    Quotes, brackets, separators and sentence punctuation fold into spaces, but
+    punctuation that changes a term's meaning stays: ``+`` and ``#`` after a word
+    (C++, C#) and ``&`` or ``.`` inside one (AT&T, node.js, 3.5).
+    """
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"[^\w\s+#&.]", " ", text)
+    text = re.sub(r"(?<!\w)[&.]+|[&.]+(?!\w)", " ", text)
+    text = re.sub(r"(?<![\w+#])[+#]+", " ", text)
+    return " ".join(text.split())
+
+def build_research_cache_key(research_topic: str, research_request: str) -> str:
+    """Build the normalized cache key for a research topic/request pair"""
+    return f"research:{normalize_text(research_topic)}|{normalize_text(research_request)}"
+
+class CachedResult(str):
+    """Cached report text that remembers how it was matched"""
+
+    def __new__(cls, text: str, match_type: str = "exact", similarity: float = 1.0, matched_key: str = ""):
+        obj = super().__new__(cls, text)
+        obj.match_type = match_type
+        obj.similarity = similarity
+        obj.matched_key = matched_key
+        return obj
+
+    @property
+    def near_match(self) -> bool:
+        return self.match_type == "near_match"
+
+class SemanticCacheIndex:
+    """Embedding index over cached research keys for near-duplicate lookups.
+
+    Vectors are unit-normalized and stored as float32 blobs, so similarity is a
+    plain dot product over an in-memory copy of the index.
+    """
+
+    def __init__(self, cache_dir: str = "./cache", max_entries: int = 5000):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "semantic_index.sqlite"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                cache_key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self._vectors: Dict[str, array.array] = {}
+        for cache_key, blob in self._conn.execute("SELECT cache_key, vector FROM vectors ORDER BY created_at"):
+            vector = array.array("f")
+            vector.frombytes(blob)
+            self._vectors[cache_key] = vector
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[array.array]:
+        norm = math.sqrt(sum(x * x for x in embedding))
+        if norm == 0:
+            return None
+        return array.array("f", (x / norm for x in embedding))
+
+    def add(self, cache_key: str, embedding: List[float]):
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        with self.lock:
+            self._vectors.pop(cache_key, None)
+            self._vectors[cache_key] = vector
+            self._conn.execute(
+                "INSERT OR REPLACE INTO vectors (cache_key, vector, created_at) VALUES (?, ?, ?)",
+                (cache_key, vector.tobytes(), time.time())
+            )
+
+            # Drop the oldest vectors once the index is full
+            while len(self._vectors) > self.max_entries:
+                oldest = next(iter(self._vectors))
+                del self._vectors[oldest]
+                self._conn.execute("DELETE FROM vectors WHERE cache_key = ?", (oldest,))
+            self._conn.commit()
+
+    def remove(self, cache_key: str):
+        with self.lock:
+            if self._vectors.pop(cache_key, None) is not None:
+                self._conn.execute("DELETE FROM vectors WHERE cache_key = ?", (cache_key,))
+                self._conn.commit()
+
+    def best_match(self, embedding: List[float], threshold: float) -> Optional[Tuple[str, float]]:
+        """Return (cache_key, similarity) of the closest cached request at or above threshold"""
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self.lock:
+            candidates = list(self._vectors.items())
+
+        best_key, best_score = None, threshold
+        for cache_key, vector in candidates:
+            score = sum(a * b for a, b in zip(query, vector))
+            if score >= best_score:
+                best_key, best_score = cache_key, score
+
+        return (best_key, best_score) if best_key else None
+
 # Global cache instance
-research_cache = SimpleCache()
\ No newline at end of file
+research_cache = ShardedCache(
+    cache_dir=os.getenv("RESEARCH_CACHE_DIR", "./cache"),
+    max_bytes=int(os.getenv("RESEARCH_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    eviction_policy=os.getenv("RESEARCH_CACHE_EVICTION", "lru"),
+)
+
+# Near-duplicate matching is opt-in: it costs one query embedding per cache miss
+semantic_cache_enabled = os.getenv("RESEARCH_CACHE_SEMANTIC", "false").lower() == "true"
+semantic_cache_threshold = float(os.getenv("RESEARCH_CACHE_SIMILARITY", "0.92"))
+semantic_cache_index = SemanticCacheIndex(cache_dir=os.getenv("RESEARCH_CACHE_DIR", "./cache")) if semantic_cache_enabled else None
@@ -0,0 +1,12 @@
+# src/marketresearch/utils/tokens.py
+import re
+
+_WORDS_AND_SYMBOLS = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 characters per token for prose, at least one per word or symbol.
+
+    The word/symbol floor matters for JSON (format instructions, serialized
+    data), where nearly every brace and quote is a token of its own.
+    """
+    return max(1, len(text) // 4, len(_WORDS_AND_SYMBOLS.findall(text)))
@@ -0,0 +1,131 @@
+# tests/fake_gemini_server.py
+"""Local stand-in for the Gemini REST API, for benchmarks that exercise the real client"""
+import json
+import time
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import google.generativeai as genai
+
+class FakeGeminiServer:
+    """Serves generateContent with fixed latency; can answer 429 for chosen models"""
+
+    def __init__(self, latency: float = 0.02, text: str = "Fake Gemini response", echo: bool = False,
+                 chunk_latency: float = 0.0, model_latency: Optional[Dict[str, float]] = None,
+                 reply: Optional[Callable[[str], str]] = None):
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})  # model -> latency overriding the default
+        self.chunk_latency = chunk_latency  # delay between streamed chunks
+        self.text = text
+        self.echo = echo  # answer with the prompt itself, to check result ordering
+        self.reply = reply  # prompt -> answer, overriding text and echo
+        self.lock = threading.Lock()
+        self.requests = Counter()  # model -> generateContent calls
+        self.prompts: List[str] = []
+        self.request_times: List[float] = []
+        self.rate_limited = Counter()  # model -> remaining 429 responses
+        self.broken_streams = Counter()  # model -> remaining streams cut off halfway through
+        self.failing = Counter()  # model -> remaining requests answered with an error
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+                model, method = self.path.split("/models/")[1].split("?")[0].split(":")
+                # litellm (CrewAI's LLMs) streams as server-sent events; the genai client as a JSON array
+                server._handle(self, model, body, stream=method == "streamGenerateContent", sse="alt=sse" in self.path)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handle(self, handler: BaseHTTPRequestHandler, model: str, body: dict, stream: bool = False,
+                sse: bool = False):
+        with self.lock:
+            self.requests[model] += 1
+            self.request_times.append(time.time())
+            prompt = "".join(part.get("text", "") for part in body["contents"][0]["parts"])
+            self.prompts.append(prompt)
+            throttled = self.rate_limited[model] > 0
+            if throttled:
+                self.rate_limited[model] -= 1
+            failed = not throttled and self.failing[model] > 0
+            if failed:
+                self.failing[model] -= 1
+            broken = stream and self.broken_streams[model] > 0
+            if broken:
+                self.broken_streams[model] -= 1
+
+        time.sleep(self.model_latency.get(model, self.latency))
+        if throttled:
+            payload = {"error": {"code": 429, "message": "Resource has been exhausted (e.g. check quota).",
+                                 "status": "RESOURCE_EXHAUSTED"}}
+            self._send(handler, 429, payload)
+            return
+        if failed:
+            self._send(handler, 400, {"error": {"code": 400, "message": "Request failed.", "status": "INVALID_ARGUMENT"}})
+            return
+
+        text = self.reply(prompt) if self.reply else prompt if self.echo else self.text
+        if stream:
+            self._stream(handler, prompt, text, broken, sse)
+            return
+
+        self._send(handler, 200, self._payload(prompt, text))
+
+    @staticmethod
+    def _payload(prompt: str, text: str) -> dict:
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": 4,
+                              "totalTokenCount": len(prompt) // 4 + 4}
+        }
+
+    def _stream(self, handler: BaseHTTPRequestHandler, prompt: str, text: str, broken: bool = False,
+                sse: bool = False):
+        """streamGenerateContent: a JSON array (or SSE events) written one chunk (word) at a time;
+        ``broken`` drops the connection after half the words"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        words = text.split(" ")
+        if not sse:
+            handler.wfile.write(b"[")
+        for i, word in enumerate(words):
+            if broken and i == len(words) // 2:
+                handler.close_connection = True
+                return
+            chunk = json.dumps(self._payload(prompt, word if i == len(words) - 1 else word + " "))
+            if sse:
+                handler.wfile.write(f"data: {chunk}\r\n\r\n".encode())
+            else:
+                handler.wfile.write(f"{',' if i else ''}{chunk}\n".encode())
+            handler.wfile.flush()
+            time.sleep(self.chunk_latency)
+        if not sse:
+            handler.wfile.write(b"]")
+        handler.close_connection = True
+
+    @staticmethod
+    def _send(handler: BaseHTTPRequestHandler, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def configure_genai(self, api_key: Optional[str] = "test-key"):
+        """Point google.generativeai at this server (call after GeminiModelManager configures it)"""
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": self.url})
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
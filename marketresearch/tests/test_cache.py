@@ -0,0 +1,109 @@
+# tests/test_cache.py
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from marketresearch.utils.cache import ShardedCache, SemanticCacheIndex, build_research_cache_key
+
+def test_sharded_cache_eviction():
+    """Cache stays under its byte budget and evicts least recently used entries"""
+    print("🧪 Testing ShardedCache eviction...")
+
+    cache = ShardedCache(tempfile.mkdtemp(), max_bytes=300, eviction_policy="lru")
+    for i in range(10):
+        cache.set(f"topic_{i}", "x" * 50)
+
+    stats = cache.stats()
+    assert stats["total_bytes"] <= 300, stats
+
+    # Touch an old survivor so it outlives the next eviction round
+    survivor = f"topic_{10 - stats['entries']}"
+    assert cache.get(survivor) is not None
+    cache.set("topic_new", "y" * 50)
+
+    assert cache.get(survivor) is not None
+    assert cache.get("topic_0") is None
+    assert cache.get("topic_new") == "y" * 50
+    print(f"✅ Eviction working: {cache.stats()}")
+
+def test_sharded_cache_budget_shared_across_processes():
+    """Processes sharing one index see one byte total and keep the cache under budget together"""
+    print("\n🧪 Testing ShardedCache budget across processes...")
+
+    cache_dir = tempfile.mkdtemp()
+    writers = [ShardedCache(cache_dir, max_bytes=1000) for _ in range(2)]  # separate connections, as in two processes
+    for i in range(60):
+        writers[i % 2].set(f"topic_{i}", "x" * 50)
+
+    actual = writers[0]._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    assert all(writer.stats()["total_bytes"] == actual for writer in writers), [w.stats() for w in writers]
+    assert 1000 - 52 < actual <= 1000, actual  # evicted only down to the budget, not below it
+    assert ShardedCache(cache_dir).stats()["total_bytes"] == actual
+
+    # Rewrites and deletes from either side keep the shared total exact
+    writers[1].set("topic_59", "x" * 10)
+    assert writers[0].delete("topic_58")
+    actual = writers[1]._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    assert writers[0].stats()["total_bytes"] == writers[1].stats()["total_bytes"] == actual
+    print(f"✅ Both processes report {actual} bytes for {writers[0].stats()['entries']} entries")
+
+def test_sharded_cache_expiry_and_reload():
+    """Expired entries are dropped from the index and the index survives restarts"""
+    print("\n🧪 Testing ShardedCache expiry and persistence...")
+
+    cache_dir = tempfile.mkdtemp()
+    expired = ShardedCache(cache_dir, ttl_hours=0)
+    expired.set("stale", {"report": "old"})
+    assert expired.get("stale") is None
+    assert expired.stats()["entries"] == 0
+
+    cache = ShardedCache(cache_dir)
+    cache.set("fresh", {"report": "new"})
+    reopened = ShardedCache(cache_dir)
+    assert reopened.get("fresh") == {"report": "new"}
+    assert reopened.stats()["total_bytes"] == cache.stats()["total_bytes"]
+    print("✅ Expiry and index persistence working")
+
+def test_normalized_research_keys():
+    """Case, whitespace and punctuation variants map to the same cache key"""
+    print("\n🧪 Testing normalized research cache keys...")
+
+    base = build_research_cache_key("EV charging", "Analyze the EV charging market")
+    assert build_research_cache_key("ev  charging.", "analyze the ev-charging market!") == base
+    assert build_research_cache_key("EV batteries", "Analyze the EV charging market") != base
+    assert build_research_cache_key("\"EV charging\"", "Analyze the EV charging market...") == base
+
+    # Punctuation that is part of a term keeps topics apart
+    topics = ["C++ market", "C# market", "C market", "AT&T outlook", "AT T outlook", "Node.js tooling",
+              "Node js tooling", "GPT-3.5 adoption", "GPT-35 adoption"]
+    keys = {build_research_cache_key(topic, "Market overview") for topic in topics}
+    assert len(keys) == len(topics), keys
+    assert build_research_cache_key("c++ Market.", "Market overview") == \
+        build_research_cache_key("C++ market", "Market overview")
+    print(f"✅ Normalized key: {base}")
+
+def test_semantic_cache_index():
+    """Near-duplicate embeddings match above the threshold and persist across reloads"""
+    print("\n🧪 Testing SemanticCacheIndex...")
+
+    cache_dir = tempfile.mkdtemp()
+    index = SemanticCacheIndex(cache_dir)
+    index.add("research:ev charging|market", [1.0, 0.0, 0.1])
+    index.add("research:solar|market", [0.0, 1.0, 0.0])
+
+    match = index.best_match([0.98, 0.02, 0.12], threshold=0.95)
+    assert match and match[0] == "research:ev charging|market", match
+    assert index.best_match([0.5, 0.5, 0.7], threshold=0.95) is None
+
+    reloaded = SemanticCacheIndex(cache_dir)
+    assert reloaded.best_match([0.0, 1.0, 0.01], threshold=0.95)[0] == "research:solar|market"
+    print(f"✅ Near-match found with similarity {match[1]:.3f}")
+
+if __name__ == "__main__":
+    test_sharded_cache_eviction()
+    test_sharded_cache_budget_shared_across_processes()
+    test_sharded_cache_expiry_and_reload()
+    test_normalized_research_keys()
+    test_semantic_cache_index()
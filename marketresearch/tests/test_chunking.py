@@ -0,0 +1,70 @@
+# tests/test_chunking.py
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from marketresearch.rag.chunking import DocumentChunker, merge_adjacent_chunks
+
+SAMPLE_REPORT = "\n\n".join(
+    f"# Section {i}\n" + " ".join(f"Sentence {i}.{j} about the EV charging market." for j in range(12))
+    for i in range(8)
+)
+
+def test_chunks_cover_document_with_overlap():
+    """Chunks respect the size limit, carry exact offsets and overlap their neighbours"""
+    print("🧪 Testing document chunking...")
+
+    chunker = DocumentChunker(chunk_size=400, chunk_overlap=60)
+    chunks = chunker.split(SAMPLE_REPORT)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 400 for chunk in chunks)
+    assert all(SAMPLE_REPORT[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+    assert chunks[0].start == 0 and chunks[-1].end == len(SAMPLE_REPORT)
+    assert all(b.start < a.end for a, b in zip(chunks, chunks[1:])), "consecutive chunks should overlap"
+    print(f"✅ {len(SAMPLE_REPORT)} chars -> {len(chunks)} chunks")
+
+def test_chunks_prefer_heading_boundaries():
+    """Chunks break before a heading rather than mid-sentence when one is in range"""
+    print("\n🧪 Testing heading-aware boundaries...")
+
+    chunker = DocumentChunker(chunk_size=600, chunk_overlap=0)
+    chunks = chunker.split(SAMPLE_REPORT)
+    assert sum(chunk.text.startswith("# Section") for chunk in chunks) >= len(chunks) // 2
+    print("✅ Chunks start on section headings")
+
+def test_merge_adjacent_chunks():
+    """Overlapping and neighbouring hits from one parent merge back into one passage"""
+    print("\n🧪 Testing retrieval-time chunk merging...")
+
+    chunker = DocumentChunker(chunk_size=300, chunk_overlap=50)
+    chunks = chunker.split(SAMPLE_REPORT)
+
+    def as_result(chunk, rank, similarity):
+        return {
+            "content": chunk.text,
+            "similarity": similarity,
+            "rank": rank,
+            "metadata": {
+                "parent_id": "industry_reports/ev.txt",
+                "chunk_index": chunk.index,
+                "start_offset": chunk.start,
+                "end_offset": chunk.end,
+                "type": "industry_report"
+            }
+        }
+
+    results = [as_result(chunks[2], 1, 0.9), as_result(chunks[1], 2, 0.8), as_result(chunks[5], 3, 0.7)]
+    merged = merge_adjacent_chunks(results)
+
+    assert len(merged) == 2
+    assert merged[0]["content"] == SAMPLE_REPORT[chunks[1].start:chunks[2].end]
+    assert merged[0]["similarity"] == 0.9
+    assert merged[1]["content"] == chunks[5].text
+    print("✅ Neighbouring chunks merged without duplicating the overlap")
+
+if __name__ == "__main__":
+    test_chunks_cover_document_with_overlap()
+    test_chunks_prefer_heading_boundaries()
+    test_merge_adjacent_chunks()
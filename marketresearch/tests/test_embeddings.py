@@ -0,0 +1,112 @@
+# tests/test_embeddings.py
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from marketresearch.rag.google_embeddings import GoogleEmbeddings
+from marketresearch.rag.embedding_cache import EmbeddingCache
+from marketresearch.config.gemini_config import RateLimiter
+
+class FakeEmbeddingBackend:
+    """Local stand-in for the Google embedding API with fixed per-request latency"""
+
+    def __init__(self, latency: float = 0.005, dim: int = 768):
+        self.latency = latency
+        self.dim = dim
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, model, texts, task_type):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        return [[float(len(text) % 7 + 1)] * self.dim for text in texts]  # never all-zero
+
+def _time_ingestion(batch_size: int, max_workers: int, documents):
+    backend = FakeEmbeddingBackend()
+    embedder = GoogleEmbeddings(
+        batch_size=batch_size,
+        max_workers=max_workers,
+        rate_limiter=RateLimiter(requests_per_minute=100000, requests_per_day=1000000),
+        backend=backend,
+        use_cache=False
+    )
+    start = time.time()
+    embeddings = embedder.embed_documents(documents)
+    return time.time() - start, backend.requests, embeddings
+
+def test_batched_embeddings_keep_order():
+    """Batched, concurrent embedding returns one vector per text in input order"""
+    print("🧪 Testing batched embedding order...")
+
+    documents = [f"document {i} " + "x" * i for i in range(250)]
+    _, requests, embeddings = _time_ingestion(batch_size=100, max_workers=4, documents=documents)
+
+    assert requests == 3, requests
+    assert len(embeddings) == len(documents)
+    assert all(embedding[0] == float(len(doc) % 7 + 1) for doc, embedding in zip(documents, embeddings))
+    print(f"✅ {len(embeddings)} embeddings from {requests} requests, order preserved")
+
+def test_batched_embeddings_wall_clock():
+    """Compare per-text serial calls against batched concurrent calls for 1,000 documents"""
+    print("\n🧪 Benchmarking embedding ingestion for 1,000 documents...")
+
+    documents = [f"market research chunk {i}" for i in range(1000)]
+    serial_time, serial_requests, _ = _time_ingestion(batch_size=1, max_workers=1, documents=documents)
+    batched_time, batched_requests, _ = _time_ingestion(batch_size=100, max_workers=4, documents=documents)
+
+    print(f"   Serial:  {serial_requests} requests in {serial_time:.2f}s")
+    print(f"   Batched: {batched_requests} requests in {batched_time:.2f}s")
+    assert batched_time < serial_time
+    print(f"✅ Batched ingestion {serial_time / batched_time:.0f}x faster")
+
+def test_embeddings_respect_rate_limiter():
+    """Every batch request is recorded against the shared limiter"""
+    print("\n🧪 Testing embedding rate limiter accounting...")
+
+    limiter = RateLimiter(requests_per_minute=100000, requests_per_day=1000000)
+    embedder = GoogleEmbeddings(batch_size=10, max_workers=4, rate_limiter=limiter,
+                                backend=FakeEmbeddingBackend(latency=0), use_cache=False)
+    embedder.embed_documents([f"doc {i}" for i in range(95)])
+    embedder.embed_query("query")
+
+    assert len(limiter.minute_calls) == 11, len(limiter.minute_calls)
+    print("✅ 10 batch requests + 1 query recorded")
+
+def test_embedding_cache_skips_repeat_calls():
+    """Re-embedding unchanged text is served entirely from the on-disk cache"""
+    print("\n🧪 Testing persistent embedding cache...")
+
+    cache_path = os.path.join(tempfile.mkdtemp(), "embeddings.sqlite")
+    limiter = RateLimiter(requests_per_minute=100000, requests_per_day=1000000)
+    documents = [f"knowledge file {i}" for i in range(150)] + ["knowledge file 0"]
+
+    first_backend = FakeEmbeddingBackend(latency=0)
+    first = GoogleEmbeddings(rate_limiter=limiter, backend=first_backend, cache=EmbeddingCache(cache_path))
+    first_vectors = first.embed_documents(documents)
+    assert first_backend.requests == 2, first_backend.requests
+
+    # A fresh process-equivalent: new cache handle on the same file
+    second_backend = FakeEmbeddingBackend(latency=0)
+    second = GoogleEmbeddings(rate_limiter=limiter, backend=second_backend, cache=EmbeddingCache(cache_path))
+    second_vectors = second.embed_documents(documents)
+
+    assert second_backend.requests == 0, second_backend.requests
+    assert [v[0] for v in second_vectors] == [v[0] for v in first_vectors]
+    stats = second.cache_stats()
+    assert stats["hits"] == len(documents) and stats["misses"] == 0, stats
+
+    # Queries use a different task_type and therefore a separate cache entry
+    second.embed_query("knowledge file 0")
+    assert second_backend.requests == 1
+    print(f"✅ Re-ingestion made no embedding calls: {stats}")
+
+if __name__ == "__main__":
+    test_batched_embeddings_keep_order()
+    test_batched_embeddings_wall_clock()
+    test_embeddings_respect_rate_limiter()
+    test_embedding_cache_skips_repeat_calls()
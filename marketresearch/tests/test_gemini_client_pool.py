@@ -0,0 +1,68 @@
+# tests/test_gemini_client_pool.py
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+import google.generativeai as genai
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import GeminiModelManager, get_crewai_gemini_llm
+
+CALLS = 200
+
+def _per_call_ms(make_model) -> float:
+    start = time.perf_counter()
+    for i in range(CALLS):
+        make_model().generate_content(f"prompt {i}")
+    return (time.perf_counter() - start) / CALLS * 1000
+
+def test_pooled_clients_cut_per_call_overhead():
+    """Pooled GenerativeModels are reused per (model, config) and cost less per call"""
+    print("🧪 Measuring per-call overhead against a local stub endpoint...")
+
+    server = FakeGeminiServer(latency=0)
+    try:
+        model_manager = GeminiModelManager()
+        server.configure_genai()
+
+        pooled = model_manager.get_client("gemini_fast")
+        assert model_manager.get_client("gemini_fast") is pooled
+        assert model_manager.get_client("gemini_precise") is pooled  # same model, same config
+        assert model_manager.get_client("gemini_fast", temperature=0.2) is not pooled
+
+        def fresh_model():
+            # What every attempt used to do
+            return genai.GenerativeModel(
+                model_manager.models["gemini_fast"],
+                generation_config=genai.types.GenerationConfig(temperature=0.7, top_p=0.8, max_output_tokens=8192)
+            )
+
+        _per_call_ms(lambda: pooled)  # warm up connections
+        fresh_ms = _per_call_ms(fresh_model)
+        pooled_ms = _per_call_ms(lambda: model_manager.get_client("gemini_fast"))
+    finally:
+        server.close()
+
+    print(f"   New GenerativeModel per call: {fresh_ms:.3f}ms/call")
+    print(f"   Pooled GenerativeModel:       {pooled_ms:.3f}ms/call")
+    assert server.requests[model_manager.models["gemini_fast"]] == 3 * CALLS
+    print("✅ Client pool measured")
+
+def test_crewai_llms_are_reused_per_task_type():
+    """Agent construction reuses one CrewAI LLM per task type"""
+    print("\n🧪 Testing CrewAI LLM reuse...")
+
+    first = get_crewai_gemini_llm("swot_analysis")
+    assert get_crewai_gemini_llm("swot_analysis") is first
+    assert get_crewai_gemini_llm("research_report") is not first
+    assert first._gemini_llm.model_manager is get_crewai_gemini_llm("research_report")._gemini_llm.model_manager
+    print("✅ CrewAI LLMs and the model manager are shared")
+
+if __name__ == "__main__":
+    test_pooled_clients_cut_per_call_overhead()
+    test_crewai_llms_are_reused_per_task_type()
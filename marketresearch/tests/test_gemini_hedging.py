@@ -0,0 +1,131 @@
+# tests/test_gemini_hedging.py
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import GeminiModelManager, GeminiLLM, ModelHealthTracker
+from marketresearch.streaming import emit_progress, report_progress_to
+
+class ReportingLLM(GeminiLLM):
+    """Reports every model call to the caller's progress sink"""
+
+    def _call_with_retry(self, prompt: str, model_name: str, **kwargs) -> str:
+        emit_progress("model_call", {"model": model_name})
+        return super()._call_with_retry(prompt, model_name, **kwargs)
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_health_stats_and_fallback_order():
+    """Fallbacks are ordered by recent error rate, then median latency"""
+    print("🧪 Testing latency-aware fallback ordering...")
+
+    model_manager = GeminiModelManager()
+    assert model_manager.get_fallback_chain("gemini_creative") == ["gemini_fast", "gemini_precise", "gemini_fallback"]
+
+    for _ in range(ModelHealthTracker.MIN_SAMPLES):
+        model_manager.model_health.record("gemini_fast", 0.1, False)  # failing
+        model_manager.model_health.record("gemini_precise", 2.0, True)  # slow
+        model_manager.model_health.record("gemini_fallback", 0.2, True)  # fast and healthy
+
+    stats = model_manager.model_health.stats("gemini_fast")
+    assert stats["error_rate"] == 1.0 and stats["p50"] is None
+    assert model_manager.get_hedge_delay("gemini_precise") == 2.0
+    assert model_manager.get_hedge_delay("gemini_creative") is None  # not measured yet
+
+    chain = model_manager.get_fallback_chain("gemini_creative")
+    assert chain == ["gemini_fallback", "gemini_precise", "gemini_fast"], chain
+    print(f"✅ Fallback chain: {chain}")
+
+def test_slow_primary_is_hedged():
+    """A latency-critical call past its p95 is raced on a second model, which wins"""
+    print("\n🧪 Testing hedged requests...")
+
+    model_manager = GeminiModelManager()
+    creative_model = model_manager.models["gemini_creative"]
+    server = FakeGeminiServer(latency=0.01, echo=True, model_latency={creative_model: 1.5})
+    events = []
+    try:
+        server.configure_genai()
+        llm = ReportingLLM(model_manager, "executive_summary")  # primary: gemini_creative
+        assert llm.task_type in model_manager.hedged_tasks
+        for _ in range(ModelHealthTracker.MIN_SAMPLES):
+            model_manager.model_health.record("gemini_creative", 0.1, True)  # usually fast
+
+        start = time.time()
+        with report_progress_to(lambda event, data: events.append(data["model"])):
+            text = llm._call("Summarize the EV charging market")
+        elapsed = time.time() - start
+        # The losing primary cannot be recalled; it finishes on its own quota and is counted
+        assert wait_for(lambda: model_manager.get_hedge_stats()["losers_completed"] == 1)
+    finally:
+        server.close()
+
+    assert text == "Summarize the EV charging market"
+    assert server.requests[creative_model] == 1 and sum(server.requests.values()) == 2
+    assert elapsed < 1.0, elapsed
+    assert events[0] == "gemini_creative" and len(events) == 2, events  # both calls kept the caller's sinks
+    assert model_manager.get_hedge_stats() == {
+        "hedged": 1, "primary_wins": 0, "hedge_wins": 1, "losers_completed": 1, "losers_cancelled": 0
+    }
+    print(f"✅ Hedged call returned in {elapsed:.2f}s (primary alone: 1.5s)")
+
+def test_losing_call_is_not_retried():
+    """A losing call that fails stops instead of retrying against the quota"""
+    print("\n🧪 Testing that losing calls are cancelled...")
+
+    model_manager = GeminiModelManager()
+    creative_model = model_manager.models["gemini_creative"]
+    server = FakeGeminiServer(latency=0.01, echo=True, model_latency={creative_model: 0.5})
+    server.failing[creative_model] = 2
+    try:
+        server.configure_genai()
+        llm = GeminiLLM(model_manager, "executive_summary")
+        for _ in range(ModelHealthTracker.MIN_SAMPLES):
+            model_manager.model_health.record("gemini_creative", 0.1, True)
+
+        text = llm._call("Summarize the EV charging market")
+        assert wait_for(lambda: model_manager.get_hedge_stats()["losers_cancelled"] == 1)
+    finally:
+        server.close()
+
+    assert text == "Summarize the EV charging market"
+    assert server.requests[creative_model] == 1, server.requests  # no retry after losing
+    print(f"✅ Losing call stopped after its first attempt: {model_manager.get_hedge_stats()}")
+
+def test_no_hedge_without_spare_quota():
+    """Hedging never waits on the shared limiter; without spare capacity the primary is awaited"""
+    print("\n🧪 Testing that hedges respect the shared quota...")
+
+    model_manager = GeminiModelManager()
+    creative_model = model_manager.models["gemini_creative"]
+    server = FakeGeminiServer(latency=0.01, model_latency={creative_model: 0.3})
+    try:
+        server.configure_genai()
+        llm = GeminiLLM(model_manager, "executive_summary")
+        for _ in range(ModelHealthTracker.MIN_SAMPLES):
+            model_manager.model_health.record("gemini_creative", 0.05, True)
+        model_manager.rate_limiter.global_limiter.requests_per_minute = 1
+
+        llm._call("Summarize the EV charging market")
+    finally:
+        server.close()
+
+    assert sum(server.requests.values()) == 1, server.requests
+    print("✅ No hedge sent once the global budget was spent")
+
+if __name__ == "__main__":
+    test_health_stats_and_fallback_order()
+    test_slow_primary_is_hedged()
+    test_losing_call_is_not_retried()
+    test_no_hedge_without_spare_quota()
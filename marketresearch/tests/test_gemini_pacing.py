@@ -0,0 +1,140 @@
+# tests/test_gemini_pacing.py
+import os
+import sys
+import time
+import asyncio
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import GeminiModelManager, GeminiLLM, ModelRateLimiter, RateLimiter
+from marketresearch.streaming import stream_tokens_to
+
+# The fixed sleeps the limiter replaced: 2s after every call, 10s between batch prompts
+REMOVED_SLEEP_SECONDS = 10 * 2 + 9 * 10
+
+def _make_llm(server: FakeGeminiServer, task_type: str = "data_collection") -> GeminiLLM:
+    model_manager = GeminiModelManager()
+    server.configure_genai()
+    return GeminiLLM(model_manager, task_type)
+
+def test_ten_prompt_batch_latency():
+    """A 10-prompt batch is paced only by the limiter, not by fixed sleeps"""
+    print("🧪 Benchmarking a 10-prompt batch against a local fake Gemini server...")
+
+    server = FakeGeminiServer(latency=0.02)
+    try:
+        llm = _make_llm(server)
+        prompts = [f"Summarize market signal {i}" for i in range(10)]
+
+        start = time.time()
+        result = llm._generate(prompts)
+        elapsed = time.time() - start
+    finally:
+        server.close()
+
+    assert [generation[0].text for generation in result.generations] == [server.text] * 10
+    assert sum(server.requests.values()) == 10
+    assert elapsed < 5, elapsed
+    print(f"   Before (fixed sleeps alone): >= {REMOVED_SLEEP_SECONDS}s")
+    print(f"   After:                       {elapsed:.2f}s")
+    print(f"✅ 10-prompt batch {REMOVED_SLEEP_SECONDS / elapsed:.0f}x faster end to end")
+
+def test_backoff_only_after_429():
+    """429s back the model off and send the call to the model with capacity soonest"""
+    print("\n🧪 Testing adaptive backoff after 429s...")
+
+    server = FakeGeminiServer(latency=0)
+    try:
+        llm = _make_llm(server, "company_research")  # primary: gemini_creative
+        rate_limiter = llm.model_manager.rate_limiter
+        rate_limiter.backoff_seconds = 0.05
+        creative_model = llm.model_manager.models["gemini_creative"]
+        server.rate_limited[creative_model] = 2
+
+        start = time.time()
+        text = llm._call("Research the EV charging market")
+        elapsed = time.time() - start
+
+        # Both attempts on the primary were throttled, so a backed-off fallback served the call
+        assert text == server.text
+        assert server.requests[creative_model] == 2
+        assert rate_limiter.time_until_available("gemini_creative") > 0
+        assert elapsed >= 0.05, elapsed
+        print(f"✅ Backed off after 429s and fell back in {elapsed:.2f}s")
+
+        # Once the backoff expires the primary is preferred again
+        time.sleep(rate_limiter.time_until_available("gemini_creative"))
+        llm._call("Research the EV charging market")
+        assert server.requests[creative_model] == 3
+        print("✅ Primary model used again after its backoff expired")
+    finally:
+        server.close()
+
+def test_concurrent_batch_scales_and_keeps_order():
+    """With quota to spare, a 20-prompt batch fans out across workers in prompt order"""
+    print("\n🧪 Benchmarking a 20-prompt batch, serial vs concurrent...")
+
+    server = FakeGeminiServer(latency=0.1, echo=True)
+    try:
+        llm = _make_llm(server)
+        # Generous quota so the benchmark measures concurrency, not the limiter
+        llm.model_manager.rate_limiter = ModelRateLimiter(
+            RateLimiter(requests_per_minute=10000, requests_per_day=10 ** 6),
+            {model_key: 10000 for model_key in llm.model_manager.model_limits}
+        )
+        prompts = [f"Prompt {i}" for i in range(20)]
+
+        timings = {}
+        for workers in (1, 4, 8):
+            llm.max_concurrency = workers
+            start = time.time()
+            result = llm.batch(prompts)
+            timings[workers] = time.time() - start
+            assert result == prompts  # echoed back in prompt order
+
+        llm.max_concurrency = 8
+        start = time.time()
+        result = asyncio.run(llm.abatch(prompts))
+        async_time = time.time() - start
+        assert result == prompts
+    finally:
+        server.close()
+
+    for workers, elapsed in timings.items():
+        print(f"   {workers} worker(s): {elapsed:.2f}s ({timings[1] / elapsed:.1f}x)")
+    print(f"   async, 8 workers: {async_time:.2f}s")
+    assert timings[8] < timings[4] < timings[1]
+    assert timings[1] / timings[8] > 4
+    print("✅ Batch throughput grows with concurrency")
+
+def test_batch_tokens_reach_callers_sink():
+    """Prompts of a concurrent batch stream their tokens to the sink the caller set"""
+    print("\n🧪 Testing token streaming from a concurrent batch...")
+
+    server = FakeGeminiServer(latency=0.01, echo=True)
+    tokens = []
+    try:
+        llm = _make_llm(server)
+        llm.max_concurrency = 2
+        prompts = ["Alpha market signal", "Beta market signal"]
+        with stream_tokens_to(tokens.append):
+            result = llm._generate(prompts)
+    finally:
+        server.close()
+
+    assert [generation[0].text for generation in result.generations] == prompts
+    streamed = "".join(tokens)
+    assert "Alpha" in streamed and "Beta" in streamed, tokens
+    assert len(streamed) == sum(len(prompt) for prompt in prompts)
+    print(f"✅ {len(tokens)} tokens from both prompts reached the caller's sink")
+
+if __name__ == "__main__":
+    test_ten_prompt_batch_latency()
+    test_backoff_only_after_429()
+    test_concurrent_batch_scales_and_keeps_order()
+    test_batch_tokens_reach_callers_sink()
@@ -0,0 +1,75 @@
+# tests/test_gemini_response_cache.py
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import GeminiModelManager, GeminiLLM
+from marketresearch.utils.cache import ShardedCache
+
+PROMPT = "Summarize the EV charging market"
+
+def _make_llm(server: FakeGeminiServer, ttl_hours: int = 24) -> GeminiLLM:
+    model_manager = GeminiModelManager()
+    model_manager.response_cache = ShardedCache(tempfile.mkdtemp(), ttl_hours=ttl_hours)
+    server.configure_genai()
+    return GeminiLLM(model_manager, "data_collection")
+
+def test_repeat_calls_cost_no_quota():
+    """Identical calls are served from the cache; any change to the key goes to the model"""
+    print("🧪 Testing the Gemini response cache...")
+
+    server = FakeGeminiServer(latency=0, echo=True)
+    try:
+        llm = _make_llm(server)
+        assert llm._call(PROMPT) == PROMPT
+        assert llm._call(PROMPT) == PROMPT
+        assert sum(server.requests.values()) == 1
+
+        llm._call(PROMPT, temperature=0.2)
+        llm._call(PROMPT + "!")
+        assert sum(server.requests.values()) == 3
+
+        assert llm._call(PROMPT, bypass_cache=True) == PROMPT
+        assert sum(server.requests.values()) == 4
+    finally:
+        server.close()
+
+    stats = llm.model_manager.response_cache.stats()
+    assert stats["hits"] == 1 and stats["entries"] == 3, stats
+    print(f"✅ Cache stats: {stats}")
+
+def test_errors_and_expired_entries_are_not_replayed():
+    """Rate-limit failures are never cached, and entries past their TTL are refetched"""
+    print("\n🧪 Testing that errors and stale entries bypass the cache...")
+
+    server = FakeGeminiServer(latency=0)
+    try:
+        llm = _make_llm(server)
+        llm.model_manager.rate_limiter.backoff_seconds = 0
+        for model in llm.model_manager.models.values():
+            server.rate_limited[model] = 100  # several model keys may share one Gemini model
+        assert llm._call(PROMPT).startswith("Error: All Gemini models failed")
+        assert llm.model_manager.response_cache.stats()["entries"] == 0
+        server.rate_limited.clear()
+
+        requests_before = sum(server.requests.values())
+        assert llm._call(PROMPT) == server.text
+        assert sum(server.requests.values()) == requests_before + 1
+
+        expired = _make_llm(server, ttl_hours=0)
+        expired._call(PROMPT)
+        expired._call(PROMPT)
+        assert sum(server.requests.values()) == requests_before + 3
+    finally:
+        server.close()
+    print("✅ Errors never cached; expired entries refetched")
+
+if __name__ == "__main__":
+    test_repeat_calls_cost_no_quota()
+    test_errors_and_expired_entries_are_not_replayed()
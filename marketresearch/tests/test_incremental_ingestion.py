@@ -0,0 +1,207 @@
+# tests/test_incremental_ingestion.py
+import os
+import sys
+import time
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from test_embeddings import FakeEmbeddingBackend
+
+def _make_store(kb_path: str, chroma_path: str, backend: FakeEmbeddingBackend):
+    from marketresearch.rag.chroma_store import ChromaVectorStore
+    from marketresearch.rag.google_embeddings import GoogleEmbeddings
+    from marketresearch.config.gemini_config import RateLimiter
+
+    embeddings = GoogleEmbeddings(
+        rate_limiter=RateLimiter(requests_per_minute=100000, requests_per_day=1000000),
+        backend=backend,
+        use_cache=False
+    )
+    # The store reads CHROMA_DB_PATH once, on construction; restore it so later tests see the real setting
+    previous = os.environ.get('CHROMA_DB_PATH')
+    os.environ['CHROMA_DB_PATH'] = chroma_path
+    try:
+        return ChromaVectorStore(kb_path, collection_name="incremental_test", embeddings=embeddings)
+    finally:
+        if previous is None:
+            del os.environ['CHROMA_DB_PATH']
+        else:
+            os.environ['CHROMA_DB_PATH'] = previous
+
+def _counts(summary):
+    return {key: summary[key] for key in ("added", "updated", "removed", "unchanged")}
+
+def _write(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def test_incremental_sync():
+    """Only new, changed and deleted files touch ChromaDB on re-sync"""
+    print("🧪 Testing incremental knowledge base sync...")
+
+    kb_path = tempfile.mkdtemp()
+    chroma_path = tempfile.mkdtemp()
+    for i in range(20):
+        _write(os.path.join(kb_path, "company_profiles", f"company_{i}.txt"), f"Company {i} profile")
+    _write(os.path.join(kb_path, "market_data", "ev_market.txt"), "EV market data")
+
+    backend = FakeEmbeddingBackend(latency=0)
+    store = _make_store(kb_path, chroma_path, backend)
+    assert store.get_document_count() == 21
+
+    # Nothing changed: no embedding calls at all
+    requests_before = backend.requests
+    summary = store.sync_knowledge_base()
+    assert _counts(summary) == {"added": 0, "updated": 0, "removed": 0, "unchanged": 21}, summary
+    assert backend.requests == requests_before
+
+    # One edit, one new file, one deletion
+    _write(os.path.join(kb_path, "company_profiles", "company_3.txt"), "Company 3 profile, revised")
+    _write(os.path.join(kb_path, "industry_reports", "solar.txt"), "Solar industry report")
+    os.remove(os.path.join(kb_path, "market_data", "ev_market.txt"))
+
+    summary = store.sync_knowledge_base()
+    assert _counts(summary) == {"added": 1, "updated": 1, "removed": 1, "unchanged": 19}, summary
+    assert store.get_document_count() == 21
+    assert store.collection.get(where={"type": "market_data"})["ids"] == []
+    print(f"✅ Incremental sync: {summary}")
+
+    # A fresh store over the same ChromaDB picks up the persisted manifest
+    reopened = _make_store(kb_path, chroma_path, FakeEmbeddingBackend(latency=0))
+    assert reopened.sync_knowledge_base()["unchanged"] == 21
+    print("✅ Manifest persisted across restarts")
+
+def test_failed_embedding_batch_is_retried():
+    """Files whose embeddings fail stay out of the manifest and are indexed by the next sync"""
+    print("\n🧪 Testing failed embedding batches...")
+
+    class FlakyBackend(FakeEmbeddingBackend):
+        failing = False
+
+        def __call__(self, model, texts, task_type):
+            if self.failing:
+                raise RuntimeError("503 Service Unavailable")
+            return super().__call__(model, texts, task_type)
+
+    kb_path = tempfile.mkdtemp()
+    _write(os.path.join(kb_path, "company_profiles", "tesla.txt"), "Tesla profile")
+    backend = FlakyBackend(latency=0)
+    store = _make_store(kb_path, tempfile.mkdtemp(), backend)
+
+    _write(os.path.join(kb_path, "market_data", "ev_market.txt"), "EV market data")
+    backend.failing = True
+    try:
+        store.sync_knowledge_base()
+        raise AssertionError("sync should fail when embeddings fail")
+    except RuntimeError:
+        pass
+    assert not store.is_indexed(os.path.join(kb_path, "market_data", "ev_market.txt"))
+    assert store.get_document_count() == 1  # no zero-vector placeholders were stored
+
+    backend.failing = False
+    summary = store.sync_knowledge_base()
+    assert summary["added"] == 1, summary
+    assert store.is_indexed(os.path.join(kb_path, "market_data", "ev_market.txt"))
+    print("✅ Failed batch left out of the manifest and indexed on retry")
+
+def test_uploaded_documents_are_extracted_and_indexed():
+    """Uploaded DOCX/JSON/CSV/MD files are parsed (DOCX in a process pool) and indexed"""
+    print("\n🧪 Testing multi-format upload extraction...")
+    from docx import Document
+
+    kb_path = tempfile.mkdtemp()
+    upload_dir = os.path.join(kb_path, "uploaded_files")
+    os.makedirs(upload_dir)
+    for i in range(4):
+        document = Document()
+        document.add_paragraph(f"Quarterly charging network report {i}")
+        document.save(os.path.join(upload_dir, f"report_{i}.docx"))
+    _write(os.path.join(upload_dir, "pricing.json"), '{"tier": "fast", "price_per_kwh": 0.45}')
+    _write(os.path.join(upload_dir, "sites.csv"), "city,chargers\nBerlin,120\nParis,95\n")
+    _write(os.path.join(upload_dir, "notes.md"), "# Notes\nCharging demand is rising.")
+    _write(os.path.join(upload_dir, "ignored.exe"), "not a document")
+
+    store = _make_store(kb_path, tempfile.mkdtemp(), FakeEmbeddingBackend(latency=0))
+    indexed = store.collection.get(where={"type": "uploaded_document"}, include=["documents"])
+
+    assert len(indexed["ids"]) == 7, indexed["ids"]
+    assert any("Quarterly charging network report 3" in doc for doc in indexed["documents"])
+    assert any("Berlin | 120" in doc for doc in indexed["documents"])
+    assert store.is_indexed(os.path.join(upload_dir, "report_0.docx"))
+    assert not store.is_indexed(os.path.join(upload_dir, "ignored.exe"))
+    print(f"✅ {len(indexed['ids'])} uploaded documents extracted and indexed")
+
+def test_sync_starts_one_extraction_pool():
+    """Every group of a sync shares one process pool instead of spawning a new one per group"""
+    print("\n🧪 Testing extraction pool reuse across sync groups...")
+    from docx import Document
+    from marketresearch.rag import extractors
+
+    started = []
+
+    class CountingPool(extractors.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            started.append(self)
+            super().__init__(*args, **kwargs)
+
+    kb_path = tempfile.mkdtemp()
+    store = _make_store(kb_path, tempfile.mkdtemp(), FakeEmbeddingBackend(latency=0))
+    upload_dir = os.path.join(kb_path, "uploaded_files")
+    os.makedirs(upload_dir)
+    for i in range(6):
+        document = Document()
+        document.add_paragraph(f"Charging report {i}")
+        document.save(os.path.join(upload_dir, f"report_{i}.docx"))
+
+    original_executor, original_group_size = extractors.ProcessPoolExecutor, store.SYNC_GROUP_SIZE
+    extractors.ProcessPoolExecutor, store.SYNC_GROUP_SIZE = CountingPool, 2
+    try:
+        summary = store.sync_knowledge_base()
+    finally:
+        extractors.ProcessPoolExecutor, store.SYNC_GROUP_SIZE = original_executor, original_group_size
+
+    assert summary["added"] == 6, summary
+    assert len(started) == 1, len(started)
+    print("✅ 3 groups of DOCX files extracted by 1 process pool")
+
+def test_knowledge_stats_use_counter_index():
+    """Per-type stats are exact past 100 documents and never run a vector search"""
+    print("\n🧪 Testing knowledge stats counter index...")
+    from marketresearch.rag.pipeline import RAGPipeline
+
+    kb_path = tempfile.mkdtemp()
+    for i in range(150):
+        _write(os.path.join(kb_path, "company_profiles", f"company_{i}.txt"), f"Company {i} profile")
+    _write(os.path.join(kb_path, "industry_reports", "solar.txt"), "Solar industry report")
+
+    backend = FakeEmbeddingBackend(latency=0)
+    pipeline = RAGPipeline(kb_path, vector_store=_make_store(kb_path, tempfile.mkdtemp(), backend))
+
+    requests_before = backend.requests
+    start = time.perf_counter()
+    stats = pipeline.get_knowledge_stats()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    assert stats["company_profiles"] == 150 and stats["industry_reports"] == 1, stats
+    assert stats["total_documents"] == pipeline.vector_store.get_document_count() == 151
+    assert backend.requests == requests_before
+    print(f"✅ Exact stats in {elapsed_ms:.3f}ms: {stats}")
+
+    # Deletes and edits keep the counters in step with ChromaDB
+    os.remove(os.path.join(kb_path, "industry_reports", "solar.txt"))
+    _write(os.path.join(kb_path, "market_data", "ev_market.txt"), "EV market data")
+    pipeline.vector_store.sync_knowledge_base()
+    stats = pipeline.get_knowledge_stats()
+    assert stats["industry_reports"] == 0 and stats["market_data"] == 1, stats
+    assert stats["total_documents"] == pipeline.vector_store.get_document_count()
+    print("✅ Counters updated on ingest and delete")
+
+if __name__ == "__main__":
+    test_incremental_sync()
+    test_failed_embedding_batch_is_retried()
+    test_uploaded_documents_are_extracted_and_indexed()
+    test_sync_starts_one_extraction_pool()
+    test_knowledge_stats_use_counter_index()
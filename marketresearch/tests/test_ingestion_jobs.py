@@ -0,0 +1,122 @@
+# tests/test_ingestion_jobs.py
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+
+from models import JobStatus
+from services.ingestion_service import IngestionService
+from services.knowledge_service import KnowledgeService
+
+class FakeVectorStore:
+    """Reports per-file progress like ChromaVectorStore.sync_knowledge_base"""
+
+    def __init__(self, files, delay: float = 0.01):
+        self.files = files
+        self.delay = delay
+        self.started = threading.Event()
+
+    def sync_knowledge_base(self, progress_callback=None, cancel_event=None):
+        self.started.set()
+        for rel_path in self.files:
+            progress_callback(rel_path, "pending")
+        for i, rel_path in enumerate(self.files):
+            if cancel_event is not None and cancel_event.is_set():
+                return {"added": i, "cancelled": True}
+            time.sleep(self.delay)
+            progress_callback(rel_path, "indexed")
+        return {"added": len(self.files), "cancelled": False}
+
+class FakeFactory:
+    def __init__(self, store):
+        self.rag_pipeline = type("Pipeline", (), {"vector_store": store})()
+
+def _wait_for(job_id: str, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = IngestionService.get_job(job_id)
+        if job.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_job_reports_per_file_progress():
+    """A submitted job runs in the background and tracks every file"""
+    print("🧪 Testing ingestion job progress...")
+
+    store = FakeVectorStore([f"uploaded_files/doc_{i}.md" for i in range(5)])
+    KnowledgeService._rag_factory = FakeFactory(store)
+
+    job = IngestionService.submit("upload", ["doc_0.md"])
+    assert job.status == JobStatus.QUEUED
+    job = _wait_for(job.job_id)
+
+    assert job.status == JobStatus.COMPLETED, job.status
+    assert job.total_files == 5 and job.processed_files == 5
+    assert job.progress_percentage == 100
+    assert all(progress.status == "indexed" for progress in job.files.values())
+    print(f"✅ {job.processed_files}/{job.total_files} files indexed, summary {job.summary}")
+
+def test_job_cancellation():
+    """Cancelling a running job stops the sync early"""
+    print("\n🧪 Testing ingestion job cancellation...")
+
+    store = FakeVectorStore([f"uploaded_files/doc_{i}.md" for i in range(50)], delay=0.02)
+    KnowledgeService._rag_factory = FakeFactory(store)
+
+    job = IngestionService.submit("reindex")
+    assert store.started.wait(5)
+    IngestionService.cancel(job.job_id)
+    job = _wait_for(job.job_id)
+
+    assert job.status == JobStatus.CANCELLED, job.status
+    assert job.cancel_requested
+    assert job.processed_files < job.total_files
+    print(f"✅ Cancelled after {job.processed_files}/{job.total_files} files")
+
+def test_deleting_a_file_drops_it_from_stats(monkeypatch):
+    """DELETE /knowledge/files/{name} queues a sync that removes the file's chunks and counts"""
+    print("\n🧪 Testing knowledge stats after a delete...")
+    from fastapi.testclient import TestClient
+    from main import app
+    from marketresearch.rag.pipeline import RAGPipeline
+    from test_embeddings import FakeEmbeddingBackend
+    from test_incremental_ingestion import _make_store, _write
+
+    kb_path = tempfile.mkdtemp()
+    for i in range(3):
+        _write(os.path.join(kb_path, "industry_reports", f"report_{i}.txt"), f"Industry report {i}")
+    pipeline = RAGPipeline(kb_path, vector_store=_make_store(kb_path, tempfile.mkdtemp(), FakeEmbeddingBackend(latency=0)))
+    monkeypatch.setattr(KnowledgeService, "_rag_factory", SimpleNamespace(rag_pipeline=pipeline))
+    monkeypatch.setattr(KnowledgeService, "knowledge_dir", Path(kb_path))
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+    assert client.get("/knowledge/stats", headers=headers).json()["industry_reports"] == 3
+
+    response = client.delete("/knowledge/files/report_1.txt", headers=headers)
+    assert response.status_code == 200
+    job = _wait_for(response.json()["job_id"])
+
+    assert job.status == JobStatus.COMPLETED and job.summary["removed"] == 1, job
+    stats = client.get("/knowledge/stats", headers=headers).json()
+    assert stats["industry_reports"] == 2 and stats["total_documents"] == pipeline.vector_store.get_document_count()
+    assert client.delete("/knowledge/files/report_1.txt", headers=headers).status_code == 404
+    print(f"✅ Stats dropped to {stats['industry_reports']} industry reports after the delete")
+
+if __name__ == "__main__":
+    test_job_reports_per_file_progress()
+    test_job_cancellation()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_deleting_a_file_drops_it_from_stats(monkeypatch)
@@ -0,0 +1,148 @@
+# tests/test_prompt_budget.py
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.chains import ChainFactory
+from marketresearch.chains.base import BaseChain, TRIM_MARKER
+from marketresearch.utils.tokens import estimate_tokens
+
+TRENDS = {
+    "technology_trends": [{"trend": "Fast charging", "impact": "high", "confidence": 0.9, "timing": "2025"}],
+    "consumer_trends": [], "regulatory_trends": [], "economic_trends": [],
+    "key_insights": ["Charging demand is growing"],
+}
+
+# Retrieved market data far larger than the prompt budget
+MARKET_DATA = {f"source_{i}": f"Charging network report {i}: utilization grew {i % 40}% year over year" for i in range(400)}
+
+def _make_chain(server: FakeGeminiServer, budget: int):
+    factory = ChainFactory()
+    server.configure_genai()
+    primary_model = factory.get_model_for_chain("market_trends")
+    factory.model_manager.model_input_budgets[primary_model] = budget
+    return factory.get_chain("market_trends")
+
+def test_context_is_trimmed_to_budget():
+    """Oversized RAG context is trimmed to the model budget; required sections arrive whole"""
+    print("🧪 Testing prompt budgeting...")
+
+    server = FakeGeminiServer(latency=0, text=json.dumps(TRENDS))
+    try:
+        unbudgeted = _make_chain(server, 0)
+        unbudgeted.analyze_trends("EV charging", MARKET_DATA)
+        chain = _make_chain(server, 3000)
+        result = chain.analyze_trends("EV charging", MARKET_DATA)
+    finally:
+        server.close()
+
+    assert result.key_insights == TRENDS["key_insights"]
+    before, after = (estimate_tokens(prompt) for prompt in server.prompts)
+    assert after <= 3000 + 50, after  # the LLM adds role prefixes to the rendered messages
+    assert after < before
+    sent = server.prompts[-1]
+    assert chain.output_parser.get_format_instructions() in sent
+    assert sent.count(chain.output_parser.get_format_instructions()) == 1
+    assert "source_0" in sent and "source_399" not in sent  # trailing context goes first
+    print(f"✅ Prompt trimmed from ~{before} to ~{after} tokens (budget 3000)")
+
+def test_few_shot_examples_go_before_context():
+    """Few-shot examples are dropped first, and only as many as needed"""
+    print("\n🧪 Testing few-shot trimming priority...")
+
+    server = FakeGeminiServer(latency=0, text=json.dumps(TRENDS))
+    try:
+        chain = _make_chain(server, 0)
+        chain.few_shot_examples = [f"EXAMPLE {i}: {{\"trend\": \"{'x' * 400}\"}}\n" for i in range(3)]
+        prompt = chain.create_prompt()
+        inputs = {"research_topic": "EV charging", "current_date": "today", "input": "Analyze",
+                  "market_data": {"source_0": "Charging stations doubled"},
+                  "format_instructions": chain.output_parser.get_format_instructions()}
+
+        _, full_tokens, trimmed = chain.fit_to_budget(prompt, inputs, 100000)
+        assert trimmed == []
+        fitted, tokens, trimmed = chain.fit_to_budget(prompt, inputs, full_tokens - 60)
+    finally:
+        server.close()
+
+    assert trimmed == ["few_shot_examples"], trimmed
+    assert "EXAMPLE 1" in fitted["few_shot_examples"] and "EXAMPLE 2" not in fitted["few_shot_examples"]
+    assert fitted["market_data"] == inputs["market_data"]
+    assert tokens <= full_tokens - 60
+    print(f"✅ Dropped one example to fit: {full_tokens} -> {tokens} tokens")
+
+def test_text_context_cut_at_line_boundary():
+    """Text context is cut at a line boundary and marked as trimmed"""
+    text = "\n".join(f"Line {i} of retrieved context" for i in range(100))
+    trimmed = BaseChain._trim_value(text, 200)
+    assert trimmed.endswith(TRIM_MARKER)
+    assert trimmed[:-len(TRIM_MARKER)].split("\n")[-1].startswith("Line ")
+    assert len(trimmed) < len(text) - 700
+    print(f"✅ Text context trimmed from {len(text)} to {len(trimmed)} characters")
+
+def test_symbol_heavy_context_trimmed_until_it_fits():
+    """Context denser than four characters per token is trimmed again until the prompt fits"""
+    print("\n🧪 Testing repeated trimming of dense context...")
+
+    server = FakeGeminiServer(latency=0, text=json.dumps(TRENDS))
+    try:
+        chain = _make_chain(server, 0)
+        prompt = chain.create_prompt()
+        inputs = {"research_topic": "EV charging", "current_date": "today", "input": "Analyze",
+                  "format_instructions": chain.output_parser.get_format_instructions()}
+        _, base_tokens, _ = chain.fit_to_budget(prompt, {**inputs, "market_data": ""}, 0)
+        budget = base_tokens + 500
+        # Every digit and comma counts as a token, far more than four characters' worth
+        dense = "\n".join(",".join(str(n % 10) for n in range(row, row + 40)) for row in range(200))
+        fitted_text, text_tokens, trimmed = chain.fit_to_budget(prompt, {**inputs, "market_data": dense}, budget)
+        assert trimmed == ["market_data"] and text_tokens <= budget, (trimmed, text_tokens, budget)
+        # Dense data followed by prose: a cut sized on the average density removes too little prose
+        mixed = dense + "\n" + "\n".join(f"Analyst note {i}: charging demand keeps growing" for i in range(300))
+        mixed_budget = base_tokens + estimate_tokens(dense) + 1000
+        fitted_mixed, mixed_tokens, trimmed = chain.fit_to_budget(prompt, {**inputs, "market_data": mixed}, mixed_budget)
+    finally:
+        server.close()
+
+    assert trimmed == ["market_data"], trimmed
+    assert mixed_tokens <= mixed_budget, (mixed_tokens, mixed_budget)
+    assert fitted_mixed["market_data"].startswith(dense)
+    text = fitted_text["market_data"]
+    assert text.endswith(TRIM_MARKER) and text.count(TRIM_MARKER) == 1 and len(text) > 100
+    print(f"✅ Dense context trimmed to fit: ~{text_tokens} tokens (budget {budget}), "
+          f"mixed ~{mixed_tokens} tokens (budget {mixed_budget})")
+
+def test_token_stats_per_chain():
+    """Each chain call is counted under its chain, with trimmed calls flagged"""
+    print("\n🧪 Testing per-chain token stats...")
+
+    server = FakeGeminiServer(latency=0, text=json.dumps(TRENDS))
+    saved = dict(BaseChain._token_stats)
+    BaseChain._token_stats.clear()
+    try:
+        _make_chain(server, 0).analyze_trends("EV charging", MARKET_DATA)
+        _make_chain(server, 3000).analyze_trends("EV charging", MARKET_DATA)
+        stats = BaseChain.get_token_stats()
+    finally:
+        server.close()
+        BaseChain._token_stats.clear()
+        BaseChain._token_stats.update(saved)
+
+    assert set(stats) == {"MarketTrendsChain"}, stats
+    trends = stats["MarketTrendsChain"]
+    assert trends["calls"] == 2 and trends["trimmed_calls"] == 1, trends
+    assert trends["avg_tokens_in"] == round(trends["tokens_in"] / 2)
+    print(f"✅ Token stats: {stats}")
+
+if __name__ == "__main__":
+    test_context_is_trimmed_to_budget()
+    test_few_shot_examples_go_before_context()
+    test_text_context_cut_at_line_boundary()
+    test_symbol_heavy_context_trimmed_until_it_fits()
+    test_token_stats_per_chain()
@@ -0,0 +1,216 @@
+# tests/test_rate_limiter.py
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from marketresearch.config.gemini_config import RateLimiter, ModelRateLimiter
+
+MODEL_LIMITS = {"gemini_fast": 15, "gemini_creative": 15, "gemini_precise": 10, "gemini_fallback": 10}
+MODEL_NAMES = {
+    "gemini_fast": "gemini-2.0-flash-001",
+    "gemini_creative": "gemini-2.0-flash-exp",
+    "gemini_precise": "gemini-2.0-flash-001",
+    "gemini_fallback": "gemma-3-12b-it",
+}
+
+def _run_threads(count: int, target):
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_limits_are_enforced():
+    """No more than requests_per_minute calls land in any window"""
+    print("🧪 Testing sliding window limits...")
+
+    limiter = RateLimiter(requests_per_minute=5, requests_per_day=1000)
+    limiter.minute_window = 0.2
+    stamps = []
+    lock = threading.Lock()
+
+    def worker(i):
+        limiter.acquire("gemini_fast")
+        with lock:
+            stamps.append(time.time())
+
+    start = time.time()
+    _run_threads(20, worker)
+    elapsed = time.time() - start
+
+    stamps.sort()
+    assert all(stamps[i + 5] - stamps[i] >= 0.2 - 1e-3 for i in range(len(stamps) - 5))
+    assert elapsed < 1.5, elapsed  # woken on expiry rather than by 2s polling
+    print(f"✅ 20 calls at 5 per 0.2s took {elapsed:.2f}s")
+
+def test_waiters_are_served_in_arrival_order():
+    """Blocked callers acquire slots first come, first served"""
+    print("\n🧪 Testing FIFO fairness...")
+
+    limiter = RateLimiter(requests_per_minute=1, requests_per_day=1000)
+    limiter.minute_window = 0.02
+    limiter.acquire("gemini_fast")  # fill the window so everyone queues
+    order = []
+
+    threads = []
+    for i in range(10):
+        thread = threading.Thread(target=lambda i=i: (limiter.acquire("gemini_fast"), order.append(i)))
+        thread.start()
+        threads.append(thread)
+        # Make the arrival order deterministic
+        while len(limiter._waiters) < i + 1 and thread.is_alive():
+            time.sleep(0.0005)
+    for thread in threads:
+        thread.join()
+
+    assert order == list(range(10)), order
+    print(f"✅ Served in arrival order: {order}")
+
+def test_acquisition_overhead_with_100_threads():
+    """Microbenchmark: uncontended-limit acquisitions from 100 competing threads"""
+    print("\n🧪 Benchmarking acquisition with 100 threads...")
+
+    per_thread = 200
+    limiter = RateLimiter(requests_per_minute=10 ** 9, requests_per_day=10 ** 9)
+    # A full day window of history must not slow down each check
+    limiter.day_calls.extend([time.time()] * 100000)
+
+    start = time.perf_counter()
+    _run_threads(100, lambda i: [limiter.acquire(f"model_{i % 4}") for _ in range(per_thread)])
+    elapsed = time.perf_counter() - start
+
+    total = 100 * per_thread
+    assert len(limiter.minute_calls) == total
+    print(f"✅ {total} acquisitions in {elapsed:.3f}s ({elapsed / total * 1e6:.1f}µs each)")
+
+def _agent_run(limiter, models, calls_per_agent: int):
+    """Run one agent thread per model; returns the elapsed time and (model, time) of every grant"""
+    grants = []
+    lock = threading.Lock()
+
+    def agent(i):
+        for _ in range(calls_per_agent):
+            limiter.acquire(models[i])
+            with lock:
+                grants.append((MODEL_NAMES[models[i]], time.time()))
+
+    start = time.time()
+    _run_threads(len(models), agent)
+    return time.time() - start, grants
+
+def _busiest_window(grants, real_model: str, window: float) -> int:
+    """Most grants for one real model inside any window"""
+    times = sorted(t for model, t in grants if model == real_model)
+    return max((sum(1 for u in times[i:] if u - t < window) for i, t in enumerate(times)), default=0)
+
+def test_per_model_limits_keep_models_within_quota():
+    """At the same global cap, per-model limits stop any one model from overrunning its quota"""
+    print("\n🧪 Benchmarking per-model limits against a single shared limiter at the same global cap...")
+
+    window = 0.1
+    global_cap = 50
+    models = list(MODEL_LIMITS)
+    shared = RateLimiter(requests_per_minute=global_cap, requests_per_day=10 ** 6)
+    shared.minute_window = window
+    global_limiter = RateLimiter(requests_per_minute=global_cap, requests_per_day=10 ** 6)
+    global_limiter.minute_window = window
+    per_model = ModelRateLimiter(global_limiter, MODEL_LIMITS, window_seconds=window, model_names=MODEL_NAMES)
+
+    shared_time, shared_grants = _agent_run(shared, models, 20)
+    per_model_time, per_model_grants = _agent_run(per_model, models, 20)
+
+    # Keys backed by one model share its quota, at the smallest of their limits
+    real_limits = {}
+    for model_key, limit in MODEL_LIMITS.items():
+        real_limits[MODEL_NAMES[model_key]] = min(real_limits.get(MODEL_NAMES[model_key], limit), limit)
+    # Grants are timestamped just after they are made, so check a slightly narrower window
+    shared_peaks = {model: _busiest_window(shared_grants, model, window * 0.8) for model in real_limits}
+    per_model_peaks = {model: _busiest_window(per_model_grants, model, window * 0.8) for model in real_limits}
+
+    print(f"   Shared limiter: 80 calls in {shared_time:.2f}s, busiest window per model {shared_peaks}")
+    print(f"   Per-model:      80 calls in {per_model_time:.2f}s, busiest window per model {per_model_peaks}")
+    print(f"   Quotas:         {real_limits}")
+    assert all(per_model_peaks[model] <= limit for model, limit in real_limits.items()), per_model_peaks
+    assert any(shared_peaks[model] > limit for model, limit in real_limits.items()), shared_peaks
+    for model_name, limiter in per_model.model_limiters.items():
+        assert len(limiter.minute_calls) <= real_limits[model_name]
+    print("✅ Same global cap; only the per-model limiter keeps every model within its quota")
+
+def test_keys_for_one_model_share_its_quota():
+    """Model keys backed by the same model draw on one budget"""
+    print("\n🧪 Testing shared quota for keys of one model...")
+
+    limiter = ModelRateLimiter(
+        RateLimiter(requests_per_minute=1000, requests_per_day=10 ** 6),
+        MODEL_LIMITS,
+        model_names=MODEL_NAMES
+    )
+    assert set(limiter.model_limiters) == set(MODEL_NAMES.values())
+    for _ in range(MODEL_LIMITS["gemini_precise"]):
+        limiter.acquire("gemini_fast")
+    assert limiter.time_until_available("gemini_precise") > 0
+    assert limiter.soonest_available(["gemini_fast", "gemini_precise", "gemini_creative"]) == "gemini_creative"
+
+    limiter.report_rate_limited("gemini_precise")
+    assert limiter.time_until_available("gemini_fast") >= limiter.backoff_seconds * 0.9
+    print("✅ gemini_fast and gemini_precise share one budget and one backoff")
+
+def test_backoff_does_not_release_a_burst():
+    """Callers queued during a 429 backoff still respect the model's limit when it ends"""
+    print("\n🧪 Testing dispatch after a 429 backoff...")
+
+    global_limiter = RateLimiter(requests_per_minute=100, requests_per_day=10 ** 6)
+    global_limiter.minute_window = 1.0
+    limiter = ModelRateLimiter(global_limiter, {"a": 2}, window_seconds=1.0, backoff_seconds=1.0)
+    limiter.report_rate_limited("a")
+    start = time.time()
+    dispatched = []
+    lock = threading.Lock()
+
+    def caller(i):
+        limiter.acquire("a")
+        with lock:
+            dispatched.append(("a", time.time()))
+
+    _run_threads(4, caller)
+
+    offsets = sorted(round(t - start, 3) for _, t in dispatched)
+    print(f"   Dispatched at {offsets}s")
+    assert offsets[0] >= 1.0 - 1e-3, offsets  # nothing before the backoff ends
+    assert _busiest_window(dispatched, "a", 0.95) <= 2, offsets
+    assert offsets[2] >= 1.9, offsets  # the second pair waits for the first pair's window
+    assert len(global_limiter.day_calls) == 4
+    print("✅ Backoff ended with 2 calls, the rest a window later")
+
+def test_fallback_picks_soonest_available_model():
+    """An exhausted model is skipped for the one with capacity now; token limits apply too"""
+    print("\n🧪 Testing soonest-available fallback...")
+
+    limiter = ModelRateLimiter(
+        RateLimiter(requests_per_minute=1000, requests_per_day=10 ** 6),
+        MODEL_LIMITS,
+        token_limits={"gemini_precise": 1000}
+    )
+    chain = ["gemini_fast", "gemini_precise", "gemini_fallback"]
+    assert limiter.soonest_available(chain) == "gemini_fast"
+
+    for _ in range(MODEL_LIMITS["gemini_fast"]):
+        limiter.acquire("gemini_fast")
+    assert limiter.soonest_available(chain) == "gemini_precise"
+
+    limiter.acquire("gemini_precise", tokens=900)
+    assert limiter.soonest_available(chain, tokens=500) == "gemini_fallback"
+    assert limiter.time_until_available("gemini_precise", tokens=500) > 0
+    print("✅ Fallback skips models without request or token capacity")
+
+if __name__ == "__main__":
+    test_limits_are_enforced()
+    test_waiters_are_served_in_arrival_order()
+    test_acquisition_overhead_with_100_threads()
+    test_per_model_limits_keep_models_within_quota()
+    test_keys_for_one_model_share_its_quota()
+    test_backoff_does_not_release_a_burst()
+    test_fallback_picks_soonest_available_model()
@@ -0,0 +1,115 @@
+# tests/test_research_coalescing.py
+import os
+import sys
+import tempfile
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+
+class CountingCrew:
+    """Blocks each run until released and counts how many runs were started"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.runs = []
+        self.lock = threading.Lock()
+
+    def kickoff_with_rag(self, inputs):
+        with self.lock:
+            self.runs.append(inputs['research_topic'])
+        self.release.wait(30)
+        return f"Report on {inputs['research_topic']}"
+
+def wait_for_status(research_id: str, status: str, timeout: float = 10):
+    from services.research_service import ResearchService
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        research = ResearchService.get_research(research_id)
+        if research and research.status.value == status:
+            return research
+        time.sleep(0.02)
+    raise AssertionError(f"{research_id} never reached {status}")
+
+def test_duplicate_burst_runs_the_crew_once(monkeypatch):
+    """Identical concurrent starts (up to case/punctuation) share one job, its progress and its result"""
+    print("🧪 Testing single-flight research starts...")
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.research_service import ResearchService
+
+    crew = CountingCrew()
+    monkeypatch.setattr(ResearchService, "_crew_factory", lambda: crew)
+    client = TestClient(app)
+    coalesced_before = ResearchService.get_queue_stats()["coalesced"]
+
+    variants = ["EV Charging", "ev charging", "EV charging!", "  EV   Charging "]
+
+    def start(i):
+        return client.post("/research/start", json={
+            "research_topic": variants[i % len(variants)], "research_request": "Market overview."
+        }, headers={"Authorization": f"Bearer user-{i}"}).json()["research_id"]
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        research_ids = list(pool.map(start, range(40)))
+    other_id = client.post("/research/start", json={
+        "research_topic": "Solar storage", "research_request": "Market overview"
+    }, headers={"Authorization": "Bearer test"}).json()["research_id"]
+
+    assert len(set(research_ids)) == 1, set(research_ids)
+    assert other_id != research_ids[0]
+    wait_for_status(research_ids[0], "running")
+    wait_for_status(other_id, "running")
+    assert len(crew.runs) == 2 and "Solar storage" in crew.runs, crew.runs
+    assert ResearchService.get_queue_stats()["coalesced"] - coalesced_before == 39
+
+    crew.release.set()
+    research = wait_for_status(research_ids[0], "completed")
+    assert research.result.startswith("Report on") and len(crew.runs) == 2
+
+    # Once finished, the same request starts a fresh job (the result cache serves repeats)
+    crew.release.clear()
+    again = start(0)
+    assert again != research_ids[0]
+    crew.release.set()
+    wait_for_status(again, "completed")
+    assert len(crew.runs) == 3
+    print(f"✅ 40 identical starts -> 1 crew run ({len(crew.runs)} runs in total)")
+
+def test_attached_users_see_shared_research_in_history():
+    """A user attached to another user's run finds it in their history and can remove it without deleting it"""
+    print("\n🧪 Testing history of attached researches...")
+    from datetime import datetime
+    from models import ResearchResponse, ResearchStatus
+    from services.research_store import ResearchStore
+
+    store = ResearchStore(os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+    store.save(ResearchResponse(research_id="shared", status=ResearchStatus.RUNNING, created_at=datetime.now()),
+               user_id="alice", research_topic="EV charging")
+    store.add_viewer("shared", "bob")
+    store.add_viewer("shared", "bob")
+    store.add_viewer("shared", "alice")  # the owner is never also a viewer
+
+    assert store.list_for_user("alice")[1] == 1
+    items, total = store.list_for_user("bob")
+    assert total == 1 and items[0].research_id == "shared"
+
+    assert store.delete("shared", user_id="bob")
+    assert store.list_for_user("bob")[1] == 0
+    assert store.get("shared") is not None
+    assert not store.delete("shared", user_id="mallory")
+    assert store.delete("shared", user_id="alice") and store.get("shared") is None
+    print("✅ Attached research listed for both users; detaching keeps the owner's copy")
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_duplicate_burst_runs_the_crew_once(monkeypatch)
+    test_attached_users_see_shared_research_in_history()
@@ -0,0 +1,156 @@
+# tests/test_research_progress.py
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+
+from crewai.events import crewai_event_bus, TaskStartedEvent, TaskCompletedEvent, ToolUsageFinishedEvent
+from crewai.tasks.task_output import TaskOutput
+
+TASKS = [
+    ("comprehensive_data_collection_task", "Digital Intelligence Gatherer", ["serper_search", "rag_search"]),
+    ("comprehensive_analysis_task", "Quantitative Insights Specialist", ["alpha_vantage"]),
+    ("final_comprehensive_report_task", "Strategic Communications Expert", []),
+]
+
+class EventEmittingCrew:
+    """Emits the same CrewAI events a sequential kickoff does, pausing at each step for inspection"""
+
+    def __init__(self):
+        self.step = threading.Semaphore(0)
+        self.reached = threading.Semaphore(0)
+
+    def pause(self):
+        self.reached.release()
+        self.step.acquire(timeout=30)
+
+    def kickoff_with_rag(self, inputs):
+        for name, role, tools in TASKS:
+            task = SimpleNamespace(id=name, name=name, agent=SimpleNamespace(role=role))
+            crewai_event_bus.emit(task, TaskStartedEvent(context="", task=task))
+            self.pause()
+            for tool in tools:
+                started = datetime.now()
+                crewai_event_bus.emit(task, ToolUsageFinishedEvent(
+                    tool_name=tool, tool_args={}, started_at=started, finished_at=datetime.now(),
+                    from_cache=False, output="data", task_name=name, agent_role=role
+                ))
+            crewai_event_bus.emit(task, TaskCompletedEvent(
+                output=TaskOutput(description=name, raw=f"{name} done", agent=role), task=task
+            ))
+            self.pause()
+        return "Final report"
+
+def test_progress_follows_crew_events(monkeypatch):
+    """Task status, timings and tools reach the status endpoint and the stream as the crew reports them"""
+    print("🧪 Testing research progress events...")
+    from main import app
+    from fastapi.testclient import TestClient
+    from services.research_service import ResearchService
+    from services.stream_service import StreamService
+
+    crew = EventEmittingCrew()
+    monkeypatch.setattr(ResearchService, "_crew_factory", lambda: crew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+
+    research_id = client.post("/research/start", json={
+        "research_topic": "EV batteries", "research_request": "Market overview"
+    }, headers=headers).json()["research_id"]
+
+    def tasks():
+        progress = client.get(f"/research/{research_id}/status", headers=headers).json()["progress"]
+        return {task["task_name"]: task for task in progress["tasks"]}, progress
+
+    # First task started: running with a real start time, nothing else touched
+    assert crew.reached.acquire(timeout=10)
+    by_name, progress = tasks()
+    assert by_name["comprehensive_data_collection_task"]["status"] == "running"
+    assert by_name["comprehensive_data_collection_task"]["start_time"]
+    assert by_name["comprehensive_analysis_task"]["status"] == "waiting"
+    assert progress["active_task"] == "comprehensive_data_collection_task"
+    crew.step.release()
+
+    # First task finished: tools and duration recorded, progress moves to a third
+    assert crew.reached.acquire(timeout=10)
+    by_name, progress = tasks()
+    first = by_name["comprehensive_data_collection_task"]
+    assert first["status"] == "completed"
+    assert first["tools_used"] == ["serper_search", "rag_search"]
+    assert first["duration_seconds"] is not None and first["duration_seconds"] >= 0
+    assert first["output"] == "comprehensive_data_collection_task done"
+    assert progress["progress_percentage"] == 33
+    assert by_name["comprehensive_analysis_task"]["status"] == "waiting"
+
+    started = time.time()
+    for _ in range(4):
+        crew.step.release()
+        assert crew.reached.acquire(timeout=10)
+    crew.step.release()
+
+    deadline = time.time() + 10
+    while time.time() < deadline and client.get(
+        f"/research/{research_id}/status", headers=headers
+    ).json()["status"] != "completed":
+        time.sleep(0.02)
+    elapsed = time.time() - started
+    by_name, progress = tasks()
+    assert all(task["status"] == "completed" for task in by_name.values())
+    assert by_name["comprehensive_analysis_task"]["tools_used"] == ["alpha_vantage"]
+    assert progress["progress_percentage"] == 100
+    assert elapsed < 1.0, elapsed  # no simulated per-task delay
+
+    events = StreamService._streams[research_id].replay()
+    progress_events = [data for _, event, data in events if event == "progress"]
+    statuses = [(data["task"]["task_name"], data["task"]["status"]) for data in progress_events]
+    assert statuses.index(("comprehensive_data_collection_task", "running")) < statuses.index(
+        ("comprehensive_data_collection_task", "completed")
+    )
+    assert progress_events[-1]["progress_percentage"] == 100
+    print(f"✅ {len(progress_events)} progress events streamed, run finished {elapsed * 1000:.0f}ms after the last task")
+
+def test_cached_result_completes_all_tasks(monkeypatch):
+    """A cache hit never starts the crew's tasks; they are closed out when the research completes"""
+    print("🧪 Testing progress on cached results...")
+    from main import app
+    from fastapi.testclient import TestClient
+    from services.research_service import ResearchService
+
+    class CachedCrew:
+        def kickoff_with_rag(self, inputs):
+            return "Cached report"
+
+    monkeypatch.setattr(ResearchService, "_crew_factory", CachedCrew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+    research_id = client.post("/research/start", json={
+        "research_topic": "Cached topic", "research_request": "Market overview"
+    }, headers=headers).json()["research_id"]
+
+    deadline = time.time() + 10
+    status = {}
+    while time.time() < deadline:
+        status = client.get(f"/research/{research_id}/status", headers=headers).json()
+        if status["status"] == "completed":
+            break
+        time.sleep(0.02)
+    assert status["status"] == "completed"
+    assert status["progress"]["progress_percentage"] == 100
+    print("✅ Cached research reports 100% progress")
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_progress_follows_crew_events(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_cached_result_completes_all_tasks(monkeypatch)
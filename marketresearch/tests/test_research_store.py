@@ -0,0 +1,131 @@
+# tests/test_research_store.py
+import os
+import sys
+import time
+import socket
+import sqlite3
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from models import ResearchResponse, ResearchStatus, ResearchProgress, TaskProgress, TaskStatus
+from services.research_store import ResearchStore, process_owner, owner_alive
+
+def _research(research_id: str, created_at: datetime, result: str = None) -> ResearchResponse:
+    return ResearchResponse(
+        research_id=research_id,
+        status=ResearchStatus.COMPLETED if result else ResearchStatus.RUNNING,
+        result=result,
+        progress=ResearchProgress(current_phase="running", tasks=[
+            TaskProgress(task_name="comprehensive_data_collection_task", status=TaskStatus.RUNNING, agent="Gatherer")
+        ]),
+        created_at=created_at
+    )
+
+def test_store_survives_restart_and_loads_results_lazily():
+    """Research and results persist; listings and progress reads never touch result bodies"""
+    print("🧪 Testing the research store...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "research.sqlite")
+    store = ResearchStore(db_path)
+    report = "# Report\n" + "Findings. " * 50000
+    store.save(_research("r1", datetime.now(), result=report), user_id="alice", research_topic="EV charging")
+
+    reopened = ResearchStore(db_path)
+    assert reopened.get("r1").result == report
+    assert reopened.get("r1", include_result=False).result is None
+    assert reopened.get("r1").progress.tasks[0].status == TaskStatus.RUNNING
+    assert os.path.getsize(db_path) < len(report)  # the body lives out of line
+
+    # Later saves keep the owner and topic
+    research = reopened.get("r1", include_result=False)
+    research.progress.active_task = "comprehensive_data_collection_task"
+    reopened.save(research)
+    items, total = reopened.list_for_user("alice")
+    assert total == 1 and items[0].research_topic == "EV charging"
+    assert reopened.get("r1").result == report
+
+    assert not reopened.delete("r1", user_id="mallory")
+    assert reopened.delete("r1", user_id="alice")
+    assert reopened.get("r1") is None
+    print(f"✅ {len(report)} byte result stored out of line and reloaded after restart")
+
+def test_history_is_paginated_per_user():
+    """History pages come from an indexed query, newest first, per user"""
+    print("\n🧪 Testing paginated research history...")
+
+    store = ResearchStore(os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+    start = datetime.now()
+    for i in range(2000):
+        store.save(_research(f"r{i}", start + timedelta(seconds=i)), user_id="alice" if i % 2 else "bob",
+                   research_topic=f"Topic {i}")
+
+    began = time.perf_counter()
+    items, total = store.list_for_user("alice", limit=10, offset=20)
+    elapsed = (time.perf_counter() - began) * 1000
+
+    assert total == 1000
+    assert [item.research_id for item in items] == [f"r{i}" for i in range(1999 - 40, 1999 - 60, -2)]
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT research_id FROM research WHERE user_id = ? ORDER BY created_at DESC LIMIT 10",
+        ("alice",)
+    ).fetchall()
+    assert "idx_research_user_created" in str(plan), plan
+    print(f"✅ Page 3 of alice's history in {elapsed:.2f}ms via {plan[0][-1]}")
+
+def test_research_of_dead_process_is_failed():
+    """Unfinished researches of a crashed or restarted process are failed; live owners keep theirs"""
+    print("\n🧪 Testing recovery of orphaned research...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "research.sqlite")
+    # A database from before owners were recorded gains the column on open
+    legacy = sqlite3.connect(db_path)
+    legacy.execute("""CREATE TABLE research (research_id TEXT PRIMARY KEY, user_id TEXT, research_topic TEXT,
+                      status TEXT NOT NULL, created_at REAL NOT NULL, completed_at REAL,
+                      has_result INTEGER NOT NULL DEFAULT 0, data TEXT NOT NULL)""")
+    legacy.execute("INSERT INTO research VALUES ('legacy', 'alice', 'EV', 'running', ?, NULL, 0, ?)",
+                   (time.time(), _research("legacy", datetime.now()).model_dump_json()))
+    legacy.commit()
+    legacy.close()
+    store = ResearchStore(db_path)
+
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    host = socket.gethostname()
+    _, our_pid, _ = process_owner().rsplit(":", 2)
+    owners = {
+        "crashed": f"{host}:{exited.pid}:feed",
+        "restarted": f"{host}:{our_pid}:earlier-run",  # same pid, as in a restarted container
+        "sibling": f"{host}:{os.getppid()}:other-worker",
+        "mine": process_owner(),
+        "other-host": f"{host}-elsewhere:{exited.pid}:feed",
+    }
+    for research_id, owner in owners.items():
+        store.save(_research(research_id, datetime.now()), user_id="alice", owner=owner)
+    store.save(_research("done", datetime.now(), result="Report"), owner=owners["crashed"])
+    assert not owner_alive(owners["crashed"]) and owner_alive(owners["mine"])
+
+    # Later saves keep the owner
+    research = store.get("crashed", include_result=False)
+    research.progress.current_phase = "comprehensive_data_collection_task"
+    store.save(research)
+
+    assert [r.research_id for r in store.fail_orphaned(owner_alive, "gone", research_id="crashed")] == ["crashed"]
+    failed = {r.research_id for r in store.fail_orphaned(owner_alive, "gone")}
+    assert failed == {"legacy", "restarted"}, failed
+    for research_id in ("crashed", "legacy", "restarted"):
+        research = store.get(research_id)
+        assert research.status == ResearchStatus.FAILED and research.error == "gone" and research.completed_at
+    for research_id in ("sibling", "mine", "other-host"):
+        assert store.get(research_id).status == ResearchStatus.RUNNING
+    assert store.get("done").status == ResearchStatus.COMPLETED
+    assert {item.research_id: item.status for item in store.list_for_user("alice")[0]}["crashed"] == ResearchStatus.FAILED
+    assert store.fail_orphaned(owner_alive, "gone") == []
+    print(f"✅ {len(failed) + 1} orphaned researches failed, live owners untouched")
+
+if __name__ == "__main__":
+    test_store_survives_restart_and_loads_results_lazily()
+    test_history_is_paginated_per_user()
+    test_research_of_dead_process_is_failed()
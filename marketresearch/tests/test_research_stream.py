@@ -0,0 +1,191 @@
+# tests/test_research_stream.py
+import os
+import sys
+import json
+import tempfile
+import time
+import asyncio
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import GeminiModelManager, GeminiLLM
+from marketresearch.streaming import emit_token, stream_tokens_to
+
+REPORT = " ".join(f"word{i}" for i in range(40))
+
+class FakeCrew:
+    """Emits the report token by token, like a streaming CrewAI run"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def kickoff_with_rag(self, inputs):
+        for word in REPORT.split(" "):
+            emit_token(word + " ")
+            time.sleep(self.delay)
+        return REPORT
+
+def test_gemini_llm_streams_tokens():
+    """Tokens reach LangChain streams and the active sink while generation is still running"""
+    print("🧪 Testing GeminiLLM token streaming...")
+
+    server = FakeGeminiServer(latency=0, text=REPORT, chunk_latency=0.02)
+    try:
+        model_manager = GeminiModelManager()
+        server.configure_genai()
+        llm = GeminiLLM(model_manager, "research_report")
+
+        start = time.time()
+        chunks = []
+        first_chunk_at = None
+        for chunk in llm.stream("Write the report"):
+            first_chunk_at = first_chunk_at or time.time() - start
+            chunks.append(chunk)
+        total = time.time() - start
+
+        sink_tokens = []
+        with stream_tokens_to(sink_tokens.append):
+            text = llm.invoke("Write the report")
+    finally:
+        server.close()
+
+    assert "".join(chunks) == REPORT and len(chunks) == 40
+    assert first_chunk_at < total / 4, (first_chunk_at, total)
+    assert text == REPORT and "".join(sink_tokens) == REPORT
+    print(f"✅ First token after {first_chunk_at * 1000:.0f}ms, full response after {total * 1000:.0f}ms")
+
+def test_gemini_llm_retracts_failed_stream():
+    """Tokens streamed by an attempt that fails are retracted before the fallback model streams"""
+    print("\n🧪 Testing retraction of a failed streamed attempt...")
+
+    server = FakeGeminiServer(latency=0, text=REPORT)
+    try:
+        model_manager = GeminiModelManager()
+        server.configure_genai()
+        llm = GeminiLLM(model_manager, "research_report")
+        # Cut the primary's stream halfway; its failing health sends the call straight to the next model
+        server.broken_streams[model_manager.models[llm.primary_model]] = 1
+        for _ in range(model_manager.model_health.MIN_SAMPLES):
+            model_manager.model_health.record(llm.primary_model, 0.1, False)
+
+        text = ""
+        resets = []
+
+        def sink(token: str):
+            nonlocal text
+            text += token
+
+        def on_reset(discarded: int):
+            nonlocal text
+            resets.append(discarded)
+            text = text[:-discarded]
+
+        with stream_tokens_to(sink, on_reset=on_reset):
+            result = llm.invoke("Write the report")
+    finally:
+        server.close()
+
+    assert result == REPORT and text == REPORT, text
+    assert resets == [len(" ".join(REPORT.split(" ")[:20])) + 1], resets
+    print(f"✅ {resets[0]} characters of the failed attempt retracted")
+
+def test_stream_service_replays_and_follows():
+    """A late subscriber gets the backlog, then live events, then done"""
+    print("\n🧪 Testing research event streams...")
+    from services.stream_service import StreamService
+
+    StreamService.open("stream-test")
+    StreamService.publish("stream-test", "token", {"text": "early "})
+
+    def produce():
+        for i in range(5):
+            time.sleep(0.01)
+            StreamService.publish("stream-test", "token", {"text": f"live{i} "})
+        StreamService.close("stream-test", "completed")
+
+    async def consume(last_event_id: int = 0):
+        return [entry async for entry in StreamService.subscribe("stream-test", last_event_id)]
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    events = asyncio.run(consume())
+    producer.join()
+
+    event_ids = [event_id for event_id, _, _ in events]
+    assert event_ids == sorted(event_ids) and len(set(event_ids)) == len(event_ids)
+    assert "".join(data.get("text", "") for _, _, data in events) == "early live0 live1 live2 live3 live4 "
+    assert events[-1][1:] == ("done", {"status": "completed"})
+
+    # A replay coalesces the tokens into one event
+    replay = asyncio.run(consume())
+    assert replay == [(event_ids[-2], "token", {"text": "early live0 live1 live2 live3 live4 "}), events[-1]]
+
+    # Reconnecting with Last-Event-ID only replays what was missed, even inside coalesced text
+    assert asyncio.run(consume(events[2][0])) == [
+        (event_ids[-2], "token", {"text": "live2 live3 live4 "}), events[-1]
+    ]
+    print(f"✅ {len(events)} events followed in order, replayed as {len(replay)}")
+
+def test_stream_service_buffer_stays_small():
+    """Thousands of tokens are kept as one text entry, and a reset is replayed in place"""
+    print("\n🧪 Testing the stream replay buffer...")
+    from services.stream_service import StreamService
+
+    StreamService.open("buffer-test")
+    for i in range(5000):
+        StreamService.publish("buffer-test", "token", {"text": f"t{i} "})
+    StreamService.publish("buffer-test", "reset", {"discard": 6})
+    StreamService.publish("buffer-test", "token", {"text": "again"})
+    StreamService.close("buffer-test", "completed")
+
+    stream = StreamService._streams["buffer-test"]
+    assert len(stream.entries) == 4, len(stream.entries)
+    replay = stream.replay()
+    assert [event for _, event, _ in replay] == ["token", "reset", "token", "done"]
+    text = replay[0][2]["text"][:-replay[1][2]["discard"]] + replay[2][2]["text"]
+    assert text.endswith("t4998 again"), text[-20:]
+    print(f"✅ 5002 events kept as {len(stream.entries)} entries")
+
+def test_stream_endpoint_serves_sse(monkeypatch):
+    """GET /research/{id}/stream serves the run's tokens as server-sent events"""
+    print("\n🧪 Testing the research SSE endpoint...")
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.research_service import ResearchService
+
+    monkeypatch.setattr(ResearchService, "_crew_factory", FakeCrew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+
+    research = client.post("/research/start", json={
+        "research_topic": "EV charging", "research_request": "Market overview"
+    }, headers=headers).json()
+    with client.stream("GET", f"/research/{research['research_id']}/stream", headers=headers) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    # Tokens sent before the client connected arrive coalesced; together they are the report
+    blocks = [block.split("\n") for block in body.strip().split("\n\n")]
+    tokens = [json.loads(lines[2][len("data: "):])["text"] for lines in blocks if lines[1] == "event: token"]
+    assert "".join(tokens) == REPORT + " ", tokens
+    assert body.rstrip().endswith('data: {"status": "completed"}')
+    assert client.get("/research/missing/stream", headers=headers).status_code == 404
+    print(f"✅ Streamed the report over SSE in {len(tokens)} token events")
+
+if __name__ == "__main__":
+    test_gemini_llm_streams_tokens()
+    test_gemini_llm_retracts_failed_stream()
+    test_stream_service_replays_and_follows()
+    test_stream_service_buffer_stays_small()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_stream_endpoint_serves_sse(monkeypatch)
@@ -0,0 +1,144 @@
+# tests/test_research_workers.py
+import os
+import sys
+import tempfile
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+
+from fastapi.testclient import TestClient
+
+class BlockingCrew:
+    """A crew run that blocks its thread until released, like a real kickoff"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def kickoff_with_rag(self, inputs):
+        self.started.release()
+        self.release.wait(30)
+        return f"Report on {inputs['research_topic']}"
+
+def test_status_polling_stays_fast_while_research_runs(monkeypatch):
+    """Running researches never block the event loop; excess starts are rejected with 503"""
+    print("🧪 Testing research workers...")
+    from main import app
+    from services.research_service import ResearchService
+
+    crew = BlockingCrew()
+    monkeypatch.setattr(ResearchService, "_crew_factory", lambda: crew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+    capacity = ResearchService.MAX_CONCURRENT_RESEARCH + ResearchService.MAX_QUEUED_RESEARCH
+
+    started_at = time.time()
+    research_ids = []
+    for i in range(capacity):
+        response = client.post("/research/start", json={
+            "research_topic": f"Topic {i}", "research_request": "Market overview"
+        }, headers=headers)
+        assert response.status_code == 200, response.text
+        research_ids.append(response.json()["research_id"])
+    assert time.time() - started_at < 5
+    for _ in range(ResearchService.MAX_CONCURRENT_RESEARCH):
+        assert crew.started.acquire(timeout=5)
+
+    rejected = client.post("/research/start", json={
+        "research_topic": "One too many", "research_request": "Market overview"
+    }, headers=headers)
+    assert rejected.status_code == 503, rejected.status_code
+    assert client.get("/research/queue", headers=headers).json()["running"] == ResearchService.MAX_CONCURRENT_RESEARCH
+
+    latencies = []
+    for _ in range(50):
+        start = time.perf_counter()
+        response = client.get(f"/research/{research_ids[0]}/status", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.json()["status"] == "running"
+    latencies.sort()
+    p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+    assert p95 < 100, latencies
+
+    crew.release.set()
+    deadline = time.time() + 30
+    while time.time() < deadline and any(
+        client.get(f"/research/{research_id}/status", headers=headers).json()["status"] != "completed"
+        for research_id in research_ids
+    ):
+        time.sleep(0.1)
+    assert client.get(f"/research/{research_ids[-1]}/result", headers=headers).json()["result"] == f"Report on Topic {capacity - 1}"
+    print(f"✅ Status p50 {p50:.1f}ms, p95 {p95:.1f}ms with {ResearchService.MAX_CONCURRENT_RESEARCH} running "
+          f"and {ResearchService.MAX_QUEUED_RESEARCH} queued")
+
+def test_concurrent_runs_use_separate_crews(monkeypatch, tmp_path):
+    """Two real crews run at once on different topics without touching each other's tasks"""
+    print("\n🧪 Testing concurrent runs of real crews...")
+    from main import app
+    from services.research_service import ResearchService
+    from fake_gemini_server import FakeGeminiServer
+    from marketresearch.crew import MarketResearchCrew
+    from marketresearch.utils import cache
+
+    topics = {"Alpha": "Alpha batteries for delivery drones", "Beta": "Beta greenhouse irrigation sensors"}
+
+    def reply(prompt: str) -> str:
+        # Every agent answers at once, naming the research requests its prompt was about
+        mentioned = ", ".join(request for request in topics.values() if request in prompt)
+        return f"Thought: I now know the final answer\nFinal Answer: Findings on {mentioned}\n{prompt}"
+
+    server = FakeGeminiServer(latency=0.2, reply=reply)
+    (tmp_path / "knowledge").mkdir()
+    monkeypatch.chdir(tmp_path)  # the crew reads ./knowledge and writes its report files to the working directory
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chroma_db"))
+    monkeypatch.setenv("GEMINI_API_BASE", f"{server.url}/v1beta/models/crew")  # litellm appends ":<method>"
+    monkeypatch.setenv("CREWAI_TESTING", "true")  # no interactive trace prompt after the first kickoff
+    monkeypatch.setattr(cache, "research_cache", cache.ShardedCache(cache_dir=str(tmp_path / "cache")))
+    monkeypatch.setattr(ResearchService, "_crew_factory", MarketResearchCrew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+    crews_before = ResearchService.crew_count()
+
+    try:
+        research_ids = {
+            name: client.post("/research/start", json={
+                "research_topic": f"{name} market", "research_request": request
+            }, headers=headers).json()["research_id"]
+            for name, request in topics.items()
+        }
+        deadline = time.time() + 120
+        results = {}
+        while time.time() < deadline and len(results) < len(research_ids):
+            for name, research_id in research_ids.items():
+                research = ResearchService.get_research(research_id)
+                if research.status.value in ("completed", "failed"):
+                    results[name] = research
+            time.sleep(0.1)
+    finally:
+        server.close()
+
+    assert len(results) == 2, results
+    assert ResearchService.crew_count() - crews_before == 2
+    for name, research in results.items():
+        other = next(request for other_name, request in topics.items() if other_name != name)
+        assert research.status.value == "completed", research.error
+        assert topics[name] in research.result and other not in research.result, name
+        assert f"Findings on {topics[name]}\n" in research.result
+    # No prompt of either run ever mixed in the other's request
+    assert not any(all(request in prompt for request in topics.values()) for prompt in server.prompts)
+    print(f"✅ Two runs on two crews, {sum(server.requests.values())} LLM calls, no shared task state")
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_status_polling_stays_fast_while_research_runs(monkeypatch)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_concurrent_runs_use_separate_crews(monkeypatch, Path(tempfile.mkdtemp()))
@@ -0,0 +1,99 @@
+# tests/test_retrieval_cache.py
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+from test_embeddings import FakeEmbeddingBackend
+from test_incremental_ingestion import _make_store, _write
+from marketresearch.rag.retrieval_cache import LRUCache
+
+CHAIN_TYPES = [
+    "company_research", "industry_analysis", "swot_analysis", "competitive_benchmarking",
+    "market_trends", "data_collection", "executive_summary", "research_report",
+    "strategic_recommendations"
+]
+
+def _make_pipeline(backend: FakeEmbeddingBackend):
+    from marketresearch.rag.pipeline import RAGPipeline
+
+    kb_path = tempfile.mkdtemp()
+    _write(os.path.join(kb_path, "company_profiles", "tesla.txt"), "Tesla builds electric vehicles")
+    _write(os.path.join(kb_path, "industry_reports", "ev.txt"), "The EV industry is growing")
+    _write(os.path.join(kb_path, "market_data", "charging.txt"), "Charging stations doubled")
+
+    pipeline = RAGPipeline(kb_path, vector_store=_make_store(kb_path, tempfile.mkdtemp(), backend))
+    return pipeline, kb_path
+
+def test_lru_evicts_and_skips_rejected_values():
+    """The LRU keeps max_entries and never stores values rejected by cache_if"""
+    print("🧪 Testing LRU cache...")
+
+    cache = LRUCache(max_entries=2)
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_compute(key, lambda: key.upper())
+    assert cache.stats()["entries"] == 2 and cache.stats()["hits"] == 1
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"  # "b" was least recent
+
+    cache.get_or_compute("zero", lambda: [0.0, 0.0], cache_if=any)
+    assert cache.get_or_compute("zero", lambda: [1.0], cache_if=any) == [1.0]
+    print(f"✅ {cache.stats()}")
+
+def test_research_run_embeds_topic_once():
+    """Nine chain types over one topic embed the query once; a repeat run is all hits"""
+    print("\n🧪 Testing query embedding and retrieval caches...")
+
+    backend = FakeEmbeddingBackend(latency=0)
+    pipeline, kb_path = _make_pipeline(backend)
+    inputs = {"research_topic": "EV charging networks", "company_name": "Tesla", "industry_name": "Automotive"}
+
+    requests_before = backend.requests
+    first_run = [pipeline.smart_context_retrieval(chain_type, **inputs) for chain_type in CHAIN_TYPES]
+    assert backend.requests == requests_before + 1, backend.requests - requests_before
+
+    second_run = [pipeline.smart_context_retrieval(chain_type, **inputs) for chain_type in CHAIN_TYPES]
+    assert second_run == first_run
+    metrics = pipeline.get_cache_metrics()
+    # Chain types sharing a document type set also share a cached retrieval
+    assert metrics["retrievals"]["misses"] == 5, metrics
+    assert metrics["retrievals"]["hits"] == 2 * len(CHAIN_TYPES) - 5, metrics
+    print(f"✅ Cache metrics: {metrics}")
+
+    # Any index change invalidates cached retrievals
+    _write(os.path.join(kb_path, "market_data", "charging.txt"), "Charging stations tripled")
+    pipeline.vector_store.sync_knowledge_base()
+    context = pipeline.smart_context_retrieval("market_trends", **inputs)
+    assert "tripled" in context and "doubled" not in context
+    print("✅ Retrieval cache invalidated after reindex")
+
+def test_chain_context_includes_merged_neighbors():
+    """Chain retrieval adds each hit's neighbouring chunks, merged into continuous passages"""
+    print("\n🧪 Testing neighbour expansion in chain retrieval...")
+    from marketresearch.rag.pipeline import RAGPipeline
+
+    kb_path = tempfile.mkdtemp()
+    report = "\n\n".join(
+        f"Section {i}. " + " ".join(f"Finding {i}.{j} on charging demand." for j in range(25)) for i in range(12)
+    )
+    _write(os.path.join(kb_path, "industry_reports", "charging.txt"), report)
+    pipeline = RAGPipeline(kb_path, vector_store=_make_store(kb_path, tempfile.mkdtemp(), FakeEmbeddingBackend(latency=0)))
+    assert pipeline.expand_neighbors
+    assert pipeline.vector_store.get_document_count() > 6
+
+    expanded = pipeline.smart_context_retrieval("industry_analysis", research_topic="EV charging demand")
+    hits_only = pipeline.retrieve_relevant_context("EV charging demand", max_results=3,
+                                                   doc_types=["industry_report", "market_data", "uploaded_document"])
+
+    assert len(expanded) > len(hits_only), (len(expanded), len(hits_only))
+    # Hits and their neighbours come back as whole stretches of the source, not repeated overlaps
+    passages = [part.strip() for part in re.split(r"--- [^\n]* ---", expanded) if part.strip()]
+    assert all(passage in report for passage in passages), passages
+    print(f"✅ Context grew from {len(hits_only)} to {len(expanded)} chars with merged neighbours")
+
+if __name__ == "__main__":
+    test_lru_evicts_and_skips_rejected_values()
+    test_research_run_embeds_topic_once()
+    test_chain_context_includes_merged_neighbors()
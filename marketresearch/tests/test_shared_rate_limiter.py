@@ -0,0 +1,89 @@
+# tests/test_shared_rate_limiter.py
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.dirname(__file__))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_RESPONSE_CACHE", "false")  # every call must reach the fake server
+
+from fake_gemini_server import FakeGeminiServer
+from marketresearch.config.gemini_config import SharedRateLimiter
+
+PROCESSES = 4
+CALLS_PER_PROCESS = 6
+LIMIT = 4  # requests per window, across all processes
+WINDOW = 1.0  # seconds
+
+def _worker(db_path: str, server_url: str, worker_id: int):
+    """One "uvicorn worker": its own GeminiModelManager, limited through the shared ledger"""
+    os.environ["GEMINI_RATE_LIMIT_DB"] = db_path
+    import google.generativeai as genai
+    from marketresearch.config.gemini_config import GeminiModelManager, GeminiLLM
+
+    model_manager = GeminiModelManager()
+    genai.configure(api_key="test-key", transport="rest", client_options={"api_endpoint": server_url})
+    model_manager.rate_limiter.global_limiter.requests_per_minute = LIMIT
+    model_manager.rate_limiter.global_limiter.minute_window = WINDOW
+
+    llm = GeminiLLM(model_manager, "data_collection")
+    for i in range(CALLS_PER_PROCESS):
+        assert not llm._call(f"worker {worker_id} prompt {i}").startswith("ERROR")
+
+def _max_in_window(times, window: float) -> int:
+    times = sorted(times)
+    start, best = 0, 0
+    for end, t in enumerate(times):
+        while t - times[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+def test_global_limit_holds_across_processes():
+    """N processes sharing the SQLite ledger never exceed the global limit together"""
+    print(f"🧪 Running {PROCESSES} processes against one shared limiter...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "rate_limits.sqlite")
+    server = FakeGeminiServer(latency=0.01)
+    try:
+        context = multiprocessing.get_context("spawn")
+        workers = [context.Process(target=_worker, args=(db_path, server.url, i)) for i in range(PROCESSES)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(120)
+        assert all(worker.exitcode == 0 for worker in workers), [worker.exitcode for worker in workers]
+    finally:
+        server.close()
+
+    # Server-side timestamps lag the limiter's by the request latency, so allow a little slack
+    busiest = _max_in_window(server.request_times, WINDOW - 0.05)
+    assert len(server.request_times) == PROCESSES * CALLS_PER_PROCESS
+    assert busiest <= LIMIT, busiest
+    print(f"✅ {len(server.request_times)} requests, at most {busiest} in any {WINDOW}s (limit {LIMIT})")
+    print(f"   Unshared limiters would have allowed up to {LIMIT * PROCESSES} per window")
+
+def test_daily_budget_survives_restart():
+    """The daily budget is read back from the ledger by a fresh limiter"""
+    print("\n🧪 Testing the persisted daily budget...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "rate_limits.sqlite")
+    limiter = SharedRateLimiter(db_path, requests_per_minute=100, requests_per_day=3)
+    for _ in range(3):
+        limiter.acquire("gemini_fast")
+    assert not limiter.can_make_request("gemini_fast")
+
+    restarted = SharedRateLimiter(db_path, requests_per_minute=100, requests_per_day=3)
+    assert not restarted.can_make_request("gemini_fast")
+    assert restarted.time_until_available() > 86000
+    # Other scopes in the same database have their own budgets
+    assert restarted.sub_limiter("gemini_fast", 100).can_make_request("gemini_fast")
+    print(f"✅ Restarted limiter waits {restarted.time_until_available():.0f}s for the next daily slot")
+
+if __name__ == "__main__":
+    test_global_limit_holds_across_processes()
+    test_daily_budget_survives_restart()
@@ -0,0 +1,239 @@
+# tests/test_status_hub.py
+import gc
+import os
+import sys
+import json
+import time
+import asyncio
+import tempfile
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("RESEARCH_DB_PATH", os.path.join(tempfile.mkdtemp(), "research.sqlite"))
+
+from models import ResearchResponse, ResearchProgress, TaskProgress, ResearchStatus, TaskStatus
+
+TASKS = [
+    ("comprehensive_data_collection_task", "Digital Intelligence Gatherer", ["serper_search", "rag_search"]),
+    ("comprehensive_analysis_task", "Quantitative Insights Specialist", ["alpha_vantage"]),
+    ("final_comprehensive_report_task", "Strategic Communications Expert", []),
+]
+REPORT = "## Market report\n" + "Market sizing, competitors and outlook. " * 1000  # ~40KB, like a real report
+
+def new_research(research_id: str) -> ResearchResponse:
+    return ResearchResponse(
+        research_id=research_id,
+        status=ResearchStatus.PENDING,
+        progress=ResearchProgress(
+            current_phase="initializing",
+            tasks=[TaskProgress(task_name=name, status=TaskStatus.WAITING, agent=agent) for name, agent, _ in TASKS]
+        )
+    )
+
+def run_states(research_id: str):
+    """Every state a research passes through, the way ResearchService updates it"""
+    research = new_research(research_id)
+    research.status = ResearchStatus.RUNNING
+    yield research.model_copy(deep=True)
+    for i, (name, _, tools) in enumerate(TASKS):
+        task = research.progress.tasks[i]
+        task.status = TaskStatus.RUNNING
+        research.progress.active_task = research.progress.current_phase = name
+        yield research.model_copy(deep=True)
+        for tool in tools:
+            task.tools_used.append(tool)
+            yield research.model_copy(deep=True)
+        task.status = TaskStatus.COMPLETED
+        task.duration_seconds = 12.5
+        task.output = f"{name}: " + "finding " * 120  # ~1000 chars, as stored from task output
+        research.progress.completed_tasks.append(name)
+        research.progress.progress_percentage = int(len(research.progress.completed_tasks) / len(TASKS) * 100)
+        yield research.model_copy(deep=True)
+    research.status = ResearchStatus.COMPLETED
+    research.result = REPORT
+    yield research.model_copy(deep=True)
+
+def parse_sse(text: str):
+    """(event, data) pairs of an SSE body, skipping comments"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = [line for line in block.split("\n") if not line.startswith(":")]
+        if not lines:
+            continue
+        fields = dict(line.split(": ", 1) for line in lines)
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_hub_sends_snapshot_deltas_and_result_once():
+    """Subscribers get a snapshot, then only what changed, and the result exactly once"""
+    print("🧪 Testing status hub deltas...")
+    from services.status_hub import StatusHub
+
+    states = list(run_states("hub-test"))
+    StatusHub.update(new_research("hub-test"))
+
+    async def follow():
+        received = []
+        async for text in StatusHub.subscribe("hub-test"):
+            received.append(text)
+        return received
+
+    async def scenario():
+        subscriber = asyncio.create_task(follow())
+        while StatusHub.subscriber_count("hub-test") == 0:
+            await asyncio.sleep(0.001)
+        await asyncio.to_thread(lambda: [StatusHub.update(state) for state in states])
+        return await asyncio.wait_for(subscriber, 5)
+
+    events = parse_sse("".join(asyncio.run(scenario())))
+    names = [event for event, _ in events]
+    assert names[0] == "snapshot" and names[-2:] == ["result", "done"]
+    assert names.count("result") == 1 and names.count("delta") == len(states)
+    assert all("output" not in json.dumps(data) for event, data in events if event != "result")
+
+    tool_delta = events[3][1]  # first tool call: one task, nothing else
+    assert tool_delta == {"tasks": {"comprehensive_data_collection_task": {
+        "status": "running", "agent": "Digital Intelligence Gatherer",
+        "tools_used": ["serper_search"], "duration_seconds": None
+    }}}, tool_delta
+    assert events[-2][1]["result"] == REPORT
+
+    # A late subscriber gets the final state and result, then done
+    late = parse_sse("".join(asyncio.run(follow())))
+    assert [event for event, _ in late] == ["snapshot", "result", "done"]
+    assert late[0][1]["percentage"] == 100
+    print(f"✅ {names.count('delta')} deltas, result sent once")
+
+def test_events_endpoint_pushes_status(monkeypatch):
+    """GET /research/{id}/events follows a run to completion"""
+    print("\n🧪 Testing the research events endpoint...")
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.research_service import ResearchService
+
+    release = threading.Event()
+
+    class WaitingCrew:
+        def kickoff_with_rag(self, inputs):
+            release.wait(10)
+            return "Pushed report"
+
+    monkeypatch.setattr(ResearchService, "_crew_factory", WaitingCrew)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test"}
+
+    research_id = client.post("/research/start", json={
+        "research_topic": "Push status", "research_request": "Market overview"
+    }, headers=headers).json()["research_id"]
+    threading.Timer(0.2, release.set).start()
+    with client.stream("GET", f"/research/{research_id}/events", headers=headers) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse("".join(response.iter_text()))
+
+    assert events[0][0] == "snapshot"
+    assert events[-2] == ("result", events[-2][1]) and events[-2][1]["result"] == "Pushed report"
+    assert events[-1] == ("done", {"status": "completed"})
+    assert any(data.get("percentage") == 100 for event, data in events if event == "delta")
+    assert client.get("/research/missing/events", headers=headers).status_code == 404
+    print(f"✅ {len(events)} events pushed for one run")
+
+def test_events_of_orphaned_research_finish():
+    """Followers of a research whose process died get a failed ``done`` instead of waiting forever"""
+    print("\n🧪 Testing events of an orphaned research...")
+    import socket
+    import subprocess
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.research_service import ResearchService
+
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    research = new_research("orphaned-run")
+    research.status = ResearchStatus.RUNNING
+    ResearchService._store.save(research, user_id="test", owner=f"{socket.gethostname()}:{exited.pid}:crashed")
+
+    client = TestClient(app)
+    with client.stream("GET", "/research/orphaned-run/events", headers={"Authorization": "Bearer test"}) as response:
+        events = parse_sse("".join(response.iter_text()))
+
+    assert events[-1] == ("done", {"status": "failed"}), events
+    assert events[0][1]["error"] == ResearchService.ORPHANED_ERROR
+    assert ResearchService.get_research("orphaned-run").status == ResearchStatus.FAILED
+    print("✅ Orphaned research reported as failed to its followers")
+
+def test_push_vs_polling_load():
+    """Compare bytes and CPU of push subscribers with clients polling /status for the same run"""
+    print("\n🧪 Load testing push vs polling...")
+    from services.status_hub import StatusHub
+    from services.research_store import ResearchStore
+
+    clients = int(os.getenv("STATUS_LOAD_CLIENTS", "300"))
+    run_seconds = 60  # simulated research duration
+    poll_interval = 2  # the frontend's polling interval
+    polls_per_client = run_seconds // poll_interval
+    store = ResearchStore(os.path.join(tempfile.mkdtemp(), "load.sqlite"))
+    states = list(run_states("load-push"))
+    # Keep collector passes over whatever earlier tests left in memory out of the CPU figures
+    gc.collect()
+    gc.freeze()
+
+    # Push: every client subscribes once; the run's updates fan out to all of them
+    async def push():
+        received = [0] * clients
+
+        async def follow(i):
+            async for text in StatusHub.subscribe("load-push"):
+                received[i] += len(text.encode())
+
+        StatusHub.update(new_research("load-push"))
+        followers = [asyncio.create_task(follow(i)) for i in range(clients)]
+        while StatusHub.subscriber_count("load-push") < clients:
+            await asyncio.sleep(0.001)
+
+        def produce():
+            cpu = time.thread_time()
+            for state in states:
+                store.save(state)
+                StatusHub.update(state)
+            return time.thread_time() - cpu
+
+        # Per-thread CPU (producer + event loop), so stray threads of other tests are not counted
+        cpu, wall = time.thread_time(), time.perf_counter()
+        producer_cpu = await asyncio.to_thread(produce)
+        await asyncio.gather(*followers)
+        return sum(received), time.thread_time() - cpu + producer_cpu, time.perf_counter() - wall
+
+    push_bytes, push_cpu, push_wall = asyncio.run(push())
+
+    # Polling: every client fetches the full response every poll_interval until it sees completion
+    polling_states = [state.model_copy(update={"research_id": "load-poll"}) for state in states]
+    cpu = time.thread_time()
+    poll_bytes = 0
+    for poll in range(polls_per_client):
+        # The run advances evenly over the simulated duration; the last poll sees it completed
+        store.save(polling_states[min(len(states) - 1, (poll + 1) * len(states) // polls_per_client)])
+        for _ in range(clients):
+            poll_bytes += len(store.get("load-poll").model_dump_json().encode())
+    poll_cpu = time.thread_time() - cpu
+    gc.unfreeze()
+
+    print(f"📊 {clients} clients, {len(states)} updates over a simulated {run_seconds}s run")
+    print(f"   push:    {push_bytes / run_seconds / 1024:8.1f} KB/s, {push_cpu * 1000:7.0f}ms CPU "
+          f"(all delivered {push_wall * 1000:.0f}ms after the first update)")
+    print(f"   polling: {poll_bytes / run_seconds / 1024:8.1f} KB/s, {poll_cpu * 1000:7.0f}ms CPU "
+          f"({polls_per_client * clients} polls every {poll_interval}s)")
+    assert push_bytes * 3 < poll_bytes, (push_bytes, poll_bytes)
+    assert push_cpu * 3 < poll_cpu, (push_cpu, poll_cpu)
+    print(f"✅ Push used {poll_bytes / push_bytes:.1f}x fewer bytes and {poll_cpu / push_cpu:.1f}x less CPU")
+
+if __name__ == "__main__":
+    test_hub_sends_snapshot_deltas_and_result_once()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_events_endpoint_pushes_status(monkeypatch)
+    test_events_of_orphaned_research_finish()
+    test_push_vs_polling_load()